@@ -1,7 +1,10 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import ArgumentError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, StaticPool
 
 
 def _default_database_url() -> str:
@@ -11,7 +14,8 @@ def _default_database_url() -> str:
     return f"sqlite:////{path.lstrip('/')}"
 
 
-DATABASE_URL = os.getenv("DATABASE_URL", _default_database_url())
+def get_database_url() -> str:
+    return os.getenv("DATABASE_URL", _default_database_url())
 
 
 def _prepare_sqlite_directory(url: str) -> None:
@@ -29,10 +33,54 @@ def _prepare_sqlite_directory(url: str) -> None:
         os.makedirs(directory, exist_ok=True)
 
 
-_prepare_sqlite_directory(DATABASE_URL)
+def _is_memory_sqlite(url: str) -> bool:
+    try:
+        database = make_url(url).database or ""
+    except ArgumentError:
+        return False
+    return database in {"", ":memory:"} or database.startswith("file::memory:")
+
+
+def _apply_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+    # WAL lets readers proceed during writes and, with synchronous=NORMAL,
+    # only syncs at checkpoints instead of on every commit.
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def make_engine(url: str) -> Engine:
+    """Create an engine for *url*, preparing the SQLite directory if needed."""
+    _prepare_sqlite_directory(url)
+    is_sqlite = url.startswith("sqlite")
+    options = {}
+    if is_sqlite:
+        options["connect_args"] = {"check_same_thread": False}
+        if _is_memory_sqlite(url):
+            # Every connection to :memory: is a separate, empty database, so
+            # all threads must share a single connection.
+            options["poolclass"] = StaticPool
+        else:
+            # Keep file connections open between requests instead of reopening
+            # the database (and its WAL files) each time; SQLAlchemy 1.4 would
+            # otherwise default to NullPool here.
+            options.update(poolclass=QueuePool, pool_size=5, max_overflow=10)
+    engine = create_engine(url, **options)
+    if is_sqlite:
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+def make_session_factory(bind: Engine) -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=bind)
+
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DATABASE_URL = get_database_url()
+engine = make_engine(DATABASE_URL)
+SessionLocal = make_session_factory(engine)
 
 Base = declarative_base()
@@ -13,7 +13,8 @@ from __future__ import annotations
 import json
 import os
 import re
-from typing import Iterator
+from collections.abc import Iterable, Iterator
+from typing import NamedTuple
 
 DEFAULT_LOCAL_BACKUPS_ROOT = "/backupsLocales"
 """Default directory inside the container to store local remotes."""
@@ -25,36 +26,48 @@ LEGACY_DIRECTORIES_ENV = "RCLONE_LOCAL_DIRECTORIES"
 """Legacy environment variable that accepted multiple bind mounts."""
 
 __all__ = [
+    "DirEntry",
     "strip_enclosing_quotes",
     "parse_local_directory_config",
     "iter_directory_paths",
     "compute_bind_mounts",
+    "format_compose_bind_mounts",
     "render_compose_bind_mounts",
     "load_local_directory_entries",
     "get_local_backups_root",
 ]
 
 
+class DirEntry(NamedTuple):
+    """A labelled directory parsed from the configuration."""
+
+    label: str
+    path: str
+
+
 def strip_enclosing_quotes(value: str | None) -> str:
     """Return *value* without matching surrounding quotes."""
 
     if value is None:
         return ""
+    if value and not value[0].isspace() and not value[-1].isspace() and value[0] not in "\"'":
+        # Already clean: nothing to strip and no leading quote to remove.
+        return value
     text = value.strip()
     if len(text) >= 2 and text[0] == text[-1] and text[0] in {"\"", "'"}:
         text = text[1:-1].strip()
     return text
 
 
-def parse_local_directory_config(value: str) -> list[dict[str, str]]:
+def parse_local_directory_config(value: str) -> list[DirEntry]:
     """Parse a delimited list of labelled directories.
 
     The configuration accepts entries separated by ``;``, ``,`` or newlines.
     Each entry may optionally include a label prefix (``Label|/path``). The
-    function returns dictionaries with ``label`` and ``path`` keys.
+    function returns :class:`DirEntry` tuples.
     """
 
-    entries: list[dict[str, str]] = []
+    entries: list[DirEntry] = []
     if not value:
         return entries
     for raw in re.split(r"[;,\n]+", value):
@@ -70,7 +83,7 @@ def parse_local_directory_config(value: str) -> list[dict[str, str]]:
             cleaned_label = cleaned_path
         if not cleaned_path:
             continue
-        entries.append({"label": cleaned_label or cleaned_path, "path": cleaned_path})
+        entries.append(DirEntry(cleaned_label or cleaned_path, cleaned_path))
     return entries
 
 
@@ -78,8 +91,7 @@ def iter_directory_paths(value: str) -> Iterator[str]:
     """Yield cleaned path strings from a configuration value."""
 
     for entry in parse_local_directory_config(value):
-        raw_path = entry.get("path") if isinstance(entry, dict) else None
-        path = strip_enclosing_quotes(str(raw_path or ""))
+        path = strip_enclosing_quotes(entry.path)
         if not path:
             continue
         yield path
@@ -96,7 +108,7 @@ def get_local_backups_root() -> str:
     return os.path.abspath(expanded)
 
 
-def _default_local_directory_entries() -> list[dict[str, str]]:
+def _default_local_directory_entries() -> list[DirEntry]:
     """Return entries for the default local backups directory."""
 
     root_path = get_local_backups_root()
@@ -104,7 +116,7 @@ def _default_local_directory_entries() -> list[dict[str, str]]:
         os.makedirs(root_path, exist_ok=True)
     except OSError:
         return []
-    return [{"label": root_path, "path": root_path}]
+    return [DirEntry(root_path, root_path)]
 
 
 def load_local_directory_entries(value: str | None = None) -> list[dict[str, str]]:
@@ -117,8 +129,7 @@ def load_local_directory_entries(value: str | None = None) -> list[dict[str, str
     normalized: list[dict[str, str]] = []
     seen: set[str] = set()
     for entry in entries:
-        raw_path = entry.get("path") if isinstance(entry, dict) else None
-        path = strip_enclosing_quotes(str(raw_path or ""))
+        path = strip_enclosing_quotes(entry.path)
         if not path:
             continue
         expanded = os.path.abspath(os.path.expanduser(path))
@@ -128,8 +139,7 @@ def load_local_directory_entries(value: str | None = None) -> list[dict[str, str
         if normalized_key in seen:
             continue
         seen.add(normalized_key)
-        raw_label = entry.get("label") if isinstance(entry, dict) else None
-        label = strip_enclosing_quotes(str(raw_label or "")) or expanded
+        label = strip_enclosing_quotes(entry.label) or expanded
         normalized.append({"label": label, "path": expanded})
     return normalized
 
@@ -137,37 +147,30 @@ def load_local_directory_entries(value: str | None = None) -> list[dict[str, str
 def compute_bind_mounts(value: str) -> list[tuple[str, str]]:
     """Return unique ``(source, target)`` tuples for docker bind mounts."""
 
-    mounts: list[tuple[str, str]] = []
-    seen: set[str] = set()
-    directories = load_local_directory_entries(value)
-    for entry in directories:
-        path = strip_enclosing_quotes(entry.get("path") if isinstance(entry, dict) else "")
-        if not path:
-            continue
-        abs_path = os.path.abspath(os.path.expanduser(path))
-        if not abs_path:
-            continue
-        normalized = os.path.normcase(os.path.normpath(abs_path))
-        if normalized in seen:
-            continue
-        seen.add(normalized)
-        mounts.append((abs_path, abs_path))
-    return mounts
+    # Entries are already absolute and de-duplicated by load_local_directory_entries.
+    return [(entry["path"], entry["path"]) for entry in load_local_directory_entries(value)]
+
+
+def _yaml_quote(value: str) -> str:
+    """Return *value* as a double-quoted YAML scalar."""
+
+    if not (value.isascii() and value.isprintable()):
+        # JSON strings are valid YAML double-quoted scalars and escape
+        # newlines and other control characters.
+        return json.dumps(value)
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def format_compose_bind_mounts(mounts: Iterable[tuple[str, str]]) -> str:
+    """Render docker-compose volume entries for precomputed bind mounts."""
+
+    return "\n      ".join(
+        f"- type: bind\n        source: {_yaml_quote(source)}\n        target: {_yaml_quote(target)}"
+        for source, target in mounts
+    )
 
 
 def render_compose_bind_mounts(value: str) -> str:
     """Render docker-compose volume entries for the configured directories."""
 
-    mounts = compute_bind_mounts(value)
-    if not mounts:
-        return ""
-    rendered_entries: list[str] = []
-    for source, target in mounts:
-        quoted_source = json.dumps(source)
-        quoted_target = json.dumps(target)
-        rendered_entries.append(
-            "- type: bind\n"
-            f"        source: {quoted_source}\n"
-            f"        target: {quoted_target}"
-        )
-    return "\n      ".join(rendered_entries)
+    return format_compose_bind_mounts(compute_bind_mounts(value))
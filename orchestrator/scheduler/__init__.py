@@ -1,5 +1,8 @@
+import functools
+
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy.orm import load_only
 
 from orchestrator.app.database import SessionLocal
 from orchestrator.app.models import App
@@ -8,37 +11,50 @@ from orchestrator.services.client import BackupClient
 scheduler = BackgroundScheduler()
 
 
+@functools.lru_cache(maxsize=256)
+def _cron_trigger(expr: str) -> CronTrigger:
+    """Return the trigger for *expr*, reusing it for identical schedules."""
+    return CronTrigger.from_crontab(expr)
+
+
 def schedule_app_backups() -> None:
     """Load apps from the database and register their backup jobs."""
     with SessionLocal() as db:
-        apps = db.query(App).all()
-        for app in apps:
-            if not app.schedule:
-                continue
-            job_id = f"backup_{app.id}"
-            trigger = CronTrigger.from_crontab(app.schedule)
-            scheduler.add_job(
-                run_backup,
-                trigger,
-                args=[app.id],
-                id=job_id,
-                replace_existing=True,
-            )
+        rows = db.query(App.id, App.schedule).all()
+    for app_id, schedule in rows:
+        if not schedule:
+            continue
+        job_id = f"backup_{app_id}"
+        trigger = _cron_trigger(schedule)
+        scheduler.add_job(
+            run_backup,
+            trigger,
+            args=[app_id],
+            id=job_id,
+            replace_existing=True,
+        )
 
 
 def run_backup(app_id: int) -> None:
     """Execute backup for the given app id."""
     with SessionLocal() as db:
-        app = db.get(App, app_id)
+        app = db.get(
+            App,
+            app_id,
+            options=[
+                load_only(
+                    App.name, App.url, App.token, App.drive_folder_id, App.rclone_remote
+                )
+            ],
+        )
         if not app:
             return
-    client = BackupClient(app.url, app.token)
-    if client.check_capabilities():
-        remote = app.rclone_remote
-        if app.drive_folder_id:
-            client.export_backup(app.name, app.drive_folder_id, remote)
-        else:
-            client.export_backup(app.name, None, remote)
+        name, url, token = app.name, app.url, app.token
+        drive_folder_id, remote = app.drive_folder_id, app.rclone_remote
+    # The session is released before the (potentially long) export runs.
+    with BackupClient(url, token) as client:
+        if client.check_capabilities():
+            client.export_backup(name, drive_folder_id or None, remote)
 
 
 def start() -> None:
@@ -6,12 +6,13 @@ import os
 import sys
 from typing import Iterable
 
-from orchestrator.local_dirs import compute_bind_mounts, render_compose_bind_mounts
+from orchestrator.local_dirs import compute_bind_mounts, format_compose_bind_mounts
 
 
 def _ensure_directories(paths: Iterable[str]) -> None:
-    for path in paths:
-        os.makedirs(path, exist_ok=True)
+    for path in dict.fromkeys(paths):
+        if not os.path.isdir(path):
+            os.makedirs(path, exist_ok=True)
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -45,7 +46,7 @@ def main(argv: list[str] | None = None) -> int:
     mounts = compute_bind_mounts(raw_value)
     if args.ensure and mounts:
         _ensure_directories(source for source, _ in mounts)
-    snippet = render_compose_bind_mounts(raw_value)
+    snippet = format_compose_bind_mounts(mounts)
     if snippet:
         sys.stdout.write(snippet)
     return 0
@@ -1,9 +1,65 @@
 import datetime
+import fcntl
+import heapq
+import json
 import os
+import re
+import select
 import subprocess
-from typing import Iterable, Optional
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Self
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+
+_SPLICE_CHUNK = 1024 * 1024
+_PIPE_SIZE = 1024 * 1024
+_WRITEV_MAX_BUFFERS = 16
+_DELETE_WORKERS = 8
+_CAPABILITIES_TTL = 60.0
+_GLOB_SPECIAL = re.compile(r"([\\*?\[\]{}])")
+
+# Validated capabilities keyed by (base_url, token) with the time they were fetched.
+_CAPS_CACHE: dict[tuple[str, str], tuple[float, dict]] = {}
+
+
+def _is_int(value: object) -> bool:
+    return isinstance(value, int)
+
+
+def _is_str_list(value: object) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+# Capabilities contract: field name, whether it is required, the check its
+# value must pass and the error raised otherwise.
+_CAPABILITIES_SCHEMA: tuple[tuple[str, bool, Callable[[object], bool], str], ...] = (
+    ("version", True, lambda value: value == "v1", "Unsupported capabilities version: {value}"),
+    ("types", True, _is_str_list, "Invalid 'types' field in capabilities"),
+    ("est_seconds", False, _is_int, "Invalid 'est_seconds' field in capabilities"),
+    ("est_size", False, _is_int, "Invalid 'est_size' field in capabilities"),
+)
+
+
+def _validate_capabilities(data: object) -> None:
+    """Raise ``ValueError`` unless *data* follows the capabilities contract.
+
+    A payload that is not a JSON object raises ``TypeError`` instead.
+    """
+
+    if not isinstance(data, dict):
+        raise TypeError("Capabilities response must be a JSON object")
+    for name, required, check, error in _CAPABILITIES_SCHEMA:
+        value = data.get(name)
+        if value is None:
+            if required:
+                raise ValueError(f"Missing capability field: {name}")
+            continue
+        if not check(value):
+            raise ValueError(error.format(value=value))
 
 
 def _normalize_remote(remote: str) -> str:
@@ -14,76 +70,266 @@ def _normalize_remote(remote: str) -> str:
     return remote
 
 
+def _escape_glob(value: str) -> str:
+    """Escape rclone filter glob metacharacters in *value*."""
+
+    return _GLOB_SPECIAL.sub(r"\\\1", value)
+
+
+def _body_length(resp: requests.Response) -> int | None:
+    """Return the number of bytes *resp* will yield, if the headers say so.
+
+    Bodies with a transfer or content encoding are decoded on the way, so
+    their Content-Length does not describe what reaches the upload.
+    """
+
+    headers = resp.headers
+    if headers.get("Content-Encoding") or headers.get("Transfer-Encoding"):
+        return None
+    try:
+        length = int(headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+    return length if length >= 0 else None
+
+
+def _splice_source(resp: requests.Response) -> tuple[IO[bytes], int] | None:
+    """Return the socket file and body length when *resp* can be spliced.
+
+    Only plain HTTP bodies with a known length and no transfer or content
+    encoding qualify; anything else must be decoded in Python.
+    """
+
+    if not hasattr(os, "splice") or urlsplit(resp.url or "").scheme != "http":
+        return None
+    length = _body_length(resp)
+    if length is None:
+        return None
+    source = getattr(getattr(resp.raw, "_fp", None), "fp", None)
+    if source is None or not hasattr(source, "read1"):
+        return None
+    resp.raw.decode_content = False
+    return source, length
+
+
+def _splice_upload(source: IO[bytes], sink: IO[bytes], size: int, timeout: float) -> None:
+    """Move *size* bytes from a socket file into a pipe inside the kernel.
+
+    Bytes already buffered by *source* are written first. If the descriptors
+    do not support ``splice`` the remainder is copied through Python instead.
+    """
+
+    remaining = size
+    if remaining:
+        buffered = source.read1(min(remaining, _SPLICE_CHUNK))
+        if not buffered:
+            raise RuntimeError("backup stream ended early")
+        sink.write(buffered)
+        remaining -= len(buffered)
+    sink.flush()
+    sock_fd = source.fileno()
+    pipe_fd = sink.fileno()
+    while remaining:
+        try:
+            moved = os.splice(
+                sock_fd, pipe_fd, min(remaining, _SPLICE_CHUNK), flags=os.SPLICE_F_MOVE
+            )
+        except BlockingIOError:
+            # Sockets with a timeout are non-blocking at the descriptor level.
+            ready, _, _ = select.select([sock_fd], [], [], timeout)
+            if not ready:
+                raise TimeoutError("timed out reading backup stream")
+            continue
+        except OSError:
+            break
+        if not moved:
+            raise RuntimeError("backup stream ended early")
+        remaining -= moved
+    while remaining:
+        chunk = source.read(min(remaining, _SPLICE_CHUNK))
+        if not chunk:
+            raise RuntimeError("backup stream ended early")
+        sink.write(chunk)
+        remaining -= len(chunk)
+
+
+def _writev_all(fd: int, buffers: list[memoryview]) -> None:
+    """Write every buffer to *fd*, resuming after short writes."""
+
+    start = 0
+    while start < len(buffers):
+        written = os.writev(fd, buffers[start : start + _WRITEV_MAX_BUFFERS])
+        while start < len(buffers) and written >= len(buffers[start]):
+            written -= len(buffers[start])
+            start += 1
+        if written:
+            buffers[start] = buffers[start][written:]
+
+
+def _writev_chunks(fd: int, chunks: Iterable[bytes], limit: int) -> None:
+    """Write *chunks* to *fd* in batches of at most *limit* bytes."""
+
+    batch: list[memoryview] = []
+    pending = 0
+    for chunk in chunks:
+        view = memoryview(chunk)
+        for i in range(0, len(view), limit):
+            piece = view[i : i + limit]
+            batch.append(piece)
+            pending += len(piece)
+            if pending >= limit or len(batch) >= _WRITEV_MAX_BUFFERS:
+                _writev_all(fd, batch)
+                batch = []
+                pending = 0
+    if batch:
+        _writev_all(fd, batch)
+
+
+def _grow_pipe(pipe: IO[bytes]) -> None:
+    """Enlarge *pipe* so each upload chunk fits in one kernel buffer.
+
+    Linux pipes default to 64 KiB, which makes rclone and this process
+    trade many small reads and writes. Failing to resize (non-Linux, or a
+    size above ``/proc/sys/fs/pipe-max-size``) is harmless.
+    """
+
+    set_size = getattr(fcntl, "F_SETPIPE_SZ", None)
+    if set_size is None:
+        return
+    try:
+        fcntl.fcntl(pipe.fileno(), set_size, _PIPE_SIZE)
+    except OSError:
+        pass
+
+
 class BackupClient:
     """Client for interacting with app backup endpoints and uploading to Drive."""
 
-    def __init__(self, base_url: str, token: str, upload_buffer: int = 8 * 1024 * 1024):
+    def __init__(self, base_url: str, token: str, upload_buffer: int = 1024 * 1024):
         self.base_url = base_url.rstrip("/")
         self.token = token
         self.upload_buffer = upload_buffer
+        self.remote = _normalize_remote(os.environ.get("RCLONE_REMOTE", "drive:"))
+        self._session = requests.Session()
+        self._session.headers.update({"Authorization": f"Bearer {token}"})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
 
-    def _headers(self) -> dict[str, str]:
-        return {"Authorization": f"Bearer {self.token}"}
+    def close(self) -> None:
+        """Release the pooled connections held by the HTTP session."""
+        self._session.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def check_capabilities(self) -> bool:
         """Verify that the app exposes a supported capabilities contract."""
-        resp = requests.get(
-            f"{self.base_url}/backup/capabilities", headers=self._headers(), timeout=30
-        )
+        key = (self.base_url, self.token)
+        cached = _CAPS_CACHE.get(key)
+        if cached is not None and time.monotonic() - cached[0] < _CAPABILITIES_TTL:
+            return True
+        resp = self._session.get(f"{self.base_url}/backup/capabilities", timeout=30)
         resp.raise_for_status()
         data = resp.json()
         try:
-            version = data["version"]
-            types = data["types"]
-        except KeyError as exc:
-            raise ValueError(f"Missing capability field: {exc.args[0]}") from exc
-        if version != "v1":
-            raise ValueError(f"Unsupported capabilities version: {version}")
-        if not isinstance(types, list) or not all(isinstance(t, str) for t in types):
-            raise ValueError("Invalid 'types' field in capabilities")
-        est_seconds = data.get("est_seconds")
-        if est_seconds is not None and not isinstance(est_seconds, int):
-            raise ValueError("Invalid 'est_seconds' field in capabilities")
-        est_size = data.get("est_size")
-        if est_size is not None and not isinstance(est_size, int):
-            raise ValueError("Invalid 'est_size' field in capabilities")
+            _validate_capabilities(data)
+        except TypeError as exc:
+            raise ValueError(str(exc)) from exc
+        _CAPS_CACHE[key] = (time.monotonic(), data)
         return True
 
     def export_backup(
         self,
         app_name: str,
-        drive_folder_id: Optional[str] = None,
-        remote: Optional[str] = None,
+        drive_folder_id: str | None = None,
+        remote: str | None = None,
     ) -> None:
         """Request backup export and upload the result to Google Drive."""
         params = {}
         if drive_folder_id:
             params["drive_folder_id"] = drive_folder_id
-        resp = requests.post(
+        resp = self._session.post(
             f"{self.base_url}/backup/export",
-            headers=self._headers(),
             params=params or None,
             stream=True,
             timeout=300,
         )
         resp.raise_for_status()
-        self._upload_stream_to_drive(
-            resp.iter_content(64 * 1024), f"{app_name}.bak", remote
-        )
+        filename = f"{app_name}.bak"
+        source = _splice_source(resp)
+        if source is None:
+            self._upload_stream_to_drive(
+                resp.iter_content(self.upload_buffer), filename, remote, size=_body_length(resp)
+            )
+            return
+        sock_file, length = source
+        try:
+            self._rcat(
+                lambda stdin: _splice_upload(sock_file, stdin, length, timeout=300),
+                filename,
+                remote,
+                size=length,
+            )
+        finally:
+            resp.close()
 
     def _upload_stream_to_drive(
-        self, chunks: Iterable[bytes], filename: str, remote: Optional[str] = None
+        self,
+        chunks: Iterable[bytes],
+        filename: str,
+        remote: str | None = None,
+        size: int | None = None,
     ) -> None:
         """Upload an iterable of bytes to Google Drive using rclone rcat."""
-        remote = _normalize_remote(remote or os.environ.get("RCLONE_REMOTE", "drive:"))
+
+        def write(stdin: IO[bytes]) -> None:
+            try:
+                fd = stdin.fileno()
+            except (OSError, ValueError):
+                fd = None
+            if fd is not None and hasattr(os, "writev"):
+                # Gather small chunks into one writev call and skip the
+                # BufferedWriter, which would copy them into its own buffer.
+                stdin.flush()
+                _writev_chunks(fd, chunks, self.upload_buffer)
+                return
+            for chunk in chunks:
+                if len(chunk) <= self.upload_buffer:
+                    stdin.write(chunk)
+                    continue
+                view = memoryview(chunk)
+                for i in range(0, len(view), self.upload_buffer):
+                    stdin.write(view[i : i + self.upload_buffer])
+
+        self._rcat(write, filename, remote, size=size)
+
+    def _rcat(
+        self,
+        write: Callable[[IO[bytes]], None],
+        filename: str,
+        remote: str | None = None,
+        size: int | None = None,
+    ) -> None:
+        """Run ``rclone rcat`` and let *write* feed its stdin.
+
+        When *size* is known it is passed to rclone, which can then upload
+        the stream in a single pass instead of spooling or chunking an
+        unknown-length body.
+        """
+        remote = _normalize_remote(remote) if remote else self.remote
         cmd = ["rclone", "rcat", f"{remote}{filename}"]
+        if size is not None:
+            cmd += ["--size", str(size)]
         proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
         if proc.stdin is None:
             raise RuntimeError("Failed to open rclone stdin")
+        _grow_pipe(proc.stdin)
         try:
-            for chunk in chunks:
-                for i in range(0, len(chunk), self.upload_buffer):
-                    proc.stdin.write(chunk[i : i + self.upload_buffer])
+            write(proc.stdin)
         finally:
             proc.stdin.close()
             returncode = proc.wait()
@@ -94,28 +340,35 @@ class BackupClient:
         """Remove old backups exceeding the retention count for the given app."""
         if retention <= 0:
             return
-        remote = _normalize_remote(os.environ.get("RCLONE_REMOTE", "drive:"))
+        remote = self.remote
+        prefix = f"{app_name}_"
+        # Let rclone drop other apps' files so they are never serialized or parsed here.
         result = subprocess.run(
-            ["rclone", "lsl", remote],
+            ["rclone", "lsjson", "--files-only", "--include", f"{_escape_glob(prefix)}*", remote],
             capture_output=True,
             text=True,
             check=True,
         )
-        lines = [line for line in result.stdout.splitlines() if line.strip()]
         backups: list[tuple[datetime.datetime, str]] = []
-        for line in lines:
-            parts = line.split(None, 3)
-            if len(parts) < 4:
-                continue
-            _, date, time, name = parts
-            if not name.startswith(f"{app_name}_"):
+        for entry in json.loads(result.stdout or "[]"):
+            name = entry.get("Name") or ""
+            if not name.startswith(prefix):
                 continue
             try:
-                dt = datetime.datetime.fromisoformat(f"{date}T{time}")
-            except ValueError:
+                dt = datetime.datetime.fromisoformat(entry["ModTime"])
+            except (KeyError, TypeError, ValueError):
                 continue
             backups.append((dt, name))
-        backups.sort(reverse=True)
-        for _, name in backups[retention:]:
+        expired = [
+            name for _, name in heapq.nsmallest(max(0, len(backups) - retention), backups)
+        ]
+        if not expired:
+            return
+
+        def delete(name: str) -> None:
             subprocess.run(["rclone", "delete", f"{remote}{name}"], check=True)
 
+        # Each deletion pays rclone start-up plus a remote round-trip, so run them concurrently.
+        with ThreadPoolExecutor(max_workers=min(_DELETE_WORKERS, len(expired))) as executor:
+            list(executor.map(delete, expired))
+
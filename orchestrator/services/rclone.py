@@ -1,30 +1,49 @@
 import json
 import re
+import selectors
 import subprocess
 import threading
 import time
 import uuid
-from dataclasses import dataclass
+from collections.abc import Iterator
+from dataclasses import dataclass, field
 from typing import IO
 
+try:  # pragma: no cover - optional faster JSON parser
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
 
 @dataclass
 class AuthorizationSession:
     """State for an in-flight ``rclone authorize`` invocation."""
 
     remote: str
-    process: subprocess.Popen[str]
-    stdout: IO[str]
-    stdin: IO[str]
-
-
-_AUTH_SESSIONS: dict[str, AuthorizationSession] = {}
-_AUTH_LOCK = threading.Lock()
+    process: subprocess.Popen[bytes]
+    stdout: IO[bytes]
+    stdin: IO[bytes]
+    stderr: IO[bytes] | None = None
+    pending: bytearray = field(default_factory=bytearray)
+
+
+# Sessions are spread over independently locked shards so concurrent
+# authorization flows only contend when their ids land in the same bucket.
+_AUTH_SHARD_COUNT = 16
+_AUTH_SHARDS: tuple[tuple[threading.Lock, dict[str, AuthorizationSession]], ...] = tuple(
+    (threading.Lock(), {}) for _ in range(_AUTH_SHARD_COUNT)
+)
 _URL_TIMEOUT = 30.0
 _TOKEN_TIMEOUT = 60.0
+_READ_SIZE = 65536
+_URL_RE = re.compile(rb"https?://\S+")
+_TOKEN_START = ord("{")
+_TOKEN_END = ord("}")
+_QUOTE = ord('"')
+_BACKSLASH = ord("\\")
 
 
-def _stop_process(proc: subprocess.Popen[str]) -> None:
+def _stop_process(proc: subprocess.Popen[bytes]) -> None:
     if proc.poll() is None:
         proc.terminate()
         try:
@@ -33,10 +52,17 @@ def _stop_process(proc: subprocess.Popen[str]) -> None:
             proc.kill()
 
 
+def _auth_shard(
+    session_id: str,
+) -> tuple[threading.Lock, dict[str, AuthorizationSession]]:
+    return _AUTH_SHARDS[hash(session_id) % _AUTH_SHARD_COUNT]
+
+
 def _cleanup_session(session_id: str, terminate: bool = False) -> None:
     session: AuthorizationSession | None
-    with _AUTH_LOCK:
-        session = _AUTH_SESSIONS.pop(session_id, None)
+    lock, sessions = _auth_shard(session_id)
+    with lock:
+        session = sessions.pop(session_id, None)
     if not session:
         return
     proc = session.process
@@ -48,7 +74,9 @@ def _cleanup_session(session_id: str, terminate: bool = False) -> None:
                 proc.wait(timeout=5)
             except subprocess.TimeoutExpired:
                 proc.kill()
-        for stream in (session.stdout, session.stdin):
+        for stream in (session.stdout, session.stdin, session.stderr):
+            if stream is None:
+                continue
             try:
                 stream.close()
             except Exception:
@@ -63,37 +91,111 @@ def _cleanup_session(session_id: str, terminate: bool = False) -> None:
 
 def _cleanup_sessions_for_remote(remote: str) -> None:
     pending: list[str] = []
-    with _AUTH_LOCK:
-        for session_id, session in _AUTH_SESSIONS.items():
-            if session.remote == remote:
-                pending.append(session_id)
+    for lock, sessions in _AUTH_SHARDS:
+        with lock:
+            for session_id, session in sessions.items():
+                if session.remote == remote:
+                    pending.append(session_id)
     for session_id in pending:
         _cleanup_session(session_id, terminate=True)
 
 
-def _wait_for_authorization_url(proc: subprocess.Popen[str]) -> str:
-    assert proc.stdout is not None
-    start = time.monotonic()
-    while True:
-        if _URL_TIMEOUT and time.monotonic() - start > _URL_TIMEOUT:
-            raise RuntimeError("timed out waiting for authorization URL")
-        line = proc.stdout.readline()
-        if not line:
-            if proc.poll() is not None:
-                break
-            time.sleep(0.1)
-            continue
-        match = re.search(r"https?://\S+", line)
+def _iter_reads(
+    stream: IO[bytes],
+    buffer: bytearray,
+    timeout: float,
+    message: str,
+    drain: tuple[tuple[IO[bytes], bytearray], ...] = (),
+) -> Iterator[None]:
+    """Yield whenever *buffer* may hold new output from *stream*.
+
+    The first yield happens before any read so callers can scan bytes left
+    over from an earlier reader. Each ``(stream, buffer)`` pair in *drain* is
+    read into its own buffer as data arrives so the child never blocks on a
+    full pipe nobody is watching. The generator returns at end of file on
+    *stream* and raises :class:`RuntimeError` with *message* once *timeout*
+    expires.
+    """
+
+    deadline = time.monotonic() + timeout if timeout else None
+    with selectors.DefaultSelector() as selector:
+        selector.register(stream, selectors.EVENT_READ, buffer)
+        for other, other_buffer in drain:
+            selector.register(other, selectors.EVENT_READ, other_buffer)
+        while True:
+            yield
+            while True:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RuntimeError(message)
+                ready = selector.select(remaining)
+                if ready:
+                    break
+            for key, _ in ready:
+                # ``read1`` returns whatever a single read yields, so partial
+                # output (such as JSON without a trailing newline) is seen at once.
+                chunk = key.fileobj.read1(_READ_SIZE)
+                if chunk:
+                    key.data.extend(chunk)
+                elif key.fileobj is stream:
+                    return
+                else:
+                    selector.unregister(key.fileobj)
+
+
+def _search_complete_lines(data: bytearray, pos: int) -> tuple[str | None, int]:
+    """Search the complete lines of *data* after *pos* for the auth URL.
+
+    Returns the URL, if any, and the offset where the next search starts.
+    """
+
+    end = data.rfind(b"\n") + 1
+    match = _URL_RE.search(data, pos, end)
+    return (match.group().decode() if match else None), max(pos, end)
+
+
+def _wait_for_authorization_url(
+    proc: subprocess.Popen[bytes], buffer: bytearray
+) -> str:
+    """Return the authorization URL rclone prints on stderr or stdout.
+
+    rclone logs the URL on stderr, but some builds and wrappers print it on
+    stdout, so both streams are searched. Everything read from stdout stays
+    in *buffer* for the token reader.
+    """
+
+    assert proc.stdout is not None and proc.stderr is not None
+    # Only complete lines are searched so a URL split across reads is never
+    # returned truncated; the offsets skip the lines already scanned.
+    log = bytearray()
+    log_pos = out_pos = 0
+    for _ in _iter_reads(
+        proc.stderr,
+        log,
+        _URL_TIMEOUT,
+        "timed out waiting for authorization URL",
+        drain=((proc.stdout, buffer),),
+    ):
+        url, log_pos = _search_complete_lines(log, log_pos)
+        if url is None:
+            url, out_pos = _search_complete_lines(buffer, out_pos)
+        if url is not None:
+            return url
+    for output, pos in ((log, log_pos), (buffer, out_pos)):
+        match = _URL_RE.search(output, pos)
         if match:
-            return match.group(0)
+            return match.group().decode()
     raise RuntimeError("authorization URL not found")
 
 
 def get_authorization_session(session_id: str) -> AuthorizationSession | None:
     """Return the cached session for *session_id* if available."""
 
-    with _AUTH_LOCK:
-        return _AUTH_SESSIONS.get(session_id)
+    lock, sessions = _auth_shard(session_id)
+    with lock:
+        return sessions.get(session_id)
 
 
 def authorize_drive(remote: str) -> tuple[str, str]:
@@ -114,68 +216,102 @@ def authorize_drive(remote: str) -> tuple[str, str]:
                 "--manual",
             ],
             stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
+            stderr=subprocess.PIPE,
             stdin=subprocess.PIPE,
-            text=True,
+            bufsize=_READ_SIZE,
         )
     except FileNotFoundError as exc:
         raise RuntimeError("rclone is not installed") from exc
 
-    if proc.stdout is None or proc.stdin is None:
+    if proc.stdout is None or proc.stdin is None or proc.stderr is None:
         _stop_process(proc)
         raise RuntimeError("failed to capture rclone output")
 
+    pending = bytearray()
     try:
-        url = _wait_for_authorization_url(proc)
+        url = _wait_for_authorization_url(proc, pending)
     except Exception:
         _stop_process(proc)
         raise
 
     session_id = uuid.uuid4().hex
     _cleanup_sessions_for_remote(remote)
-    with _AUTH_LOCK:
-        _AUTH_SESSIONS[session_id] = AuthorizationSession(
-            remote=remote, process=proc, stdout=proc.stdout, stdin=proc.stdin
+    lock, sessions = _auth_shard(session_id)
+    with lock:
+        sessions[session_id] = AuthorizationSession(
+            remote=remote,
+            process=proc,
+            stdout=proc.stdout,
+            stdin=proc.stdin,
+            stderr=proc.stderr,
+            pending=pending,
         )
     return session_id, url
 
 
+def _is_json(data: bytes) -> bool:
+    try:
+        if orjson is not None:
+            orjson.loads(data)
+        else:
+            json.loads(data)
+    except ValueError:
+        return False
+    return True
+
+
 def _wait_for_token(session: AuthorizationSession) -> str:
-    proc = session.process
-    stdout = session.stdout
-    start = time.monotonic()
-    collecting = False
-    buffer = ""
-    while True:
-        if _TOKEN_TIMEOUT and time.monotonic() - start > _TOKEN_TIMEOUT:
-            raise RuntimeError("timed out waiting for authorization token")
-        line = stdout.readline()
-        if not line:
-            if proc.poll() is not None:
-                break
-            time.sleep(0.1)
-            continue
-        stripped = line.strip()
-        if not stripped:
-            continue
-        if not collecting and "{" not in stripped:
-            continue
-        collecting = True
-        buffer += line
-        candidate = buffer.strip()
-        try:
-            json.loads(candidate)
-            return candidate
-        except json.JSONDecodeError:
-            continue
+    # Track brace depth (ignoring braces inside string literals) so the token
+    # is parsed once when its outermost object closes rather than per line.
+    buffer = session.pending
+    pos = 0
+    start = -1
+    depth = 0
+    in_string = False
+    escaped = False
+    drain = ((session.stderr, bytearray()),) if session.stderr is not None else ()
+    for _ in _iter_reads(
+        session.stdout,
+        buffer,
+        _TOKEN_TIMEOUT,
+        "timed out waiting for authorization token",
+        drain=drain,
+    ):
+        while pos < len(buffer):
+            if not depth:
+                start = buffer.find(_TOKEN_START, pos)
+                if start < 0:
+                    pos = len(buffer)
+                    break
+                pos = start
+            char = buffer[pos]
+            pos += 1
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == _BACKSLASH:
+                    escaped = True
+                elif char == _QUOTE:
+                    in_string = False
+            elif char == _QUOTE:
+                in_string = True
+            elif char == _TOKEN_START:
+                depth += 1
+            elif char == _TOKEN_END:
+                depth -= 1
+                if not depth:
+                    candidate = bytes(buffer[start:pos])
+                    if not _is_json(candidate):
+                        continue
+                    del buffer[:pos]
+                    return candidate.decode("utf-8", errors="replace")
     raise RuntimeError("failed to read authorization token from rclone")
 
 
 def complete_drive_authorization(session_id: str, code: str) -> str:
     """Submit *code* to the pending session and return the token JSON."""
 
-    with _AUTH_LOCK:
-        session = _AUTH_SESSIONS.get(session_id)
+    session = get_authorization_session(session_id)
     if not session:
         raise RuntimeError("authorization session not found")
 
@@ -184,7 +320,7 @@ def complete_drive_authorization(session_id: str, code: str) -> str:
         _cleanup_session(session_id)
         raise RuntimeError("authorization session is no longer active")
 
-    submission = code.rstrip("\n") + "\n"
+    submission = (code.rstrip("\n") + "\n").encode()
     try:
         session.stdin.write(submission)
         session.stdin.flush()
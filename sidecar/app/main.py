@@ -2,19 +2,34 @@
 
 from __future__ import annotations
 
+import copy
+import functools
+import hashlib
 import hmac
+import json
+import logging
 import os
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Optional
 
 import yaml
 from flask import Flask, Response, jsonify, request, stream_with_context
+from werkzeug.wsgi import wrap_file
 
 from .exceptions import ConfigError, StrategyExecutionError, UnauthorizedError
 from .strategies import create_strategy
-from .strategies.base import ArtifactMetadata, BackupStrategy
+from .strategies.base import CHUNK_SIZE, ArtifactMetadata, BackupStrategy, FileBasedStrategy
+
+logger = logging.getLogger(__name__)
+
+# libyaml's C loader is several times faster; fall back when PyYAML was built
+# without it.
+try:
+    from yaml import CSafeLoader as _YAML_LOADER
+except ImportError:  # pragma: no cover - depends on how PyYAML was built
+    from yaml import SafeLoader as _YAML_LOADER
 
 CONFIG_PATH_ENV = "SIDECAR_CONFIG_PATH"
 DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[1] / "config" / "config.yaml"
@@ -26,6 +41,16 @@ class CapabilitiesConfig:
     types: list[str]
     est_seconds: Optional[int] = None
     est_size: Optional[int] = None
+    payload: dict[str, Any] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # The capabilities response only depends on the config, so it is
+        # assembled once when the config is loaded.
+        self.payload = {"version": self.version, "types": self.types}
+        if self.est_seconds is not None:
+            self.payload["est_seconds"] = self.est_seconds
+        if self.est_size is not None:
+            self.payload["est_size"] = self.est_size
 
 
 @dataclass
@@ -52,6 +77,11 @@ class PathsConfig:
 @dataclass
 class SecretsConfig:
     api_token: str
+    api_token_bytes: bytes = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Encoded once so every request compares bytes directly.
+        self.api_token_bytes = self.api_token.encode("utf-8")
 
 
 @dataclass
@@ -68,24 +98,50 @@ class SidecarConfig:
     secrets: SecretsConfig
 
 
+_BEARER_PATTERN = re.compile(r"bearer \s*(?P<token>\S.*?)\s*", re.IGNORECASE | re.DOTALL)
 _ENV_VAR_PATTERN = re.compile(r"\$\{(?P<name>[A-Za-z_][A-Za-z0-9_]*)(?::-(?P<default>[^}]*))?\}")
 
 
-def _substitute_env_vars(raw_text: str) -> str:
-    """Replace ${VAR} or ${VAR:-default} occurrences with environment values."""
+@functools.lru_cache(maxsize=16)
+def _referenced_env_vars(raw_text: str) -> tuple[str, ...]:
+    """Return the distinct variable names referenced by *raw_text*, in order."""
+
+    if "${" not in raw_text:
+        return ()
+    return tuple(dict.fromkeys(match.group("name") for match in _ENV_VAR_PATTERN.finditer(raw_text)))
+
+
+@functools.lru_cache(maxsize=16)
+def _substitute_cached(raw_text: str, environment: tuple[Optional[str], ...]) -> str:
+    # Each referenced variable was looked up once by the caller; *environment*
+    # holds those values in the order of _referenced_env_vars.
+    lookups = dict(zip(_referenced_env_vars(raw_text), environment))
 
     def replace(match: re.Match[str]) -> str:
-        name = match.group("name")
-        default = match.group("default")
+        name, default = match.group("name", "default")
+        value = lookups[name]
+        if value is not None:
+            return value
         if default is not None:
-            return os.getenv(name, default)
-        if name not in os.environ:
-            raise ConfigError(f"Missing required environment variable: {name}")
-        return os.environ[name]
+            return default
+        raise ConfigError(f"Missing required environment variable: {name}")
 
     return _ENV_VAR_PATTERN.sub(replace, raw_text)
 
 
+def _substitute_env_vars(raw_text: str) -> str:
+    """Replace ${VAR} or ${VAR:-default} occurrences with environment values.
+
+    Results are memoized on the text and the values of the variables it
+    references, so unrelated environment changes do not invalidate them.
+    """
+
+    if "${" not in raw_text:
+        return raw_text
+    environment = tuple(os.environ.get(name) for name in _referenced_env_vars(raw_text))
+    return _substitute_cached(raw_text, environment)
+
+
 def _to_int(value: object, *, field: str) -> int:
     try:
         return int(value)
@@ -93,14 +149,17 @@ def _to_int(value: object, *, field: str) -> int:
         raise ConfigError(f"Invalid integer for {field}: {value!r}") from exc
 
 
-def _load_yaml(path: Path) -> dict:
+def _read_config_source(path: Path) -> str:
     try:
-        raw_text = path.read_text()
+        return path.read_text()
     except OSError as exc:
         raise ConfigError(f"Unable to read config file {path}: {exc}") from exc
+
+
+def _parse_yaml(raw_text: str) -> dict:
     substituted = _substitute_env_vars(raw_text)
     try:
-        data = yaml.safe_load(substituted) or {}
+        data = yaml.load(substituted, Loader=_YAML_LOADER) or {}
     except yaml.YAMLError as exc:
         raise ConfigError(f"Invalid YAML configuration: {exc}") from exc
     if not isinstance(data, dict):
@@ -180,13 +239,20 @@ def _load_app(data: dict) -> AppConfig:
     return AppConfig(port=port)
 
 
-def load_config(path: Optional[os.PathLike[str] | str] = None) -> SidecarConfig:
-    """Load sidecar configuration from disk, applying environment substitutions."""
+@functools.lru_cache(maxsize=8)
+def _read_config_cached(path: Path, stat_key: tuple[int, int, int, int]) -> tuple[str, tuple[str, ...]]:
+    """Return the config text and the environment variables it references."""
 
-    config_path = Path(path or os.environ.get(CONFIG_PATH_ENV, DEFAULT_CONFIG_PATH))
-    if not config_path.exists():
-        raise ConfigError(f"Configuration file not found: {config_path}")
-    data = _load_yaml(config_path)
+    raw_text = _read_config_source(path)
+    return raw_text, _referenced_env_vars(raw_text)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config_cached(
+    path: Path, stat_key: tuple[int, int, int, int], environment: tuple[Optional[str], ...]
+) -> SidecarConfig:
+    raw_text, _ = _read_config_cached(path, stat_key)
+    data = _parse_yaml(raw_text)
     return SidecarConfig(
         app=_load_app(data),
         capabilities=_load_capabilities(data),
@@ -196,20 +262,52 @@ def load_config(path: Optional[os.PathLike[str] | str] = None) -> SidecarConfig:
     )
 
 
-def _validate_token(provided: str, expected: str) -> None:
+def load_config(path: Optional[os.PathLike[str] | str] = None) -> SidecarConfig:
+    """Load sidecar configuration from disk, applying environment substitutions.
+
+    Parsed configurations are cached on the file's
+    ``(mtime_ns, device, inode, size)`` together with the values of the
+    environment variables the file references, so repeated loads of an
+    unchanged file skip the YAML parse. Each caller gets its own deep copy,
+    so changing a returned config never leaks into the cache.
+    """
+
+    config_path = Path(path or os.environ.get(CONFIG_PATH_ENV, DEFAULT_CONFIG_PATH))
+    try:
+        stat = config_path.stat()
+    except FileNotFoundError:
+        raise ConfigError(f"Configuration file not found: {config_path}") from None
+    except OSError as exc:
+        raise ConfigError(f"Unable to read config file {config_path}: {exc}") from exc
+    stat_key = (stat.st_mtime_ns, stat.st_dev, stat.st_ino, stat.st_size)
+    _, names = _read_config_cached(config_path, stat_key)
+    environment = tuple(os.environ.get(name) for name in names)
+    return copy.deepcopy(_load_config_cached(config_path, stat_key, environment))
+
+
+def _clear_config_cache() -> None:
+    """Drop every cached configuration so the next load reparses from disk."""
+
+    _read_config_cached.cache_clear()
+    _load_config_cached.cache_clear()
+
+
+# Mirrors functools.lru_cache so callers (tests, reload tooling) can reset it.
+load_config.cache_clear = _clear_config_cache  # type: ignore[attr-defined]
+
+
+def _validate_token(provided: str, expected: bytes) -> None:
     if not provided:
         raise UnauthorizedError("Missing authorization token")
-    if not hmac.compare_digest(provided, expected):
+    if not hmac.compare_digest(provided.encode("utf-8"), expected):
         raise UnauthorizedError("Invalid authorization token")
 
 
 def _extract_bearer_token(header_value: Optional[str]) -> str:
-    if not header_value or " " not in header_value:
+    match = _BEARER_PATTERN.fullmatch(header_value) if header_value else None
+    if match is None:
         raise UnauthorizedError("Missing Bearer token")
-    scheme, token = header_value.split(" ", 1)
-    if scheme.lower() != "bearer" or not token.strip():
-        raise UnauthorizedError("Missing Bearer token")
-    return token.strip()
+    return match.group("token")
 
 
 def _execute_strategy(
@@ -240,52 +338,72 @@ def create_app(*, config: Optional[SidecarConfig] = None, config_path: Optional[
     def _handle_config_error(error: ConfigError):
         return jsonify({"error": str(error)}), 500
 
-    def _require_token() -> str:
-        header = request.headers.get("Authorization")
-        token = _extract_bearer_token(header)
-        expected = app.config["SIDECAR_CONFIG"].secrets.api_token
-        _validate_token(token, expected)
-        return token
+    expected_token = config.secrets.api_token_bytes
+
+    @app.before_request
+    def _require_token() -> None:
+        # Unknown URLs fall through to the regular 404 handling.
+        if request.endpoint in (None, "static"):
+            return
+        token = _extract_bearer_token(request.headers.get("Authorization"))
+        _validate_token(token, expected_token)
+
+    # Capabilities are static for the lifetime of the app, so the response
+    # body is serialized once here instead of on every request.
+    capabilities_body = json.dumps(config.capabilities.payload, separators=(",", ":")).encode()
+    capabilities_etag = hashlib.sha256(capabilities_body).hexdigest()[:16]
 
     @app.route("/backup/capabilities", methods=["GET"])
     def capabilities() -> Response:
-        _require_token()
-        config = app.config["SIDECAR_CONFIG"]
-        payload = {
-            "version": config.capabilities.version,
-            "types": config.capabilities.types,
-        }
-        if config.capabilities.est_seconds is not None:
-            payload["est_seconds"] = config.capabilities.est_seconds
-        if config.capabilities.est_size is not None:
-            payload["est_size"] = config.capabilities.est_size
-        return jsonify(payload)
+        if request.if_none_match.contains(capabilities_etag):
+            response = Response(status=304)
+        else:
+            response = Response(capabilities_body, mimetype="application/json")
+        response.set_etag(capabilities_etag)
+        return response
 
     @app.route("/backup/export", methods=["POST"])
     def export() -> Response:
-        _require_token()
         config = app.config["SIDECAR_CONFIG"]
         drive_folder_id = request.args.get("drive_folder_id")
         metadata, strategy = _execute_strategy(config, drive_folder_id)
 
-        def generate():
+        if isinstance(strategy, FileBasedStrategy):
+            # Hand the file opened during prepare to the WSGI server so it can
+            # use wsgi.file_wrapper (sendfile) when available. The descriptor
+            # keeps the data readable, so the artifact is unlinked right away
+            # and an aborted download cannot leave it behind.
+            handle = strategy.open_artifact()
             try:
-                for chunk in strategy.stream():
-                    if chunk:
-                        yield chunk
-            finally:
+                strategy.cleanup()
+            except Exception:
+                pass
+            response = Response(
+                wrap_file(request.environ, handle, CHUNK_SIZE),
+                mimetype=metadata.content_type,
+                direct_passthrough=True,
+            )
+        else:
+            def generate():
                 try:
-                    strategy.cleanup()
-                except Exception:
-                    pass
-
-        response = Response(stream_with_context(generate()), mimetype=metadata.content_type)
+                    for chunk in strategy.stream():
+                        if chunk:
+                            yield chunk
+                finally:
+                    try:
+                        strategy.cleanup()
+                    except Exception:
+                        pass
+
+            response = Response(stream_with_context(generate()), mimetype=metadata.content_type)
         response.headers["Content-Disposition"] = f'attachment; filename="{metadata.filename}"'
         if metadata.size is not None:
             response.headers["Content-Length"] = str(metadata.size)
         response.headers["X-Backup-Format"] = metadata.format
         if metadata.checksum is not None:
             response.headers["X-Checksum-Sha256"] = metadata.checksum
+        if metadata.checksum_blake3 is not None:
+            response.headers["X-Checksum-Blake3"] = metadata.checksum_blake3
         if drive_folder_id:
             response.headers["X-Drive-Folder-Id"] = drive_folder_id
         return response
@@ -294,6 +412,8 @@ def create_app(*, config: Optional[SidecarConfig] = None, config_path: Optional[
 
 
 def main() -> None:
+    if _YAML_LOADER is yaml.SafeLoader:
+        logger.warning("PyYAML is missing libyaml bindings; using the slower pure-Python loader")
     config = load_config()
     app = create_app(config=config)
     app.run(host="0.0.0.0", port=config.app.port)
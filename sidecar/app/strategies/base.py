@@ -4,15 +4,67 @@ from __future__ import annotations
 
 import abc
 import hashlib
+import os
 import shutil
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterator, Optional
+from typing import IO, Iterator, NamedTuple, Optional
 
 from ..exceptions import StrategyExecutionError
 
+try:  # pragma: no cover - optional dependency
+    import blake3
+except ImportError:  # pragma: no cover - BLAKE3 checksums are optional
+    blake3 = None
 
-CHUNK_SIZE = 65536
+# 1 MiB is a multiple of every common filesystem block size and keeps the
+# per-chunk overhead of reads, hashing and WSGI writes low.
+CHUNK_SIZE = 1024 * 1024
+
+
+class ArtifactChecksum(NamedTuple):
+    """Digests and size of an artifact, gathered in a single pass."""
+
+    sha256: str
+    size: int
+    blake3: Optional[str] = None
+
+
+class ArtifactDigest:
+    """Feed bytes to SHA-256 and, when the package is installed, BLAKE3."""
+
+    def __init__(self) -> None:
+        self._sha256 = hashlib.sha256()
+        self._blake3 = blake3.blake3(max_threads=blake3.blake3.AUTO) if blake3 is not None else None
+        self._size = 0
+
+    def update(self, data) -> None:
+        self._sha256.update(data)
+        if self._blake3 is not None:
+            self._blake3.update(data)
+        self._size += len(data)
+
+    def result(self) -> ArtifactChecksum:
+        return ArtifactChecksum(
+            sha256=self._sha256.hexdigest(),
+            size=self._size,
+            blake3=self._blake3.hexdigest() if self._blake3 is not None else None,
+        )
+
+
+def copy_with_digest(source: IO[bytes], digest: ArtifactDigest, sink: Optional[IO[bytes]] = None) -> None:
+    """Read *source* to the end, hashing every chunk and writing it to *sink*."""
+
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    while True:
+        count = source.readinto(buffer)
+        if not count:
+            break
+        chunk = view[:count]
+        digest.update(chunk)
+        if sink is not None:
+            sink.write(chunk)
 
 
 @dataclass
@@ -25,6 +77,9 @@ class ArtifactMetadata:
     checksum: Optional[str]
     format: str
     content_type: str
+    checksum_blake3: Optional[str] = None
+    # Reader left open (at offset 0) by prepare so export need not reopen it.
+    handle: Optional[IO[bytes]] = None
 
 
 class BackupStrategy(abc.ABC):
@@ -61,7 +116,15 @@ class BackupStrategy(abc.ABC):
             raise StrategyExecutionError("Strategy has not been prepared yet")
         return self._metadata
 
-    def _register_metadata(self, path: Path, *, size: Optional[int], checksum: Optional[str]) -> ArtifactMetadata:
+    def _register_metadata(
+        self,
+        path: Path,
+        *,
+        size: Optional[int],
+        checksum: Optional[str],
+        checksum_blake3: Optional[str] = None,
+        handle: Optional[IO[bytes]] = None,
+    ) -> ArtifactMetadata:
         self._metadata = ArtifactMetadata(
             path=path,
             filename=self._artifact_config.filename,
@@ -69,6 +132,8 @@ class BackupStrategy(abc.ABC):
             checksum=checksum,
             format=self._artifact_config.format,
             content_type=self._artifact_config.content_type,
+            checksum_blake3=checksum_blake3,
+            handle=handle,
         )
         return self._metadata
 
@@ -88,31 +153,96 @@ class FileBasedStrategy(BackupStrategy):
         if self.paths.temp_dump.exists():
             self.paths.temp_dump.unlink()
 
-    def _move_to_artifact(self, source: Path) -> Path:
+    def _clear_artifact_path(self) -> None:
         if self._artifact_path.exists():
             if self._artifact_path.is_dir():
                 raise StrategyExecutionError(
                     f"Artifact path points to a directory: {self._artifact_path}"
                 )
             self._artifact_path.unlink()
+
+    def _move_to_artifact(self, source: Path) -> Path:
+        self._clear_artifact_path()
         shutil.move(str(source), self._artifact_path)
         return self._artifact_path
 
-    def _compute_checksum(self, path: Path) -> tuple[str, int]:
-        digest = hashlib.sha256()
-        size = 0
-        with path.open("rb") as handle:
-            for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
-                digest.update(chunk)
-                size += len(chunk)
-        return digest.hexdigest(), size
+    def _same_filesystem(self, source: Path) -> bool:
+        return os.stat(source).st_dev == os.stat(self._artifact_path.parent).st_dev
+
+    def _store_artifact(
+        self, source: Path, *, known: Optional[ArtifactChecksum] = None
+    ) -> ArtifactMetadata:
+        """Move *source* to the artifact path and register its metadata.
+
+        On the same filesystem the move is a rename followed by a checksum pass.
+        Across filesystems the copy and the checksum share one read of *source*.
+        *known* holds checksums the caller already computed, which skips the
+        checksum pass after a rename. Either way the artifact is opened once
+        and the handle, rewound, is kept on the metadata for streaming.
+        """
+
+        if self._same_filesystem(source):
+            path = self._move_to_artifact(source)
+            handle = path.open("rb")
+            try:
+                checksums = known if known is not None else self._compute_checksum(handle)
+                handle.seek(0)
+            except BaseException:
+                handle.close()
+                raise
+        else:
+            self._clear_artifact_path()
+            path = self._artifact_path
+            digest = ArtifactDigest()
+            handle = path.open("w+b")
+            try:
+                with source.open("rb") as src:
+                    copy_with_digest(src, digest, handle)
+                handle.flush()
+                handle.seek(0)
+                shutil.copystat(source, path)
+                source.unlink()
+            except BaseException:
+                handle.close()
+                raise
+            checksums = digest.result()
+        return self._register_metadata(
+            path,
+            size=checksums.size,
+            checksum=checksums.sha256,
+            checksum_blake3=checksums.blake3,
+            handle=handle,
+        )
+
+    def _compute_checksum(self, handle: IO[bytes]) -> ArtifactChecksum:
+        fd = handle.fileno()
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if blake3 is not None:
+            # Both digests share one read of the file.
+            digest = ArtifactDigest()
+            copy_with_digest(handle, digest)
+            return digest.result()
+        size = os.fstat(fd).st_size
+        # file_digest reads into one reused buffer; each update() on a
+        # large chunk releases the GIL while it hashes.
+        checksum = hashlib.file_digest(handle, "sha256").hexdigest()
+        return ArtifactChecksum(sha256=checksum, size=size)
+
+    def open_artifact(self) -> IO[bytes]:
+        """Return a reader for the artifact, reusing the handle kept by prepare."""
+
+        metadata = self.metadata
+        if metadata.handle is not None:
+            handle, metadata.handle = metadata.handle, None
+            return handle
+        return self._artifact_path.open("rb")
 
     def stream(self) -> Iterator[bytes]:
-        handle = self._artifact_path.open("rb")
+        handle = self.open_artifact()
         try:
             for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
-                if chunk:
-                    yield chunk
+                yield chunk
         finally:
             handle.close()
 
@@ -3,12 +3,18 @@
 from __future__ import annotations
 
 import os
+import re
+import shlex
+import shutil
 import subprocess
+import tempfile
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Any, Iterable, Optional
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping, NamedTuple, Optional
 
 from ..exceptions import ConfigError, StrategyExecutionError
-from .base import FileBasedStrategy
+from .base import ArtifactChecksum, ArtifactDigest, FileBasedStrategy, copy_with_digest
 
 
 def ensure_command_list(value: Any, *, field: str) -> list[str]:
@@ -21,6 +27,83 @@ def ensure_command_list(value: Any, *, field: str) -> list[str]:
     return [item for item in value if item]
 
 
+_SHELL_METACHARACTERS = re.compile(r"[|&;<>$`()*?\[\]{}~!#\n]")
+_ENV_ASSIGNMENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+# Purely cosmetic variables that can be large and only bloat every execve.
+_DROPPED_ENV_VARS = ("LS_COLORS", "LSCOLORS")
+# POSIX special built-ins, the regular built-ins that only make sense inside
+# a shell (they have no standalone binary or act on the shell's own state),
+# plus the common ``local``/``source`` extensions.
+_SHELL_BUILTINS = frozenset(
+    {
+        ".",
+        ":",
+        "alias",
+        "bg",
+        "break",
+        "cd",
+        "command",
+        "continue",
+        "eval",
+        "exec",
+        "exit",
+        "export",
+        "fc",
+        "fg",
+        "getopts",
+        "hash",
+        "jobs",
+        "local",
+        "read",
+        "readonly",
+        "return",
+        "set",
+        "shift",
+        "source",
+        "times",
+        "trap",
+        "type",
+        "ulimit",
+        "umask",
+        "unalias",
+        "unset",
+        "wait",
+    }
+)
+
+
+class PreparedCommand(NamedTuple):
+    """A configured command, tokenized when it does not need a shell."""
+
+    text: str
+    argv: Optional[tuple[str, ...]]
+    executable: Optional[str] = None
+
+
+def prepare_command(command: str, *, search_path: Optional[str] = None) -> PreparedCommand:
+    """Split *command* into argv unless it relies on shell features.
+
+    Commands using expansions, redirections, pipes, globs, builtins or
+    variable assignments keep ``argv=None`` and run through ``/bin/sh``.
+    Bare program names are resolved against *search_path* (``PATH`` by
+    default) here. Strategies are built per export, so this only saves
+    repeated lookups among the commands of a single run.
+    """
+
+    if _SHELL_METACHARACTERS.search(command):
+        return PreparedCommand(command, None)
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return PreparedCommand(command, None)
+    if not argv or argv[0] in _SHELL_BUILTINS or _ENV_ASSIGNMENT.match(argv[0]):
+        return PreparedCommand(command, None)
+    executable = None
+    if "/" not in argv[0]:
+        executable = shutil.which(argv[0], path=search_path)
+    return PreparedCommand(command, tuple(argv), executable)
+
+
 class CommandBasedStrategy(FileBasedStrategy):
     """Execute shell commands to generate a file-based artifact."""
 
@@ -36,22 +119,38 @@ class CommandBasedStrategy(FileBasedStrategy):
         capture_stdout: bool = False,
         environment: Optional[dict[str, str]] = None,
         workdir: Optional[Path] = None,
+        parallel_pre: bool = False,
+        parallel_post: bool = False,
     ) -> None:
         super().__init__(artifact_config=artifact_config, paths=paths)
         self._strategy_type = strategy_type
-        self._pre_commands = [cmd for cmd in pre_commands if cmd]
-        self._backup_commands = [cmd for cmd in backup_commands if cmd]
-        self._post_commands = [cmd for cmd in post_commands if cmd]
         self._capture_stdout = capture_stdout
+        self._parallel_pre = parallel_pre
+        self._parallel_post = parallel_post
         self._extra_env = {str(k): str(v) for k, v in (environment or {}).items()}
+        search_path = self._extra_env.get("PATH")
+        self._pre_commands = [
+            prepare_command(cmd, search_path=search_path) for cmd in pre_commands if cmd.strip()
+        ]
+        self._backup_commands = [
+            prepare_command(cmd, search_path=search_path) for cmd in backup_commands if cmd.strip()
+        ]
+        self._post_commands = [
+            prepare_command(cmd, search_path=search_path) for cmd in post_commands if cmd.strip()
+        ]
         self._workdir = Path(workdir) if workdir else paths.workdir
         if not self._backup_commands:
             raise ConfigError(f"strategy.config.backup must contain at least one command for {strategy_type}")
         if self._capture_stdout and len(self._backup_commands) != 1:
             raise ConfigError("capture_stdout requires exactly one backup command")
+        self._base_env = self._build_base_env()
+
+    def _build_base_env(self) -> Mapping[str, str]:
+        """Snapshot the environment shared by every run of this strategy."""
 
-    def _build_env(self, drive_folder_id: Optional[str]) -> dict[str, str]:
         env = os.environ.copy()
+        for name in _DROPPED_ENV_VARS:
+            env.pop(name, None)
         env.update(
             {
                 "SIDE_CAR_WORKDIR": str(self.paths.workdir),
@@ -60,61 +159,122 @@ class CommandBasedStrategy(FileBasedStrategy):
                 "SIDE_CAR_STRATEGY": self._strategy_type,
             }
         )
-        if drive_folder_id:
-            env["SIDE_CAR_DRIVE_FOLDER_ID"] = drive_folder_id
         env.update(self._extra_env)
-        return env
+        return MappingProxyType(env)
 
-    def _run_simple_commands(self, commands: Iterable[str], env: dict[str, str]) -> None:
-        for command in commands:
-            if not command.strip():
-                continue
-            try:
-                subprocess.run(
-                    command,
-                    shell=True,
-                    check=True,
-                    cwd=str(self._workdir),
-                    env=env,
-                )
-            except subprocess.CalledProcessError as exc:
-                raise StrategyExecutionError(
-                    f"Command failed with exit code {exc.returncode}: {command}"
-                ) from exc
+    def _build_env(self, drive_folder_id: Optional[str]) -> Mapping[str, str]:
+        # The same read-only mapping is shared by every command of the run;
+        # only the drive folder id varies between runs.
+        if not drive_folder_id or "SIDE_CAR_DRIVE_FOLDER_ID" in self._extra_env:
+            return self._base_env
+        env = dict(self._base_env)
+        env["SIDE_CAR_DRIVE_FOLDER_ID"] = drive_folder_id
+        return MappingProxyType(env)
 
-    def _run_and_capture(self, command: str, env: dict[str, str]) -> None:
-        self.paths.temp_dump.parent.mkdir(parents=True, exist_ok=True)
-        with self.paths.temp_dump.open("wb") as handle:
-            process = subprocess.Popen(
-                command,
-                shell=True,
+    def _run_command(self, command: PreparedCommand, env: Mapping[str, str]) -> None:
+        try:
+            subprocess.run(
+                command.argv or command.text,
+                shell=command.argv is None,
+                executable=command.executable,
+                check=True,
                 cwd=str(self._workdir),
                 env=env,
-                stdout=handle,
-                stderr=subprocess.PIPE,
             )
-            _, stderr_data = process.communicate()
-        if process.returncode != 0:
-            message = stderr_data.decode("utf-8", errors="replace") if stderr_data else ""
+        except subprocess.CalledProcessError as exc:
             raise StrategyExecutionError(
-                f"Command failed with exit code {process.returncode}: {command}\n{message.strip()}"
-            )
+                f"Command failed with exit code {exc.returncode}: {command.text}"
+            ) from exc
+        except FileNotFoundError as exc:
+            raise StrategyExecutionError(f"Command not found: {command.text}") from exc
+        except OSError as exc:
+            # Not executable or not a valid binary: /bin/sh used to turn
+            # these into exit code 126.
+            raise StrategyExecutionError(f"Command could not be executed: {command.text}") from exc
+
+    def _run_simple_commands(
+        self, commands: list[PreparedCommand], env: Mapping[str, str], *, parallel: bool = False
+    ) -> None:
+        if not parallel or len(commands) < 2:
+            for command in commands:
+                self._run_command(command, env)
+            return
+        # Only used for command lists declared order-independent: the
+        # commands mostly wait on their child processes, so threads suffice.
+        with ThreadPoolExecutor(max_workers=min(len(commands), os.cpu_count() or 1)) as executor:
+            futures = [executor.submit(self._run_command, command, env) for command in commands]
+            wait(futures, return_when=FIRST_EXCEPTION)
+            for future in futures:
+                if future.done() and future.exception() is not None:
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise future.exception()  # type: ignore[misc]
+
+    def _run_and_capture(self, command: PreparedCommand, env: Mapping[str, str]) -> ArtifactChecksum:
+        """Write the command's stdout to ``temp_dump``, hashing it on the way.
+
+        Returns the checksums so the artifact does not need a second read.
+        stderr goes to a temporary file so a chatty command cannot block on a
+        full pipe while stdout is being drained.
+        """
+
+        self.paths.temp_dump.parent.mkdir(parents=True, exist_ok=True)
+        digest = ArtifactDigest()
+        with self.paths.temp_dump.open("wb") as handle, tempfile.TemporaryFile() as errors:
+            try:
+                process = subprocess.Popen(
+                    command.argv or command.text,
+                    shell=command.argv is None,
+                    executable=command.executable,
+                    cwd=str(self._workdir),
+                    env=env,
+                    stdout=subprocess.PIPE,
+                    stderr=errors,
+                )
+            except OSError as exc:
+                handle.close()
+                self.paths.temp_dump.unlink(missing_ok=True)
+                if isinstance(exc, FileNotFoundError):
+                    raise StrategyExecutionError(f"Command not found: {command.text}") from exc
+                raise StrategyExecutionError(f"Command could not be executed: {command.text}") from exc
+            assert process.stdout is not None
+            try:
+                with process.stdout:
+                    copy_with_digest(process.stdout, digest, handle)
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            process.wait()
+            if process.returncode != 0:
+                errors.seek(0)
+                message = errors.read().decode("utf-8", errors="replace")
+                raise StrategyExecutionError(
+                    f"Command failed with exit code {process.returncode}: {command.text}\n{message.strip()}"
+                )
+        return digest.result()
 
     def prepare(self, drive_folder_id: Optional[str] = None):  # type: ignore[override]
         self._ensure_workspace()
         env = self._build_env(drive_folder_id)
-        self._run_simple_commands(self._pre_commands, env)
+        self._run_simple_commands(self._pre_commands, env, parallel=self._parallel_pre)
+        captured = None
         if self._capture_stdout:
             command = self._backup_commands[0]
-            self._run_and_capture(command, env)
+            checksums = self._run_and_capture(command, env)
+            captured = (checksums, self.paths.temp_dump.stat().st_mtime_ns)
         else:
             self._run_simple_commands(self._backup_commands, env)
-        self._run_simple_commands(self._post_commands, env)
+        self._run_simple_commands(self._post_commands, env, parallel=self._parallel_post)
         if not self.paths.temp_dump.exists():
             raise StrategyExecutionError(
                 f"Strategy did not generate expected artifact at {self.paths.temp_dump}"
             )
-        artifact_path = self._move_to_artifact(self.paths.temp_dump)
-        checksum, size = self._compute_checksum(artifact_path)
-        return self._register_metadata(artifact_path, size=size, checksum=checksum)
-
+        known = None
+        if captured is not None:
+            # Reuse the digest computed during capture unless a post command
+            # rewrote the dump afterwards.
+            checksums, mtime_ns = captured
+            stat = self.paths.temp_dump.stat()
+            if stat.st_size == checksums.size and stat.st_mtime_ns == mtime_ns:
+                known = checksums
+        return self._store_artifact(self.paths.temp_dump, known=known)
@@ -31,6 +31,8 @@ class DatabaseDumpStrategy(CommandBasedStrategy):
             raise ConfigError("strategy.config.env must be a mapping when provided")
         workdir_value = options.get("workdir")
         workdir = Path(workdir_value) if workdir_value else None
+        parallel_pre = bool(options.get("parallel_pre", False))
+        parallel_post = bool(options.get("parallel_post", False))
         super().__init__(
             artifact_config=artifact_config,
             paths=paths,
@@ -41,5 +43,7 @@ class DatabaseDumpStrategy(CommandBasedStrategy):
             capture_stdout=capture_stdout,
             environment={str(k): str(v) for k, v in environment.items()},
             workdir=workdir,
+            parallel_pre=parallel_pre,
+            parallel_post=parallel_post,
         )
 
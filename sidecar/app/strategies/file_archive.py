@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import glob
+import io
 import os
 import tarfile
 import zipfile
@@ -10,7 +11,7 @@ from pathlib import Path
 from typing import Any
 
 from ..exceptions import ConfigError, StrategyExecutionError
-from .base import FileBasedStrategy
+from .base import ArtifactDigest, FileBasedStrategy
 
 
 def _ensure_paths_list(value: Any, *, field: str) -> list[str]:
@@ -21,6 +22,38 @@ def _ensure_paths_list(value: Any, *, field: str) -> list[str]:
     return [item for item in value if item]
 
 
+class _HashingWriter:
+    """Forward writes to *handle* while feeding them to *digest*.
+
+    It reports positions through ``tell`` but refuses to seek, so tarfile and
+    zipfile write strictly sequentially (zipfile switches to data descriptors)
+    and every byte is hashed exactly once, in order.
+    """
+
+    def __init__(self, handle, digest: ArtifactDigest) -> None:
+        self._handle = handle
+        self._digest = digest
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._handle.write(data)
+        self._digest.update(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def seekable(self) -> bool:
+        return False
+
+    def seek(self, *args) -> int:
+        raise io.UnsupportedOperation("seek")
+
+    def flush(self) -> None:
+        self._handle.flush()
+
+
 class FileArchiveStrategy(FileBasedStrategy):
     """Archive files/directories matched by glob patterns."""
 
@@ -32,6 +65,10 @@ class FileArchiveStrategy(FileBasedStrategy):
         self._patterns = pattern_list
         base_dir_value = options.get("base_dir")
         self._base_dir = Path(base_dir_value).expanduser() if base_dir_value else paths.workdir
+        # Matched paths are normpath'd strings built from the same base, so
+        # arcnames can be cut out of them by prefix instead of relative_to.
+        base_str = os.path.normpath(self._base_dir)
+        self._base_prefix = base_str if base_str.endswith(os.sep) else base_str + os.sep
         self._follow_symlinks = bool(options.get("follow_symlinks", False))
         format_value = (options.get("format") or "tar").lower()
         if format_value not in {"tar", "zip"}:
@@ -39,35 +76,42 @@ class FileArchiveStrategy(FileBasedStrategy):
         self._format = format_value
         compression_value = options.get("compression")
         self._compression = str(compression_value).lower() if compression_value else None
+        level_value = options.get("compression_level", 1)
+        if isinstance(level_value, bool) or not isinstance(level_value, int) or not 0 <= level_value <= 9:
+            raise ConfigError("strategy.config.compression_level must be an integer between 0 and 9")
+        self._compression_level = level_value
 
-    def _resolve_pattern(self, pattern: str) -> list[Path]:
-        base = self._base_dir
+    def _resolve_pattern(self, pattern: str) -> list[str]:
         target_pattern = pattern
-        if not Path(pattern).is_absolute():
-            target_pattern = str((base / pattern).expanduser())
-        matches = [Path(match) for match in sorted(glob.glob(target_pattern, recursive=True))]
-        if not matches and Path(target_pattern).exists():
-            matches = [Path(target_pattern)]
+        if not os.path.isabs(pattern):
+            target_pattern = os.path.expanduser(os.path.join(self._base_dir, pattern))
+        if not glob.has_magic(target_pattern):
+            # Literal paths only need an existence check, not a glob pass.
+            return [target_pattern] if os.path.lexists(target_pattern) else []
+        matches = sorted(glob.glob(target_pattern, recursive=True))
+        if not matches and os.path.exists(target_pattern):
+            matches = [target_pattern]
         return matches
 
-    def _collect_paths(self) -> list[Path]:
-        collected: list[Path] = []
-        seen: set[Path] = set()
+    def _collect_paths(self) -> list[str]:
+        # Plain strings avoid building and hashing a Path per match; normpath
+        # gives the same spelling Path would for deduplication.
+        collected: list[str] = []
+        seen: set[str] = set()
         for pattern in self._patterns:
             for match in self._resolve_pattern(pattern):
-                candidate = Path(match)
+                candidate = os.path.normpath(match)
                 if candidate not in seen:
                     collected.append(candidate)
                     seen.add(candidate)
         return collected
 
-    def _make_arcname(self, path: Path) -> str:
-        try:
-            relative = path.relative_to(self._base_dir)
-            arcname = relative.as_posix()
-            return arcname if arcname else path.name
-        except ValueError:
-            return path.name
+    def _make_arcname(self, path: str) -> str:
+        if path.startswith(self._base_prefix):
+            return path[len(self._base_prefix):].replace(os.sep, "/")
+        if path == self._base_prefix[:-1]:
+            return "."
+        return os.path.basename(path)
 
     def _tar_mode(self) -> str:
         if self._compression is None:
@@ -78,7 +122,7 @@ class FileArchiveStrategy(FileBasedStrategy):
         except KeyError as exc:
             raise ConfigError("Unsupported compression for tar archives. Use gz, bz2 or xz.") from exc
 
-    def _add_directory_to_zip(self, zipf: zipfile.ZipFile, directory: Path, added: set[str]) -> None:
+    def _add_directory_to_zip(self, zipf: zipfile.ZipFile, directory: str, added: set[str]) -> None:
         arcname = self._make_arcname(directory).rstrip("/") + "/"
         if arcname in added:
             return
@@ -87,52 +131,87 @@ class FileArchiveStrategy(FileBasedStrategy):
         zipf.writestr(info, "")
         added.add(arcname)
 
-    def _create_tar_archive(self, paths: list[Path]) -> None:
+    def _tar_level_options(self) -> dict[str, int]:
+        if self._compression == "gz":
+            return {"compresslevel": self._compression_level}
+        if self._compression == "bz2":
+            # bzip2 has no level 0; its fastest setting is 1.
+            return {"compresslevel": max(1, self._compression_level)}
+        if self._compression == "xz":
+            return {"preset": self._compression_level}
+        return {}
+
+    def _create_tar_archive(self, paths: list[str], fileobj) -> None:
         mode = self._tar_mode()
-        with tarfile.open(self.paths.temp_dump, mode) as tar:
+        with tarfile.open(
+            fileobj=fileobj,
+            mode=mode,
+            dereference=self._follow_symlinks,
+            **self._tar_level_options(),
+        ) as tar:
             added: set[str] = set()
             for path in paths:
                 arcname = self._make_arcname(path)
                 if arcname in added:
                     continue
                 tar.add(
-                    str(path),
+                    path,
                     arcname=arcname,
                     recursive=True,
-                    dereference=self._follow_symlinks,
                 )
                 added.add(arcname)
 
-    def _create_zip_archive(self, paths: list[Path]) -> None:
+    def _create_zip_archive(self, paths: list[str], fileobj) -> None:
         compression = zipfile.ZIP_DEFLATED if self._compression not in {None, "store", "stored"} else zipfile.ZIP_STORED
-        with zipfile.ZipFile(self.paths.temp_dump, mode="w", compression=compression, allowZip64=True) as zipf:
+        with zipfile.ZipFile(
+            fileobj,
+            mode="w",
+            compression=compression,
+            allowZip64=True,
+            compresslevel=self._compression_level,
+        ) as zipf:
             added: set[str] = set()
             for path in paths:
-                if path.is_dir():
-                    if path.is_symlink() and not self._follow_symlinks:
-                        continue
-                    self._add_directory_to_zip(zipf, path, added)
-                    for subpath in sorted(path.rglob("*")):
-                        if subpath.is_dir():
-                            if subpath.is_symlink() and not self._follow_symlinks:
-                                continue
-                            self._add_directory_to_zip(zipf, subpath, added)
-                        else:
-                            if subpath.is_symlink() and not self._follow_symlinks:
-                                continue
-                            arcname = self._make_arcname(subpath)
-                            if arcname in added:
-                                continue
-                            zipf.write(subpath, arcname)
-                            added.add(arcname)
+                if os.path.islink(path) and not self._follow_symlinks:
+                    continue
+                if os.path.isdir(path):
+                    self._add_tree_to_zip(zipf, path, added)
+                else:
+                    self._add_file_to_zip(zipf, path, added)
+
+    def _add_file_to_zip(self, zipf: zipfile.ZipFile, path: str, added: set[str]) -> None:
+        arcname = self._make_arcname(path)
+        if arcname in added:
+            return
+        zipf.write(path, arcname)
+        added.add(arcname)
+
+    def _add_tree_to_zip(self, zipf: zipfile.ZipFile, directory: str, added: set[str]) -> None:
+        # scandir entries carry the file type from the directory listing, so
+        # the symlink/dir checks below need no extra stat calls per entry.
+        # Followed symlinks can point back at an ancestor; each pending
+        # directory carries the (st_dev, st_ino) of the directories above it
+        # so such loops are skipped instead of walked until ELOOP.
+        pending: list[tuple[str, frozenset[tuple[int, int]]]] = [(directory, frozenset())]
+        while pending:
+            current, ancestors = pending.pop()
+            stat = os.stat(current)
+            key = (stat.st_dev, stat.st_ino)
+            if key in ancestors:
+                continue
+            ancestors = ancestors | {key}
+            self._add_directory_to_zip(zipf, current, added)
+            with os.scandir(current) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+            subdirectories = []
+            for entry in entries:
+                if entry.is_symlink() and not self._follow_symlinks:
+                    continue
+                if entry.is_dir():
+                    subdirectories.append(entry.path)
                 else:
-                    if path.is_symlink() and not self._follow_symlinks:
-                        continue
-                    arcname = self._make_arcname(path)
-                    if arcname in added:
-                        continue
-                    zipf.write(path, arcname)
-                    added.add(arcname)
+                    self._add_file_to_zip(zipf, entry.path, added)
+            pending.extend((path, ancestors) for path in reversed(subdirectories))
 
     def prepare(self, drive_folder_id=None):  # type: ignore[override]
         self._ensure_workspace()
@@ -141,12 +220,15 @@ class FileArchiveStrategy(FileBasedStrategy):
             raise StrategyExecutionError("File archive strategy did not match any files")
         if self.paths.temp_dump.exists():
             self.paths.temp_dump.unlink()
-        if self._format == "tar":
-            self._create_tar_archive(matched_paths)
-        else:
-            self._create_zip_archive(matched_paths)
+        # The archive is hashed as it is written, so storing it needs no
+        # second read of temp_dump.
+        digest = ArtifactDigest()
+        with self.paths.temp_dump.open("wb") as handle:
+            writer = _HashingWriter(handle, digest)
+            if self._format == "tar":
+                self._create_tar_archive(matched_paths, writer)
+            else:
+                self._create_zip_archive(matched_paths, writer)
         os.chmod(self.paths.temp_dump, 0o444)
-        artifact_path = self._move_to_artifact(self.paths.temp_dump)
-        checksum, size = self._compute_checksum(artifact_path)
-        return self._register_metadata(artifact_path, size=size, checksum=checksum)
+        return self._store_artifact(self.paths.temp_dump, known=digest.result())
 
@@ -0,0 +1,79 @@
+import io
+import subprocess
+
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "tracemalloc: precise allocation checks; deselect with -m 'not tracemalloc'"
+    )
+
+
+class DummyStdin:
+    """Stand-in for a child's stdin pipe.
+
+    It always counts the bytes written and the largest single write; the
+    writes themselves are only kept when *keep_writes* is true.
+    """
+
+    def __init__(self, keep_writes=True):
+        self.writes = [] if keep_writes else None
+        self.total = 0
+        self.largest = 0
+        self.closed = False
+
+    def write(self, data):
+        size = len(data)
+        self.total += size
+        if size > self.largest:
+            self.largest = size
+        if self.writes is not None:
+            # Keep a reference only; copying would distort memory measurements.
+            self.writes.append(data)
+        return size
+
+    def fileno(self):
+        raise io.UnsupportedOperation("fileno")
+
+    def close(self):
+        self.closed = True
+
+
+class DummyProcess:
+    """Popen replacement that accepts stdin writes and exits successfully."""
+
+    def __init__(self, cmd, returncode=0, keep_writes=True):
+        self.cmd = cmd
+        self.stdin = DummyStdin(keep_writes)
+        self.returncode = returncode
+
+    def wait(self):
+        return self.returncode
+
+
+def _install_fake_popen(monkeypatch, *, keep_writes):
+    processes = []
+
+    def fake_popen(cmd, stdin=None, **kwargs):
+        assert stdin == subprocess.PIPE
+        process = DummyProcess(cmd, keep_writes=keep_writes)
+        processes.append(process)
+        return process
+
+    monkeypatch.setattr(subprocess, "Popen", fake_popen)
+    return processes
+
+
+@pytest.fixture
+def patched_popen(monkeypatch):
+    """Replace ``subprocess.Popen`` and collect the fake processes it creates."""
+
+    return _install_fake_popen(monkeypatch, keep_writes=True)
+
+
+@pytest.fixture
+def counting_popen(monkeypatch):
+    """Like ``patched_popen`` but the fake stdin only counts what it receives."""
+
+    return _install_fake_popen(monkeypatch, keep_writes=False)
@@ -4,9 +4,17 @@ import pytest
 import requests
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from orchestrator.services import client as client_module
 from orchestrator.services.client import BackupClient
 
 
+@pytest.fixture(autouse=True)
+def clear_capabilities_cache():
+    client_module._CAPS_CACHE.clear()
+    yield
+    client_module._CAPS_CACHE.clear()
+
+
 class DummyResponse:
     def __init__(self, json_data, status_code=200):
         self._json = json_data
@@ -21,30 +29,77 @@ class DummyResponse:
 
 
 def test_check_capabilities_ok(monkeypatch):
-    def fake_get(url, headers, timeout):
+    def fake_get(self, url, timeout):
         assert url == "http://example/backup/capabilities"
+        assert self.headers["Authorization"] == "Bearer token"
         return DummyResponse({"version": "v1", "types": ["db"], "est_seconds": 1, "est_size": 2})
 
-    monkeypatch.setattr(requests, "get", fake_get)
+    monkeypatch.setattr(requests.Session, "get", fake_get)
     client = BackupClient("http://example", "token")
     assert client.check_capabilities() is True
 
 
 def test_check_capabilities_missing_field(monkeypatch):
-    def fake_get(url, headers, timeout):
+    def fake_get(self, url, timeout):
         return DummyResponse({"version": "v1"})
 
-    monkeypatch.setattr(requests, "get", fake_get)
+    monkeypatch.setattr(requests.Session, "get", fake_get)
     client = BackupClient("http://example", "token")
     with pytest.raises(ValueError):
         client.check_capabilities()
 
 
 def test_check_capabilities_bad_version(monkeypatch):
-    def fake_get(url, headers, timeout):
+    def fake_get(self, url, timeout):
         return DummyResponse({"version": "v2", "types": ["db"]})
 
-    monkeypatch.setattr(requests, "get", fake_get)
+    monkeypatch.setattr(requests.Session, "get", fake_get)
     client = BackupClient("http://example", "token")
     with pytest.raises(ValueError):
         client.check_capabilities()
+
+
+def test_check_capabilities_rejects_non_object(monkeypatch):
+    def fake_get(self, url, timeout):
+        return DummyResponse(["v1"])
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    with pytest.raises(TypeError, match="JSON object"):
+        client_module._validate_capabilities(["v1"])
+    client = BackupClient("http://example", "token")
+    with pytest.raises(ValueError, match="JSON object"):
+        client.check_capabilities()
+
+
+def test_check_capabilities_is_cached(monkeypatch):
+    calls = []
+
+    def fake_get(self, url, timeout):
+        calls.append(url)
+        return DummyResponse({"version": "v1", "types": ["db"]})
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    client = BackupClient("http://example", "token")
+    assert client.check_capabilities() is True
+    assert BackupClient("http://example", "token").check_capabilities() is True
+    assert len(calls) == 1
+
+    BackupClient("http://example", "other").check_capabilities()
+    assert len(calls) == 2
+
+    monkeypatch.setattr(client_module, "_CAPABILITIES_TTL", 0.0)
+    client.check_capabilities()
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize(
+    "payload, message",
+    [
+        ({"types": ["db"]}, "Missing capability field: version"),
+        ({"version": "v1", "types": "db"}, "Invalid 'types'"),
+        ({"version": "v1", "types": ["db"], "est_size": "big"}, "Invalid 'est_size'"),
+    ],
+)
+def test_validate_capabilities_errors(payload, message):
+    with pytest.raises(ValueError, match=message):
+        client_module._validate_capabilities(payload)
@@ -1,83 +1,224 @@
+import fcntl
 import os
 import subprocess
 import sys
+import textwrap
 import tracemalloc
 
+import pytest
+
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from orchestrator.services.client import BackupClient
+from orchestrator.services import client as client_module
+from orchestrator.services.client import _PIPE_SIZE, BackupClient, _grow_pipe
 
 
-def test_upload_stream_large_file_memory(monkeypatch):
-    client = BackupClient("http://example", "token")
+@pytest.fixture(scope="module")
+def client():
+    """One client (and HTTP session) shared by the tests that only upload."""
 
-    written_sizes = []
-    monkeypatch.setenv("RCLONE_REMOTE", "drive")
-    captured_cmds = []
+    shared = BackupClient("http://example", "token")
+    shared.remote = "drive:"
+    yield shared
+    shared._session.close()
+
+
+def _big_stream(blocks=50):
+    block = memoryview(b"x" * (1024 * 1024))
+    for _ in range(blocks):  # 1 MiB each, all views of one block
+        yield block
+
+
+def _check_big_upload(client, processes):
+    (process,) = processes
+    assert process.stdin.total == 50 * 1024 * 1024
+    assert process.stdin.largest <= client.upload_buffer
+    assert client.upload_buffer >= 64 * 1024
+    assert process.cmd == ["rclone", "rcat", "drive:big.bak"]
+    assert process.stdin.closed
+
+
+_RUSAGE_CHECK = textwrap.dedent(
+    """
+    import io
+    import resource
+    import subprocess
+    import sys
+
+    sys.path.insert(0, sys.argv[1])
+    from orchestrator.services.client import BackupClient
+
+    class CountingStdin:
+        total = 0
 
-    class DummyStdin:
         def write(self, data):
-            written_sizes.append(len(data))
+            self.total += len(data)
+            return len(data)
+
+        def fileno(self):
+            raise io.UnsupportedOperation("fileno")
 
         def close(self):
             pass
 
-    class DummyProcess:
-        def __init__(self):
-            self.stdin = DummyStdin()
+    class CountingProcess:
+        returncode = 0
+
+        def __init__(self, cmd):
+            self.cmd = cmd
+            self.stdin = CountingStdin()
 
         def wait(self):
-            return 0
+            return self.returncode
 
-    def fake_popen(cmd, stdin, **kwargs):
-        captured_cmds.append(cmd)
-        assert cmd[:2] == ["rclone", "rcat"]
-        assert cmd[2] == "drive:big.bak"
-        assert stdin == subprocess.PIPE
-        return DummyProcess()
+    processes = []
 
-    monkeypatch.setattr(subprocess, "Popen", fake_popen)
+    def fake_popen(cmd, stdin=None, **kwargs):
+        processes.append(CountingProcess(cmd))
+        return processes[-1]
 
-    def big_generator():
-        for _ in range(50):  # 50 MB total
-            yield b"x" * (1024 * 1024)
+    subprocess.Popen = fake_popen
+    client = BackupClient("http://example", "token")
+    client.remote = "drive:"
+    block = memoryview(b"x" * (1024 * 1024))
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    client._upload_stream_to_drive((block for _ in range(50)), "big.bak")
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print((after - before) * 1024, processes[0].stdin.total)
+    """
+)
+
+
+def test_upload_stream_large_file_memory():
+    # ru_maxrss is a process-wide high-water mark (KiB on Linux), so earlier
+    # tests could already have pushed it past anything the upload allocates.
+    # A fresh interpreter starts the peak near its current usage.
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", _RUSAGE_CHECK, root],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    growth, total = map(int, result.stdout.split())
+    assert total == 50 * 1024 * 1024
+    assert growth < 10 * 1024 * 1024  # peak grew by under 10MB
+
+
+@pytest.mark.tracemalloc
+def test_upload_stream_large_file_traced_memory(client, counting_popen):
+    stream = _big_stream()
 
     tracemalloc.start()
-    client._upload_stream_to_drive(big_generator(), "big.bak")
+    client._upload_stream_to_drive(stream, "big.bak")
     current, peak = tracemalloc.get_traced_memory()
     tracemalloc.stop()
 
     assert peak < 10 * 1024 * 1024  # peak memory under 10MB
-    assert sum(written_sizes) == 50 * 1024 * 1024
-    assert max(written_sizes) <= client.upload_buffer
-    assert captured_cmds[0][2] == "drive:big.bak"
+    _check_big_upload(client, counting_popen)
 
 
-def test_upload_stream_custom_remote(monkeypatch):
-    client = BackupClient("http://example", "token")
+def test_default_remote_comes_from_environment(monkeypatch):
+    monkeypatch.setenv("RCLONE_REMOTE", "drive")
+    assert BackupClient("http://example", "token").remote == "drive:"
 
-    class DummyStdin:
-        def write(self, data):
-            pass
 
-        def close(self):
-            pass
+def test_upload_stream_custom_remote(client, patched_popen):
+    client._upload_stream_to_drive([b"data"], "test.bak", remote="custom")
 
-    class DummyProcess:
-        def __init__(self):
-            self.stdin = DummyStdin()
+    assert patched_popen[0].cmd == ["rclone", "rcat", "custom:test.bak"]
 
-        def wait(self):
-            return 0
 
+def test_export_backup_splices_plain_http_body(monkeypatch, tmp_path):
+    import http.server
+    import threading
+
+    payload = os.urandom(3 * 1024 * 1024 + 123)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    target = tmp_path / "uploaded.bak"
+    real_popen = subprocess.Popen
     captured = {}
 
     def fake_popen(cmd, stdin, **kwargs):
         captured["cmd"] = cmd
-        assert cmd[:2] == ["rclone", "rcat"]
-        assert stdin == subprocess.PIPE
-        return DummyProcess()
+        script = "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], 'wb'))"
+        return real_popen([sys.executable, "-c", script, str(target)], stdin=stdin)
 
     monkeypatch.setattr(subprocess, "Popen", fake_popen)
-    client._upload_stream_to_drive([b"data"], "test.bak", remote="custom")
+    client = BackupClient(f"http://127.0.0.1:{server.server_port}", "token")
+    try:
+        client.export_backup("app", remote="drive")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert captured["cmd"] == ["rclone", "rcat", "drive:app.bak", "--size", str(len(payload))]
+    assert target.read_bytes() == payload
+
+
+def test_upload_stream_splits_oversized_chunks(patched_popen):
+    client = BackupClient("http://example", "token", upload_buffer=4)
+    client._upload_stream_to_drive([b"abc", b"0123456789"], "test.bak", remote="drive")
+
+    written = [bytes(data) for data in patched_popen[0].stdin.writes]
+    assert written == [b"abc", b"0123", b"4567", b"89"]
+
+
+def test_upload_stream_passes_known_size_to_rclone(client, patched_popen):
+    client._upload_stream_to_drive([b"data"], "test.bak", remote="drive", size=4)
+
+    assert patched_popen[0].cmd == ["rclone", "rcat", "drive:test.bak", "--size", "4"]
+
+
+@pytest.mark.skipif(not hasattr(fcntl, "F_GETPIPE_SZ"), reason="pipe sizing is Linux-only")
+def test_grow_pipe_enlarges_kernel_buffer():
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(read_fd, "rb") as reader, os.fdopen(write_fd, "wb") as writer:
+        _grow_pipe(writer)
+        size = fcntl.fcntl(writer.fileno(), fcntl.F_GETPIPE_SZ)
+    # Unprivileged processes may be capped by /proc/sys/fs/pipe-max-size.
+    with open("/proc/sys/fs/pipe-max-size") as limit:
+        assert size >= min(_PIPE_SIZE, int(limit.read()))
+
+
+def test_upload_stream_writes_small_chunks_to_real_pipe(monkeypatch, tmp_path):
+    target = tmp_path / "uploaded.bak"
+    real_popen = subprocess.Popen
+
+    def fake_popen(cmd, stdin, **kwargs):
+        script = "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], 'wb'))"
+        return real_popen([sys.executable, "-c", script, str(target)], stdin=stdin)
+
+    monkeypatch.setattr(subprocess, "Popen", fake_popen)
+    chunks = [bytes([i % 256]) * (i % 700) for i in range(2000)]
+    client = BackupClient("http://example", "token", upload_buffer=64 * 1024)
+    client._upload_stream_to_drive(iter(chunks), "test.bak", remote="drive")
+
+    assert target.read_bytes() == b"".join(chunks)
+
+
+def test_writev_all_resumes_after_short_writes(monkeypatch):
+    received = bytearray()
+
+    def short_writev(fd, buffers):
+        data = b"".join(bytes(buffer) for buffer in buffers)[:3]
+        received.extend(data)
+        return len(data)
+
+    monkeypatch.setattr(client_module.os, "writev", short_writev)
+    client_module._writev_all(99, [memoryview(b"abcde"), memoryview(b""), memoryview(b"fgh")])
 
-    assert captured["cmd"][2] == "custom:test.bak"
+    assert bytes(received) == b"abcdefgh"
@@ -1,63 +1,99 @@
-import importlib
+import os
 import sys
+import threading
 
 import pytest
 from sqlalchemy import text
 from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from orchestrator.app import database as database_module
 
 
 @pytest.fixture
-def reload_database(monkeypatch):
-    module_name = "orchestrator.app.database"
-
-    def _reload(**env):
-        existing = sys.modules.pop(module_name, None)
-        if existing is not None:
-            engine = getattr(existing, "engine", None)
-            if engine is not None:
-                engine.dispose()
-        for key, value in env.items():
-            if value is None:
-                monkeypatch.delenv(key, raising=False)
-            else:
-                monkeypatch.setenv(key, value)
-        module = importlib.import_module(module_name)
-        return module
-
-    yield _reload
-
-    existing = sys.modules.pop(module_name, None)
-    if existing is not None:
-        engine = getattr(existing, "engine", None)
-        if engine is not None:
-            engine.dispose()
-    importlib.import_module(module_name)
-
-
-def test_default_database_url_points_to_persistent_volume(reload_database):
-    database = reload_database(DATABASE_URL=None)
-    url = database.DATABASE_URL
-    parsed = make_url(url)
+def engine_factory():
+    engines = []
+
+    def _make(url):
+        engine = database_module.make_engine(url)
+        engines.append(engine)
+        return engine
+
+    yield _make
+
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture(params=["sqlite://", "sqlite:///{tmp}/apps.db"], ids=["memory", "file"])
+def database_url(request, tmp_path):
+    return request.param.format(tmp=tmp_path)
+
+
+def test_default_database_url_points_to_persistent_volume(monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    parsed = make_url(database_module.get_database_url())
 
     assert parsed.get_backend_name() == "sqlite"
     assert parsed.database == "/sqlite/db/apps.db"
 
 
-def test_existing_sqlite_database_is_reused(tmp_path, reload_database):
+def test_database_url_comes_from_environment(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///elsewhere.db")
+    assert database_module.get_database_url() == "sqlite:///elsewhere.db"
+
+
+def test_existing_sqlite_database_is_reused(tmp_path, engine_factory):
     db_path = tmp_path / "persist" / "apps.db"
     url = f"sqlite:///{db_path}"
 
-    database = reload_database(DATABASE_URL=url)
-    with database.engine.begin() as conn:
+    engine = engine_factory(url)
+    with engine.begin() as conn:
         conn.execute(text("CREATE TABLE IF NOT EXISTS persisted (id INTEGER PRIMARY KEY, value TEXT)"))
         conn.execute(text("INSERT INTO persisted (value) VALUES ('keep')"))
 
-    database.engine.dispose()
+    engine.dispose()
 
-    database = reload_database(DATABASE_URL=url)
-    with database.engine.connect() as conn:
+    engine = engine_factory(url)
+    with engine.connect() as conn:
         result = conn.execute(text("SELECT value FROM persisted"))
         values = [row[0] for row in result]
 
     assert values == ["keep"]
     assert db_path.exists()
+
+
+def test_sqlite_connections_use_wal(tmp_path, engine_factory):
+    engine = engine_factory(f"sqlite:///{tmp_path / 'apps.db'}")
+    with engine.connect() as conn:
+        journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+        synchronous = conn.execute(text("PRAGMA synchronous")).scalar()
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+
+
+def test_sqlite_engine_pool_class(database_url, engine_factory):
+    engine = engine_factory(database_url)
+    expected = StaticPool if database_url == "sqlite://" else QueuePool
+    assert isinstance(engine.pool, expected)
+
+
+def test_sqlite_data_is_shared_across_threads(database_url, engine_factory):
+    engine = engine_factory(database_url)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE shared (value TEXT)"))
+        conn.execute(text("INSERT INTO shared (value) VALUES ('seen')"))
+
+    values = []
+
+    def read():
+        with engine.connect() as conn:
+            values.extend(row[0] for row in conn.execute(text("SELECT value FROM shared")))
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+
+    assert values == ["seen"]
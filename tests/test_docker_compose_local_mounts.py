@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import functools
 import json
 import os
 import shutil
 import subprocess
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pytest
@@ -12,29 +14,100 @@ import pytest
 REPO_ROOT = Path(__file__).resolve().parents[1]
 COMPOSE_FILE = REPO_ROOT / "docker-compose.yml"
 EXTERNAL_NETWORK = "Backuper_tunn_net"
+BUILD_CACHE_DIR = REPO_ROOT / ".buildcache"
+ORCHESTRATOR_IMAGE = "backuper-orchestrator:pytest"
+
+
+def _run(
+    argv: list[str], *, env: dict[str, str] | None = None, capture_stdout: bool = False
+) -> subprocess.CompletedProcess[str]:
+    """Run a docker command, discarding stdout unless the caller needs it.
+
+    stderr is always captured so failures can be reported in skip messages.
+    """
+
+    return subprocess.run(
+        argv,
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.PIPE if capture_stdout else subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=False,
+    )
 
 
-def _command_available(command: list[str]) -> bool:
+@functools.lru_cache(maxsize=None)
+def _command_available(command: tuple[str, ...]) -> bool:
     try:
-        result = subprocess.run(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=False,
-        )
+        result = _run(list(command))
     except FileNotFoundError:
         return False
     return result.returncode == 0
 
 
-@pytest.mark.skipif(shutil.which("docker") is None, reason="docker CLI not available")
-def test_local_directories_are_mounted() -> None:
-    if not _command_available(["docker", "info"]):
+def _ensure_base_image() -> subprocess.CompletedProcess[str] | None:
+    """Pull the Dockerfile's base image unless it is already present locally."""
+
+    for line in (REPO_ROOT / "Dockerfile").read_text(encoding="utf-8").splitlines():
+        parts = line.split()
+        if len(parts) > 1 and parts[0].upper() == "FROM":
+            image = parts[1]
+            break
+    else:
+        return None
+    if _run(["docker", "image", "inspect", image]).returncode == 0:
+        return None
+    return _run(["docker", "pull", image])
+
+
+def _build_orchestrator_image() -> subprocess.CompletedProcess[str]:
+    base = ["docker", "buildx", "build", "--load", "-t", ORCHESTRATOR_IMAGE]
+    cache = [
+        "--cache-from",
+        f"type=local,src={BUILD_CACHE_DIR}",
+        "--cache-to",
+        f"type=local,dest={BUILD_CACHE_DIR},mode=max",
+    ]
+    env = {**os.environ, "DOCKER_BUILDKIT": "1"}
+    result = _run([*base, *cache, str(REPO_ROOT)], env=env)
+    if result.returncode != 0:
+        # The default "docker" buildx driver cannot export a local cache;
+        # BuildKit's own layer cache still makes unchanged rebuilds cheap.
+        result = _run([*base, str(REPO_ROOT)], env=env)
+    return result
+
+
+@pytest.fixture(scope="session")
+def orchestrator_compose_files(tmp_path_factory) -> list[str]:
+    """Build the orchestrator image once and point compose at it."""
+
+    if shutil.which("docker") is None:
+        pytest.skip("docker CLI not available")
+    # Both probes are independent round-trips to the docker CLI; run them together.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        daemon_ok, compose_ok = executor.map(
+            _command_available, (("docker", "info"), ("docker", "compose", "version"))
+        )
+    if not daemon_ok:
         pytest.skip("docker daemon is not available")
-    if not _command_available(["docker", "compose", "version"]):
+    if not compose_ok:
         pytest.skip("docker compose plugin is not available")
+    pull = _ensure_base_image()
+    if pull is not None and pull.returncode != 0:
+        pytest.skip(f"unable to pull base image:\n{pull.stderr}")
+    build = _build_orchestrator_image()
+    if build.returncode != 0:
+        pytest.skip(f"unable to build orchestrator image:\n{build.stderr}")
+    override = tmp_path_factory.mktemp("compose") / "docker-compose.override.yml"
+    override.write_text(
+        f"services:\n  orchestrator:\n    image: {ORCHESTRATOR_IMAGE}\n", encoding="utf-8"
+    )
+    return ["-f", str(COMPOSE_FILE), "-f", str(override)]
+
 
+@pytest.mark.skipif(shutil.which("docker") is None, reason="docker CLI not available")
+def test_local_directories_are_mounted(orchestrator_compose_files: list[str], tmp_path: Path) -> None:
     persist_root = REPO_ROOT / "datosPersistentes"
     backups_dir = persist_root / "backups"
     db_dir = persist_root / "db"
@@ -53,12 +126,10 @@ def test_local_directories_are_mounted() -> None:
 
     container_name = "backuper"
 
-    env_overrides = os.environ.copy()
-
-    env_file_path = REPO_ROOT / ".env"
-    backup_contents: str | None = None
-    if env_file_path.exists():
-        backup_contents = env_file_path.read_text(encoding="utf-8")
+    # The service reads ${BACKUPER_ENV_FILE:-.env}, so the repo's own .env
+    # is never touched.
+    env_file_path = tmp_path / ".env"
+    env_overrides = {**os.environ, "BACKUPER_ENV_FILE": str(env_file_path)}
     env_file_path.write_text(
         "\n".join(
             [
@@ -75,7 +146,7 @@ def test_local_directories_are_mounted() -> None:
 
     created_network = False
     try:
-        list_networks = subprocess.run(
+        list_networks = _run(
             [
                 "docker",
                 "network",
@@ -85,47 +156,35 @@ def test_local_directories_are_mounted() -> None:
                 "--format",
                 "{{.Name}}",
             ],
-            check=False,
-            text=True,
-            capture_output=True,
+            capture_stdout=True,
         )
         if list_networks.returncode != 0:
             pytest.skip("unable to list docker networks")
         if EXTERNAL_NETWORK not in list_networks.stdout.split():
-            create_network = subprocess.run(
-                ["docker", "network", "create", EXTERNAL_NETWORK],
-                check=False,
-                text=True,
-                capture_output=True,
-            )
+            create_network = _run(["docker", "network", "create", EXTERNAL_NETWORK])
             if create_network.returncode != 0:
                 pytest.skip("unable to create required docker network")
             created_network = True
 
-        up_result = subprocess.run(
+        up_result = _run(
             [
                 "docker",
                 "compose",
-                "-f",
-                str(COMPOSE_FILE),
+                *orchestrator_compose_files,
                 "up",
                 "-d",
-                "--build",
+                "--no-deps",
+                "--pull",
+                "never",
                 "orchestrator",
             ],
-            cwd=REPO_ROOT,
             env=env_overrides,
-            text=True,
-            capture_output=True,
-            check=False,
         )
         if up_result.returncode != 0:
-            pytest.skip(
-                "docker compose up failed:\n" f"STDOUT: {up_result.stdout}\nSTDERR: {up_result.stderr}"
-            )
+            pytest.skip(f"docker compose up failed:\nSTDERR: {up_result.stderr}")
 
         container_path = f"/backupsLocales/{sentinel_name}"
-        exec_result = subprocess.run(
+        exec_result = _run(
             [
                 "docker",
                 "exec",
@@ -137,41 +196,21 @@ def test_local_directories_are_mounted() -> None:
                     f"sys.exit(0 if os.path.isfile({json.dumps(container_path)}) else 1)"
                 ),
             ],
-            text=True,
-            capture_output=True,
-            check=False,
         )
-        assert (
-            exec_result.returncode == 0
-        ), f"local directory not reachable: {exec_result.stdout}\n{exec_result.stderr}"
+        assert exec_result.returncode == 0, f"local directory not reachable: {exec_result.stderr}"
     finally:
-        subprocess.run(
+        _run(
             [
                 "docker",
                 "compose",
-                "-f",
-                str(COMPOSE_FILE),
+                *orchestrator_compose_files,
                 "down",
                 "-v",
             ],
-            cwd=REPO_ROOT,
             env=env_overrides,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=False,
         )
         if created_network:
-            subprocess.run(
-                ["docker", "network", "rm", EXTERNAL_NETWORK],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=False,
-                text=True,
-            )
-        if backup_contents is None:
-            env_file_path.unlink(missing_ok=True)
-        else:
-            env_file_path.write_text(backup_contents, encoding="utf-8")
+            _run(["docker", "network", "rm", EXTERNAL_NETWORK])
         sentinel_file.unlink(missing_ok=True)
         for directory in reversed(created_dirs):
             shutil.rmtree(directory, ignore_errors=True)
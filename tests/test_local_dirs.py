@@ -0,0 +1,60 @@
+import pytest
+import yaml
+
+from orchestrator.local_dirs import (
+    DirEntry,
+    compute_bind_mounts,
+    format_compose_bind_mounts,
+    parse_local_directory_config,
+    render_compose_bind_mounts,
+    strip_enclosing_quotes,
+)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, ""),
+        ("", ""),
+        ("/data/backups", "/data/backups"),
+        ("  /data/backups\n", "/data/backups"),
+        ('"/data/backups"', "/data/backups"),
+        ("' /data/backups '", "/data/backups"),
+        ('"/data/backups', '"/data/backups'),
+        ("/data/it's", "/data/it's"),
+    ],
+)
+def test_strip_enclosing_quotes(value, expected):
+    assert strip_enclosing_quotes(value) == expected
+
+
+def test_compute_bind_mounts_deduplicates_paths(tmp_path):
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    value = f"First|{first};{second}/;'{first}'"
+
+    assert compute_bind_mounts(value) == [(str(first), str(first)), (str(second), str(second))]
+
+
+def test_render_compose_bind_mounts_is_valid_yaml(tmp_path):
+    odd = tmp_path / 'quo"te' / "back\\slash" / "ñandú"
+    snippet = render_compose_bind_mounts(str(odd))
+    document = yaml.safe_load("volumes:\n      " + snippet)
+
+    assert document["volumes"] == [{"type": "bind", "source": str(odd), "target": str(odd)}]
+
+
+def test_format_compose_bind_mounts_escapes_control_characters():
+    path = "/srv/line\nbreak\tand\x01ctrl"
+    snippet = format_compose_bind_mounts([(path, path)])
+    document = yaml.safe_load("volumes:\n      " + snippet)
+
+    assert document["volumes"] == [{"type": "bind", "source": path, "target": path}]
+
+
+def test_parse_local_directory_config_returns_entries():
+    entries = parse_local_directory_config("Docs|'/srv/docs'; /srv/media ,\n")
+
+    assert entries == [DirEntry("Docs", "/srv/docs"), DirEntry("/srv/media", "/srv/media")]
+    assert entries[0].label == "Docs"
+    assert entries[1].path == "/srv/media"
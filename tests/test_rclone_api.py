@@ -1,55 +1,324 @@
+import contextlib
 import json
 import os
 import sys
 import subprocess
 import importlib
+from collections import namedtuple
+from types import SimpleNamespace
+
 import pytest
+from sqlalchemy.orm import sessionmaker
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 
-@pytest.fixture
-def app(monkeypatch):
-    monkeypatch.setenv("DATABASE_URL", "sqlite://")
-    monkeypatch.setenv("APP_ADMIN_USER", "admin")
-    monkeypatch.setenv("APP_ADMIN_PASS", "secret")
-    monkeypatch.setenv("APP_SECRET_KEY", "test-key")
-    monkeypatch.setenv("RCLONE_CONFIG", "/tmp/test-rclone.conf")
-    app_module = importlib.import_module("orchestrator.app")
-    db_module = importlib.import_module("orchestrator.app.database")
-    models_module = importlib.import_module("orchestrator.app.models")
-    importlib.reload(db_module)
-    importlib.reload(models_module)
-    importlib.reload(app_module)
+RCLONE_CONFIG_PATH = "/tmp/test-rclone.conf"
+RCLONE_PREFIX = ("rclone", "--config", RCLONE_CONFIG_PATH)
+
+
+def rclone_cmd(*args: str) -> list[str]:
+    """Return the command the app runs for ``rclone <args>`` in this module."""
+    return [*RCLONE_PREFIX, *args]
+
+
+def get_app_module():
+    return importlib.import_module("orchestrator.app")
+
+
+def get_models():
+    return importlib.import_module("orchestrator.app.models")
+
+
+def reload_app_modules(monkeypatch):
+    """Re-run the app modules against the current environment.
+
+    The database module is reloaded first so the models and the app pick
+    up the engine for ``DATABASE_URL``. The scheduler hooks are disabled on
+    the returned ``orchestrator.app`` module.
+    """
+    importlib.reload(importlib.import_module("orchestrator.app.database"))
+    importlib.reload(get_models())
+    app_module = importlib.reload(get_app_module())
     monkeypatch.setattr(app_module, "start_scheduler", lambda: None)
     monkeypatch.setattr(app_module, "schedule_app_backups", lambda: None)
-    app = app_module.create_app()
-    app.config.update(TESTING=True)
-    yield app
+    return app_module
+
+
+_AppBuild = namedtuple("_AppBuild", "app app_module engine session_factory")
+
+
+class _AppSession:
+    """Flask app shared by the tests of this module.
+
+    The ``orchestrator.app`` modules are reloaded and an app is built once.
+    Tests that reload the modules themselves (against another database)
+    leave them pointing at a different engine; the next test then gets a
+    freshly reloaded build.
+    """
+
+    def __init__(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._monkeypatch = monkeypatch
+        self._build_cache: _AppBuild | None = None
+
+    def current(self) -> _AppBuild:
+        build = self._build_cache
+        if build is None or get_app_module().engine is not build.engine:
+            build = self._build_cache = self._build()
+        return build
+
+    def _build(self) -> _AppBuild:
+        app_module = reload_app_modules(self._monkeypatch)
+        # create_app restores persisted remotes through rclone; build against
+        # an empty fake config so no test's mock records those calls.
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(subprocess, "run", RcloneMock())
+            app = app_module.create_app()
+        app.config.update(TESTING=True)
+        return _AppBuild(app, app_module, app_module.engine, app_module.SessionLocal)
+
+    @contextlib.contextmanager
+    def rolled_back(self):
+        """Yield the app handle inside a transaction rolled back afterwards.
+
+        The in-memory database lives on a single StaticPool connection. A
+        session factory bound to it with ``create_savepoint`` replaces
+        ``SessionLocal`` for the test, so the app's commits become savepoint
+        releases.
+        """
+        build = self.current()
+        connection = build.engine.connect()
+        dbapi_connection = connection.connection.driver_connection
+        isolation_level = dbapi_connection.isolation_level
+        # pysqlite defers BEGIN until the first DML statement, which would let
+        # releasing the first savepoint commit; issue BEGIN explicitly.
+        dbapi_connection.isolation_level = None
+        transaction = connection.begin()
+        connection.exec_driver_sql("BEGIN")
+        session_factory = sessionmaker(
+            **{
+                **build.session_factory.kw,
+                "bind": connection,
+                "join_transaction_mode": "create_savepoint",
+            }
+        )
+        models = get_models()
+        try:
+            with pytest.MonkeyPatch.context() as mp:
+                mp.setattr(build.app_module, "SessionLocal", session_factory)
+                yield SimpleNamespace(
+                    flask=build.app,
+                    SessionLocal=session_factory,
+                    RcloneRemote=models.RcloneRemote,
+                    App=models.App,
+                )
+        finally:
+            transaction.rollback()
+            dbapi_connection.isolation_level = isolation_level
+            connection.close()
+
+
+@pytest.fixture(scope="module")
+def _app_session():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite://")
+        mp.setenv("APP_ADMIN_USER", "admin")
+        mp.setenv("APP_ADMIN_PASS", "secret")
+        mp.setenv("APP_SECRET_KEY", "test-key")
+        mp.setenv("RCLONE_CONFIG", RCLONE_CONFIG_PATH)
+        yield _AppSession(mp)
 
 
-def test_list_rclone_remotes(monkeypatch, app):
-    calls = []
+@pytest.fixture
+def app(_app_session):
+    """The shared app: ``app.flask`` plus the ORM objects tests query with."""
+    with _app_session.rolled_back() as handle:
+        yield handle
+
+
+DummyResult = namedtuple("DummyResult", "stdout stderr", defaults=("", ""))
+
+
+class _VersionedDict(dict):
+    """Dict whose ``version`` changes on every mutating dict method.
+
+    Entries are replaced as a whole, never edited in place, so the version
+    is enough to tell whether a previous serialization is still current.
+    """
+
+    version = 0
+
+    def __setitem__(self, key, value):
+        self.version += 1
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.version += 1
+        super().__delitem__(key)
+
+    def pop(self, *args):
+        self.version += 1
+        return super().pop(*args)
+
+    def clear(self):
+        self.version += 1
+        super().clear()
+
+    def update(self, *args, **kwargs):
+        self.version += 1
+        super().update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        self.version += 1
+        return super().setdefault(key, default)
+
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+
+    def __ior__(self, other):
+        self.version += 1
+        return super().__ior__(other)
+
+
+@pytest.mark.parametrize(
+    "mutate",
+    [
+        lambda d: d.__setitem__("b", 2),
+        lambda d: d.__delitem__("a"),
+        lambda d: d.pop("a"),
+        lambda d: d.popitem(),
+        lambda d: d.setdefault("b", 2),
+        lambda d: d.clear(),
+        lambda d: d.update(b=2),
+        lambda d: d.__ior__({"b": 2}),
+    ],
+    ids=["setitem", "delitem", "pop", "popitem", "setdefault", "clear", "update", "ior"],
+)
+def test_versioned_dict_bumps_on_every_mutation(mutate):
+    entries = _VersionedDict(a=1)
+    mutate(entries)
+    assert entries.version == 1
+
+
+def _op_key(cmd: list[str]) -> tuple[str, ...]:
+    """Index key for *cmd*: ``("create", "foo")`` for config subcommands,
+    ``("mkdir",)`` for the rest."""
+    op = cmd[3:]
+    if op[:1] == ["config"]:
+        return tuple([arg for arg in op[1:] if not arg.startswith("--")][:2])
+    return tuple(op[:1])
+
+
+class RcloneMock:
+    """Fake ``subprocess.run`` that simulates an rclone config store.
+
+    Calls are recorded in order in ``calls`` and indexed by operation in
+    ``by_op`` (see ``_op_key``). Commands are dispatched on the words after
+    ``rclone --config <path>``:
+    first on the first two (``("config", "dump")``), then on the first one
+    (``("mkdir",)``). Handlers take the command and return a ``DummyResult``,
+    a stdout string or ``None``; commands without a handler go to the
+    fallback, which succeeds with empty output unless ``set_fallback`` is used.
+    """
+
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+        self.by_op: dict[tuple[str, ...], list[list[str]]] = {}
+        self.config: dict[str, dict[str, str]] = _VersionedDict()
+        self._dump_cache: tuple[int, str] | None = None
+        self._listremotes: str | None = None
+        self._fallback = lambda cmd: None
+        self._handlers = {
+            ("config", "dump"): self.config_dump,
+            ("config", "create"): self.config_create,
+            ("config", "delete"): self.config_delete,
+            ("listremotes",): self.listremotes,
+        }
 
-    class DummyResult:
-        stdout = "gdrive:\nother:\n"
+    def __call__(self, cmd, **kwargs):
+        self.calls.append(cmd)
+        self.by_op.setdefault(_op_key(cmd), []).append(cmd)
+        op = cmd[3:]
+        handler = self._handlers.get(tuple(op[:2])) or self._handlers.get(
+            tuple(op[:1]), self._fallback
+        )
+        result = handler(cmd)
+        if result is None:
+            return DummyResult()
+        if isinstance(result, str):
+            return DummyResult(stdout=result)
+        return result
+
+    def reset_calls(self) -> None:
+        self.calls.clear()
+        self.by_op.clear()
+
+    def set_handler(self, *args) -> None:
+        *op, handler = args
+        self._handlers[tuple(op)] = handler
+
+    def set_fallback(self, handler) -> None:
+        """Send every command but ``listremotes`` to *handler*.
+
+        This drops the config store handlers too; handlers set afterwards
+        with ``set_handler`` still take precedence.
+        """
+        self._handlers = {("listremotes",): self.listremotes}
+        self._fallback = handler
+
+    def set_listremotes(self, stdout: str) -> None:
+        self._listremotes = stdout
+
+    def listremotes(self, cmd) -> str:
+        if self._listremotes is not None:
+            return self._listremotes
+        return "".join(f"{name}:\n" for name in self.config)
+
+    def config_dump(self, cmd) -> str:
+        version = self.config.version
+        if self._dump_cache is None or self._dump_cache[0] != version:
+            self._dump_cache = (version, json.dumps(self.config, separators=(",", ":")))
+        return self._dump_cache[1]
+
+    def config_create(self, cmd) -> None:
+        name = cmd[6]
+        remote_type = cmd[7]
+        options: dict[str, str] = {}
+        for idx in range(8, len(cmd), 2):
+            if idx + 1 >= len(cmd):
+                break
+            options[cmd[idx]] = cmd[idx + 1]
+        self.config[name] = {"type": remote_type, **options}
+
+    def config_delete(self, cmd) -> None:
+        self.config.pop(cmd[5], None)
 
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-        return DummyResult()
 
-    monkeypatch.setattr(subprocess, "run", fake_run)
+@pytest.fixture
+def auth_client(app):
+    client = app.flask.test_client()
+    client.post("/login", data={"username": "admin", "password": "secret"})
+    return client
 
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
 
-    with SessionLocal() as db:
-        db.add(RcloneRemote(name="gdrive", type="drive", route="gdrive:backups"))
+@pytest.fixture(autouse=True)
+def rclone_mock(monkeypatch):
+    """Every test runs against a fresh ``RcloneMock``; request it by name to
+    inspect calls or install handlers."""
+    mock = RcloneMock()
+    monkeypatch.setattr(subprocess, "run", mock)
+    return mock
+
+
+def test_list_rclone_remotes(rclone_mock, app, auth_client):
+    rclone_mock.set_listremotes("gdrive:\nother:\n")
+
+    with app.SessionLocal() as db:
+        db.add(app.RcloneRemote(name="gdrive", type="drive", route="gdrive:backups"))
         db.commit()
 
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.get("/rclone/remotes")
+    resp = auth_client.get("/rclone/remotes")
     assert resp.status_code == 200
     payload = resp.get_json()
     assert isinstance(payload, list)
@@ -60,27 +329,15 @@ def test_list_rclone_remotes(monkeypatch, app):
     assert entry["route"] == "gdrive:backups"
     assert "id" in entry and isinstance(entry["id"], int)
     assert "created_at" in entry
-    config_path = os.getenv("RCLONE_CONFIG")
-    assert calls == [["rclone", "--config", config_path, "listremotes"]]
+    assert rclone_mock.calls == [rclone_cmd("listremotes")]
 
 
-def test_list_rclone_remotes_with_metadata(monkeypatch, app):
-    class DummyResult:
-        def __init__(self, stdout: str = "foo:\n") -> None:
-            self.stdout = stdout
-            self.stderr = ""
-
-    def fake_run(cmd, capture_output, text, check):
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
+def test_list_rclone_remotes_with_metadata(rclone_mock, app, auth_client):
+    rclone_mock.set_listremotes("foo:\n")
 
-    with SessionLocal() as db:
+    with app.SessionLocal() as db:
         db.add(
-            RcloneRemote(
+            app.RcloneRemote(
                 name="foo",
                 type="drive",
                 route="gdrive:demo",
@@ -89,9 +346,7 @@ def test_list_rclone_remotes_with_metadata(monkeypatch, app):
         )
         db.commit()
 
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.get("/rclone/remotes")
+    resp = auth_client.get("/rclone/remotes")
     assert resp.status_code == 200
     payload = resp.get_json()
     assert isinstance(payload, list)
@@ -105,62 +360,57 @@ def test_list_rclone_remotes_with_metadata(monkeypatch, app):
     assert "created_at" in entry
 
 
-def test_register_app_with_remote(monkeypatch, app):
-    def fake_run(cmd, capture_output, text, check):
-        class DummyResult:
-            stdout = "gdrive:\n"
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
+def test_register_app_with_remote(rclone_mock, auth_client):
+    rclone_mock.set_listremotes("gdrive:\n")
     payload = {
         "name": "remoteapp",
         "url": "http://remoteapp",
         "token": "tok",
         "rclone_remote": "gdrive",
     }
-    resp = client.post("/apps", json=payload)
+    resp = auth_client.post("/apps", json=payload)
     assert resp.status_code == 201
-    resp = client.get("/apps")
+    resp = auth_client.get("/apps")
     assert resp.status_code == 200
     apps = resp.get_json()
     assert any(a["name"] == "remoteapp" and a["rclone_remote"] == "gdrive:" for a in apps)
 
 
-def test_list_rclone_remotes_missing_binary(monkeypatch, app):
-    def fake_run(*args, **kwargs):
+@pytest.mark.parametrize(
+    "method,path,body",
+    [
+        ("get", "/rclone/remotes", None),
+        (
+            "post",
+            "/rclone/remotes",
+            {
+                "name": "foo",
+                "type": "drive",
+                "settings": {"mode": "custom", "token": "tok"},
+            },
+        ),
+    ],
+    ids=["list", "create"],
+)
+def test_rclone_remotes_missing_binary(rclone_mock, auth_client, method, path, body):
+    def missing(cmd):
         raise FileNotFoundError()
 
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.get("/rclone/remotes")
+    rclone_mock.set_fallback(missing)
+    rclone_mock.set_handler("listremotes", missing)
+    resp = auth_client.open(path, method=method.upper(), json=body)
     assert resp.status_code == 500
     assert resp.get_json() == {"error": "rclone is not installed"}
 
 
-def test_validate_drive_token_with_custom_client(monkeypatch, app):
-    calls: list[list[str]] = []
-
-    class DummyResult:
-        stdout = ""
-        stderr = ""
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+def test_validate_drive_token_with_custom_client(rclone_mock, auth_client):
+    resp = auth_client.post(
         "/rclone/remotes/drive/validate",
         json={"token": "tok", "client_id": "cid", "client_secret": "sec"},
     )
     assert resp.status_code == 200
     assert resp.get_json() == {"status": "ok"}
-    cmd = calls[0]
+    cmd = rclone_mock.calls[0]
     assert "--config" in cmd
     assert "client_id" in cmd
     assert cmd[cmd.index("client_id") + 1] == "cid"
@@ -168,52 +418,14 @@ def test_validate_drive_token_with_custom_client(monkeypatch, app):
     assert cmd[cmd.index("client_secret") + 1] == "sec"
 
 
-def test_create_rclone_remote_missing_binary(monkeypatch, app):
-    def fake_run(*args, **kwargs):
-        raise FileNotFoundError()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
-        "/rclone/remotes",
-        json={
-            "name": "foo",
-            "type": "drive",
-            "settings": {"mode": "custom", "token": "tok"},
-        },
-    )
-    assert resp.status_code == 500
-    assert resp.get_json() == {"error": "rclone is not installed"}
-
-
-def test_create_rclone_remote_unsupported_type(app):
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post("/rclone/remotes", json={"name": "foo", "type": "s3"})
+def test_create_rclone_remote_unsupported_type(auth_client):
+    resp = auth_client.post("/rclone/remotes", json={"name": "foo", "type": "s3"})
     assert resp.status_code == 400
     assert resp.get_json() == {"error": "unsupported remote type"}
 
 
-def test_create_rclone_remote_custom_success(monkeypatch, app):
-    calls = []
-
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            payload = {"foo": {"type": "drive", "token": "tok", "scope": "drive"}}
-            return DummyResult(stdout=json.dumps(payload))
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+def test_create_rclone_remote_custom_success(rclone_mock, app, auth_client):
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "foo",
@@ -233,21 +445,13 @@ def test_create_rclone_remote_custom_success(monkeypatch, app):
     assert "id" in data and isinstance(data["id"], int)
     assert "route" not in data
     assert "share_url" not in data
+    calls = rclone_mock.calls
     assert len(calls) >= 2
-    config_path = os.getenv("RCLONE_CONFIG")
-    assert calls[0] == ["rclone", "--config", config_path, "listremotes"]
-    create_cmd = next(
-        cmd
-        for cmd in calls
-        if len(cmd) > 8
-        and cmd[3] == "config"
-        and cmd[4] == "create"
-        and "foo" in cmd
-    )
-    cmd = create_cmd
+    assert calls[0] == rclone_cmd("listremotes")
+    cmd = rclone_mock.by_op[("create", "foo")][0]
     assert cmd[0] == "rclone"
     assert "--config" in cmd
-    assert cmd[cmd.index("--config") + 1] == config_path
+    assert cmd[cmd.index("--config") + 1] == RCLONE_CONFIG_PATH
     assert "--non-interactive" in cmd
     assert "config" in cmd
     assert "create" in cmd
@@ -266,11 +470,8 @@ def test_create_rclone_remote_custom_success(monkeypatch, app):
     assert cmd[cmd.index("client_id") + 1] == "cid"
     assert "client_secret" in cmd
     assert cmd[cmd.index("client_secret") + 1] == "sec"
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
-
-    with SessionLocal() as db:
-        stored = db.query(RcloneRemote).filter_by(name="foo").one()
+    with app.SessionLocal() as db:
+        stored = db.query(app.RcloneRemote).filter_by(name="foo").one()
         assert stored.config
         saved_config = json.loads(stored.config)
         assert saved_config == {
@@ -282,29 +483,16 @@ def test_create_rclone_remote_custom_success(monkeypatch, app):
         }
 
 
-def test_create_rclone_remote_custom_retries_without_no_auto_auth(monkeypatch, app):
-    calls = []
-
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(list(cmd))
+def test_create_rclone_remote_custom_retries_without_no_auto_auth(rclone_mock, app, auth_client):
+    def config_create(cmd):
         if "--no-auto-auth" in cmd:
             raise subprocess.CalledProcessError(
                 1, cmd, stderr="Error: unknown flag: --no-auto-auth"
             )
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            payload = {"foo": {"type": "drive", "token": "tok", "scope": "drive"}}
-            return DummyResult(stdout=json.dumps(payload))
-        return DummyResult()
+        return rclone_mock.config_create(cmd)
 
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+    rclone_mock.set_handler("config", "create", config_create)
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "foo",
@@ -317,19 +505,13 @@ def test_create_rclone_remote_custom_retries_without_no_auto_auth(monkeypatch, a
     assert data["status"] == "ok"
     assert data["name"] == "foo"
     assert "id" in data and isinstance(data["id"], int)
+    calls = rclone_mock.calls
     assert len(calls) >= 3
-    create_calls = [
-        cmd
-        for cmd in calls
-        if len(cmd) > 5 and cmd[3] == "config" and cmd[4] == "create"
-    ]
+    create_calls = rclone_mock.by_op[("create", "foo")]
     assert any("--no-auto-auth" in cmd for cmd in create_calls)
     assert "--no-auto-auth" not in create_calls[-1]
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
-
-    with SessionLocal() as db:
-        stored = db.query(RcloneRemote).filter_by(name="foo").one()
+    with app.SessionLocal() as db:
+        stored = db.query(app.RcloneRemote).filter_by(name="foo").one()
         assert json.loads(stored.config) == {
             "type": "drive",
             "token": "tok",
@@ -337,33 +519,13 @@ def test_create_rclone_remote_custom_retries_without_no_auto_auth(monkeypatch, a
         }
 
 
-def test_create_rclone_remote_shared_success(monkeypatch, app):
-    calls: list[list[str]] = []
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-
-        class DummyResult:
-            def __init__(self, stdout: str = "", stderr: str = "") -> None:
-                self.stdout = stdout
-                self.stderr = stderr
-
-        if cmd[-1] == "listremotes":
-            return DummyResult(stdout="gdrive:\n")
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            payload = {"foo": {"type": "alias", "remote": "gdrive:foo"}}
-            return DummyResult(stdout=json.dumps(payload))
-        if "link" in cmd:
-            return DummyResult(
-                stdout="https://drive.google.com/drive/folders/abc123\n"
-            )
-        return DummyResult()
-
+def test_create_rclone_remote_shared_success(monkeypatch, rclone_mock, app, auth_client):
+    rclone_mock.set_listremotes("gdrive:\n")
+    rclone_mock.set_handler(
+        "link", lambda cmd: "https://drive.google.com/drive/folders/abc123\n"
+    )
     monkeypatch.setenv("RCLONE_REMOTE", "gdrive")
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "foo",
@@ -378,56 +540,34 @@ def test_create_rclone_remote_shared_success(monkeypatch, app):
     assert data["route"] == "gdrive:foo"
     assert data["share_url"] == "https://drive.google.com/drive/folders/abc123"
     assert "id" in data and isinstance(data["id"], int)
-    config_path = os.getenv("RCLONE_CONFIG")
-    assert any(cmd == ["rclone", "--config", config_path, "listremotes"] for cmd in calls)
-    mkdir_cmd = next(cmd for cmd in calls if len(cmd) > 3 and cmd[3] == "mkdir")
-    assert mkdir_cmd[4] == "gdrive:foo"
-    alias_cmd = next(cmd for cmd in calls if len(cmd) > 5 and cmd[3:9] == [
+    calls = rclone_mock.calls
+    assert any(cmd == rclone_cmd("listremotes") for cmd in calls)
+    assert rclone_mock.by_op[("mkdir",)][0][4] == "gdrive:foo"
+    alias_cmd = rclone_mock.by_op[("create", "foo")][0]
+    assert alias_cmd[3:9] == [
         "config",
         "create",
         "--non-interactive",
         "foo",
         "alias",
         "remote",
-    ])
+    ]
     assert alias_cmd[9] == "gdrive:foo"
-    assert any(
-        len(cmd) > 4 and cmd[3] == "link" and "--create-link" in cmd and "gdrive:foo" in cmd
-        for cmd in calls
-    )
-    assert any(len(cmd) > 4 and cmd[3] == "link" and "gdrive:foo" in cmd for cmd in calls)
-
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
+    link_cmds = rclone_mock.by_op[("link",)]
+    assert any("--create-link" in cmd and "gdrive:foo" in cmd for cmd in link_cmds)
+    assert any("gdrive:foo" in cmd for cmd in link_cmds)
 
-    with SessionLocal() as db:
-        stored = db.query(RcloneRemote).filter_by(name="foo").one()
+    with app.SessionLocal() as db:
+        stored = db.query(app.RcloneRemote).filter_by(name="foo").one()
         assert stored.type == "drive"
         assert stored.route == "gdrive:foo"
         assert stored.share_url == "https://drive.google.com/drive/folders/abc123"
         assert json.loads(stored.config) == {"type": "alias", "remote": "gdrive:foo"}
 
 
-def test_create_rclone_remote_local_success(monkeypatch, app, tmp_path):
-    calls: list[list[str]] = []
-
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            payload = {"localbackup": {"type": "alias", "remote": str(tmp_path / "localbackup")}}
-            return DummyResult(stdout=json.dumps(payload))
-        return DummyResult()
-
+def test_create_rclone_remote_local_success(monkeypatch, rclone_mock, app, auth_client, tmp_path):
     monkeypatch.setenv("BACKUPER_LOCAL_BACKUPS_DIR", str(tmp_path))
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "localbackup",
@@ -443,19 +583,10 @@ def test_create_rclone_remote_local_success(monkeypatch, app, tmp_path):
     assert data["route"] == str(expected_path)
     assert data["share_url"] == str(expected_path)
     assert "id" in data and isinstance(data["id"], int)
+    calls = rclone_mock.calls
     assert len(calls) >= 2
-    config_path = os.getenv("RCLONE_CONFIG")
-    create_cmd = next(
-        cmd
-        for cmd in calls
-        if len(cmd) > 8
-        and cmd[3] == "config"
-        and cmd[4] == "create"
-        and cmd[6] == "localbackup"
-    )
-    cmd = create_cmd
-    config_path = os.getenv("RCLONE_CONFIG")
-    assert cmd[:3] == ["rclone", "--config", config_path]
+    cmd = rclone_mock.by_op[("create", "localbackup")][0]
+    assert cmd[:3] == rclone_cmd()
     assert cmd[3:9] == [
         "config",
         "create",
@@ -467,59 +598,23 @@ def test_create_rclone_remote_local_success(monkeypatch, app, tmp_path):
     assert cmd[9] == str(expected_path)
     assert expected_path.is_dir()
 
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
-
-    with SessionLocal() as db:
-        stored = db.query(RcloneRemote).filter_by(name="localbackup").one()
+    with app.SessionLocal() as db:
+        stored = db.query(app.RcloneRemote).filter_by(name="localbackup").one()
         assert json.loads(stored.config) == {
             "type": "alias",
             "remote": str(expected_path),
         }
 
 
-def test_update_rclone_remote_local_success(monkeypatch, app, tmp_path):
-    commands: list[list[str]] = []
-
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    config_entries = {
-        "foo": {"type": "alias", "remote": str(tmp_path / "foo")},
-    }
-
-    def fake_run(cmd, capture_output, text, check):
-        commands.append(cmd)
-        if cmd[-1] == "listremotes":
-            return DummyResult(stdout="foo:\n")
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            return DummyResult(stdout=json.dumps(config_entries))
-        if len(cmd) >= 6 and cmd[3] == "config" and cmd[4] == "delete":
-            config_entries.pop(cmd[5], None)
-            return DummyResult()
-        if len(cmd) >= 8 and cmd[3] == "config" and cmd[4] == "create":
-            name = cmd[6]
-            remote_type = cmd[7]
-            options: dict[str, str] = {}
-            for idx in range(8, len(cmd), 2):
-                if idx + 1 >= len(cmd):
-                    break
-                options[cmd[idx]] = cmd[idx + 1]
-            config_entries[name] = {"type": remote_type, **options}
-            return DummyResult()
-        return DummyResult()
-
+def test_update_rclone_remote_local_success(monkeypatch, app, auth_client, rclone_mock, tmp_path):
+    rclone_mock.config["foo"] = {"type": "alias", "remote": str(tmp_path / "foo")}
+    rclone_mock.set_listremotes("foo:\n")
     monkeypatch.setenv("BACKUPER_LOCAL_BACKUPS_DIR", str(tmp_path))
-    monkeypatch.setattr(subprocess, "run", fake_run)
 
     base_folder = tmp_path
     target_folder = base_folder / "foo"
 
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.put(
+    resp = auth_client.put(
         "/rclone/remotes/foo",
         json={"name": "foo", "type": "local", "settings": {"path": str(base_folder)}}
     )
@@ -532,10 +627,10 @@ def test_update_rclone_remote_local_success(monkeypatch, app, tmp_path):
         "name": "foo",
     }
 
-    config_path = os.getenv("RCLONE_CONFIG")
-    assert commands[0] == ["rclone", "--config", config_path, "listremotes"]
+    commands = rclone_mock.calls
+    assert commands[0] == rclone_cmd("listremotes")
     dump_cmd = commands[1]
-    assert dump_cmd[:5] == ["rclone", "--config", config_path, "config", "dump"]
+    assert dump_cmd[:5] == rclone_cmd("config", "dump")
     backup_create_cmd = next(
         cmd
         for cmd in commands
@@ -545,45 +640,29 @@ def test_update_rclone_remote_local_success(monkeypatch, app, tmp_path):
         and cmd[6].startswith("__backup__")
     )
     backup_name = backup_create_cmd[6]
-    assert backup_create_cmd[:8] == [
-        "rclone",
-        "--config",
-        config_path,
+    assert backup_create_cmd[:8] == rclone_cmd(
         "config",
         "create",
         "--non-interactive",
         backup_name,
         "alias",
-    ]
-    delete_cmd = ["rclone", "--config", config_path, "config", "delete", "foo"]
-    assert delete_cmd in commands
-    create_cmd = next(
-        cmd
-        for cmd in commands
-        if len(cmd) >= 10 and cmd[3:9] == [
-            "config",
-            "create",
-            "--non-interactive",
-            "foo",
-            "alias",
-            "remote",
-        ]
     )
-    assert create_cmd[9] == str(expected_path)
-    assert [
-        "rclone",
-        "--config",
-        config_path,
+    delete_cmd = rclone_cmd("config", "delete", "foo")
+    assert delete_cmd in commands
+    create_cmd = rclone_mock.by_op[("create", "foo")][0]
+    assert create_cmd[3:9] == [
         "config",
-        "delete",
-        backup_name,
-    ] in commands
-
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
+        "create",
+        "--non-interactive",
+        "foo",
+        "alias",
+        "remote",
+    ]
+    assert create_cmd[9] == str(expected_path)
+    assert rclone_cmd("config", "delete", backup_name) in commands
 
-    with SessionLocal() as db:
-        stored = db.query(RcloneRemote).filter_by(name="foo").one()
+    with app.SessionLocal() as db:
+        stored = db.query(app.RcloneRemote).filter_by(name="foo").one()
         assert stored.type == "local"
         assert stored.route == str(expected_path)
         assert stored.share_url == str(expected_path)
@@ -594,60 +673,32 @@ def test_update_rclone_remote_local_success(monkeypatch, app, tmp_path):
     assert expected_path.is_dir()
 
 
-def test_update_rclone_remote_failure_restores_backup(monkeypatch, app, tmp_path):
-    commands: list[list[str]] = []
-
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    config_entries = {
-        "foo": {"type": "alias", "remote": str(tmp_path / "foo")},
-    }
+def test_update_rclone_remote_failure_restores_backup(monkeypatch, auth_client, rclone_mock, tmp_path):
+    rclone_mock.config["foo"] = {"type": "alias", "remote": str(tmp_path / "foo")}
+    rclone_mock.set_listremotes("foo:\n")
     fail_next_create = True
 
-    def fake_run(cmd, capture_output, text, check):
-        commands.append(cmd)
-        if cmd[-1] == "listremotes":
-            return DummyResult(stdout="foo:\n")
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            return DummyResult(stdout=json.dumps(config_entries))
-        if len(cmd) >= 6 and cmd[3] == "config" and cmd[4] == "delete":
-            config_entries.pop(cmd[5], None)
-            return DummyResult()
-        if len(cmd) >= 8 and cmd[3] == "config" and cmd[4] == "create":
-            name = cmd[6]
-            remote_type = cmd[7]
-            nonlocal fail_next_create
-            if name == "foo" and fail_next_create:
-                fail_next_create = False
-                raise subprocess.CalledProcessError(1, cmd, stderr="boom")
-            options: dict[str, str] = {}
-            for idx in range(8, len(cmd), 2):
-                if idx + 1 >= len(cmd):
-                    break
-                options[cmd[idx]] = cmd[idx + 1]
-            config_entries[name] = {"type": remote_type, **options}
-            return DummyResult()
-        return DummyResult()
+    def config_create(cmd):
+        nonlocal fail_next_create
+        if cmd[6] == "foo" and fail_next_create:
+            fail_next_create = False
+            raise subprocess.CalledProcessError(1, cmd, stderr="boom")
+        return rclone_mock.config_create(cmd)
 
+    rclone_mock.set_handler("config", "create", config_create)
     monkeypatch.setenv("BACKUPER_LOCAL_BACKUPS_DIR", str(tmp_path))
-    monkeypatch.setattr(subprocess, "run", fake_run)
 
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.put(
+    resp = auth_client.put(
         "/rclone/remotes/foo",
         json={"name": "foo", "type": "local", "settings": {"path": str(tmp_path)}}
     )
     assert resp.status_code == 400
     assert resp.get_json() == {"error": "boom"}
 
-    config_path = os.getenv("RCLONE_CONFIG")
-    assert commands[0] == ["rclone", "--config", config_path, "listremotes"]
+    commands = rclone_mock.calls
+    assert commands[0] == rclone_cmd("listremotes")
     initial_dump = commands[1]
-    assert initial_dump[:5] == ["rclone", "--config", config_path, "config", "dump"]
+    assert initial_dump[:5] == rclone_cmd("config", "dump")
     backup_create_cmd = next(
         cmd
         for cmd in commands
@@ -657,17 +708,14 @@ def test_update_rclone_remote_failure_restores_backup(monkeypatch, app, tmp_path
         and cmd[6].startswith("__backup__")
     )
     backup_name = backup_create_cmd[6]
-    assert backup_create_cmd[:8] == [
-        "rclone",
-        "--config",
-        config_path,
+    assert backup_create_cmd[:8] == rclone_cmd(
         "config",
         "create",
         "--non-interactive",
         backup_name,
         "alias",
-    ]
-    delete_cmd = ["rclone", "--config", config_path, "config", "delete", "foo"]
+    )
+    delete_cmd = rclone_cmd("config", "delete", "foo")
     assert delete_cmd in commands
     failure_cmd = commands[4]
     assert failure_cmd[3:9] == [
@@ -681,39 +729,21 @@ def test_update_rclone_remote_failure_restores_backup(monkeypatch, app, tmp_path
     restore_dump = next(
         cmd
         for cmd in commands
-        if cmd[:5] == ["rclone", "--config", config_path, "config", "dump"]
+        if cmd[:5] == rclone_cmd("config", "dump")
         and cmd is not initial_dump
     )
-    assert restore_dump[:5] == ["rclone", "--config", config_path, "config", "dump"]
-    assert commands.count(["rclone", "--config", config_path, "config", "delete", backup_name]) == 1
-    restore_create_cmd = next(
-        cmd
-        for cmd in commands
-        if len(cmd) >= 8
-        and cmd[3] == "config"
-        and cmd[4] == "create"
-        and cmd[6] == "foo"
-        and cmd is not failure_cmd
-    )
+    assert restore_dump[:5] == rclone_cmd("config", "dump")
+    assert commands.count(rclone_cmd("config", "delete", backup_name)) == 1
+    foo_creates = rclone_mock.by_op[("create", "foo")]
+    assert foo_creates[0] is failure_cmd
+    restore_create_cmd = foo_creates[1]
     assert restore_create_cmd[7] == "alias"
     assert not (tmp_path / "foo").exists()
 
 
-def test_update_rclone_remote_not_found(monkeypatch, app):
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    def fake_run(cmd, capture_output, text, check):
-        if cmd[-1] == "listremotes":
-            return DummyResult(stdout="other:\n")
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.put(
+def test_update_rclone_remote_not_found(auth_client, rclone_mock):
+    rclone_mock.set_listremotes("other:\n")
+    resp = auth_client.put(
         "/rclone/remotes/foo",
         json={"name": "foo", "type": "local", "settings": {"path": "/datos"}},
     )
@@ -721,57 +751,22 @@ def test_update_rclone_remote_not_found(monkeypatch, app):
     assert resp.get_json() == {"error": "remote not found"}
 
 
-def test_delete_rclone_remote_success(monkeypatch, app):
-    commands: list[list[str]] = []
-
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    config_entries = {
-        "foo": {"type": "drive", "token": "tok", "scope": "drive"},
-    }
-
-    def fake_run(cmd, capture_output, text, check):
-        commands.append(cmd)
-        if cmd[-1] == "listremotes":
-            return DummyResult(stdout="foo:\n")
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            return DummyResult(stdout=json.dumps(config_entries))
-        if len(cmd) >= 6 and cmd[3] == "config" and cmd[4] == "delete":
-            config_entries.pop(cmd[5], None)
-            return DummyResult()
-        if len(cmd) >= 8 and cmd[3] == "config" and cmd[4] == "create":
-            name = cmd[6]
-            remote_type = cmd[7]
-            options: dict[str, str] = {}
-            for idx in range(8, len(cmd), 2):
-                if idx + 1 >= len(cmd):
-                    break
-                options[cmd[idx]] = cmd[idx + 1]
-            config_entries[name] = {"type": remote_type, **options}
-            return DummyResult()
-        return DummyResult()
-
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
+def test_delete_rclone_remote_success(app, auth_client, rclone_mock):
+    rclone_mock.config["foo"] = {"type": "drive", "token": "tok", "scope": "drive"}
+    rclone_mock.set_listremotes("foo:\n")
 
-    with SessionLocal() as db:
-        db.add(RcloneRemote(name="foo", type="drive", route="gdrive:foo", share_url="https://demo"))
+    with app.SessionLocal() as db:
+        db.add(app.RcloneRemote(name="foo", type="drive", route="gdrive:foo", share_url="https://demo"))
         db.commit()
 
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.delete("/rclone/remotes/foo")
+    resp = auth_client.delete("/rclone/remotes/foo")
     assert resp.status_code == 200
     assert resp.get_json() == {"status": "ok"}
 
-    config_path = os.getenv("RCLONE_CONFIG")
-    assert commands[0] == ["rclone", "--config", config_path, "listremotes"]
+    commands = rclone_mock.calls
+    assert commands[0] == rclone_cmd("listremotes")
     dump_cmd = commands[1]
-    assert dump_cmd[:5] == ["rclone", "--config", config_path, "config", "dump"]
+    assert dump_cmd[:5] == rclone_cmd("config", "dump")
     backup_create_cmd = next(
         cmd
         for cmd in commands
@@ -782,69 +777,27 @@ def test_delete_rclone_remote_success(monkeypatch, app):
     )
     backup_name = backup_create_cmd[6]
     assert backup_create_cmd[7] == "drive"
-    assert ["rclone", "--config", config_path, "moveto"] in [cmd[:4] for cmd in commands]
-    assert ["rclone", "--config", config_path, "config", "delete", "foo"] in commands
-    purge_cmd = next(cmd for cmd in commands if len(cmd) >= 4 and cmd[3] == "purge")
-    assert purge_cmd[:3] == ["rclone", "--config", config_path]
-    assert [
-        "rclone",
-        "--config",
-        config_path,
-        "config",
-        "delete",
-        backup_name,
-    ] in commands
-
-    with SessionLocal() as db:
-        assert db.query(RcloneRemote).filter_by(name="foo").count() == 0
+    assert rclone_cmd("moveto") in [cmd[:4] for cmd in commands]
+    assert rclone_cmd("config", "delete", "foo") in commands
+    purge_cmd = rclone_mock.by_op[("purge",)][0]
+    assert purge_cmd[:3] == rclone_cmd()
+    assert rclone_cmd("config", "delete", backup_name) in commands
 
+    with app.SessionLocal() as db:
+        assert db.query(app.RcloneRemote).filter_by(name="foo").count() == 0
 
-def test_delete_rclone_remote_local_removes_folder(monkeypatch, app, tmp_path):
-    commands: list[list[str]] = []
-
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    config_entries = {
-        "foo": {"type": "alias", "remote": ""},
-    }
-
-    def fake_run(cmd, capture_output, text, check):
-        commands.append(cmd)
-        if cmd[-1] == "listremotes":
-            return DummyResult(stdout="foo:\n")
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            return DummyResult(stdout=json.dumps(config_entries))
-        if len(cmd) >= 6 and cmd[3] == "config" and cmd[4] == "delete":
-            config_entries.pop(cmd[5], None)
-            return DummyResult()
-        if len(cmd) >= 8 and cmd[3] == "config" and cmd[4] == "create":
-            name = cmd[6]
-            remote_type = cmd[7]
-            options: dict[str, str] = {}
-            for idx in range(8, len(cmd), 2):
-                if idx + 1 >= len(cmd):
-                    break
-                options[cmd[idx]] = cmd[idx + 1]
-            config_entries[name] = {"type": remote_type, **options}
-            return DummyResult()
-        return DummyResult()
 
+def test_delete_rclone_remote_local_removes_folder(monkeypatch, app, auth_client, rclone_mock, tmp_path):
     base_folder = tmp_path
     remote_folder = base_folder / "foo"
     remote_folder.mkdir()
-    config_entries["foo"]["remote"] = str(remote_folder)
+    rclone_mock.config["foo"] = {"type": "alias", "remote": str(remote_folder)}
+    rclone_mock.set_listremotes("foo:\n")
     monkeypatch.setenv("BACKUPER_LOCAL_BACKUPS_DIR", str(base_folder))
-    monkeypatch.setattr(subprocess, "run", fake_run)
 
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote, App
-
-    with SessionLocal() as db:
+    with app.SessionLocal() as db:
         db.add(
-            RcloneRemote(
+            app.RcloneRemote(
                 name="foo",
                 type="local",
                 route=str(remote_folder),
@@ -852,7 +805,7 @@ def test_delete_rclone_remote_local_removes_folder(monkeypatch, app, tmp_path):
             )
         )
         db.add(
-            App(
+            app.App(
                 name="demo",
                 url="http://demo",
                 token="tok",
@@ -861,16 +814,14 @@ def test_delete_rclone_remote_local_removes_folder(monkeypatch, app, tmp_path):
         )
         db.commit()
 
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.delete("/rclone/remotes/foo")
+    resp = auth_client.delete("/rclone/remotes/foo")
     assert resp.status_code == 200
     assert resp.get_json() == {"status": "ok", "removed_path": str(remote_folder)}
 
-    config_path = os.getenv("RCLONE_CONFIG")
-    assert commands[0] == ["rclone", "--config", config_path, "listremotes"]
+    commands = rclone_mock.calls
+    assert commands[0] == rclone_cmd("listremotes")
     dump_cmd = commands[1]
-    assert dump_cmd[:5] == ["rclone", "--config", config_path, "config", "dump"]
+    assert dump_cmd[:5] == rclone_cmd("config", "dump")
     backup_create_cmd = next(
         cmd
         for cmd in commands
@@ -880,43 +831,25 @@ def test_delete_rclone_remote_local_removes_folder(monkeypatch, app, tmp_path):
         and cmd[6].startswith("__delete__")
     )
     backup_name = backup_create_cmd[6]
-    assert ["rclone", "--config", config_path, "config", "delete", "foo"] in commands
-    assert [
-        "rclone",
-        "--config",
-        config_path,
-        "config",
-        "delete",
-        backup_name,
-    ] in commands
+    assert rclone_cmd("config", "delete", "foo") in commands
+    assert rclone_cmd("config", "delete", backup_name) in commands
 
     assert not remote_folder.exists()
 
-    with SessionLocal() as db:
-        assert db.query(RcloneRemote).filter_by(name="foo").count() == 0
-        app_entry = db.query(App).filter_by(name="demo").one()
+    with app.SessionLocal() as db:
+        assert db.query(app.RcloneRemote).filter_by(name="foo").count() == 0
+        app_entry = db.query(app.App).filter_by(name="demo").one()
         assert app_entry.rclone_remote is None
 
 
-def test_delete_rclone_remote_not_found(monkeypatch, app):
-    class DummyResult:
-        stdout = "other:\n"
-        stderr = ""
-
-    def fake_run(cmd, capture_output, text, check):
-        if cmd[-1] == "listremotes":
-            return DummyResult()
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.delete("/rclone/remotes/foo")
+def test_delete_rclone_remote_not_found(auth_client, rclone_mock):
+    rclone_mock.set_listremotes("other:\n")
+    resp = auth_client.delete("/rclone/remotes/foo")
     assert resp.status_code == 404
     assert resp.get_json() == {"error": "remote not found"}
 
 
-def test_restore_persisted_remotes_on_startup(monkeypatch, tmp_path):
+def test_restore_persisted_remotes_on_startup(monkeypatch, rclone_mock, tmp_path):
     db_path = tmp_path / "state.db"
     config_file = tmp_path / "rclone.conf"
     monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_path}")
@@ -926,47 +859,9 @@ def test_restore_persisted_remotes_on_startup(monkeypatch, tmp_path):
     monkeypatch.setenv("BACKUPER_LOCAL_BACKUPS_DIR", str(tmp_path))
     monkeypatch.setenv("RCLONE_CONFIG", str(config_file))
 
-    commands: list[list[str]] = []
-    config_entries: dict[str, dict[str, str]] = {}
-
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    def fake_run(cmd, capture_output, text, check):
-        commands.append(list(cmd))
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            return DummyResult(stdout=json.dumps(config_entries))
-        if len(cmd) >= 8 and cmd[3] == "config" and cmd[4] == "create":
-            name = cmd[6]
-            remote_type = cmd[7]
-            options: dict[str, str] = {}
-            for idx in range(8, len(cmd), 2):
-                if idx + 1 >= len(cmd):
-                    break
-                options[cmd[idx]] = cmd[idx + 1]
-            config_entries[name] = {"type": remote_type, **options}
-            return DummyResult()
-        if len(cmd) >= 6 and cmd[3] == "config" and cmd[4] == "delete":
-            config_entries.pop(cmd[5], None)
-            return DummyResult()
-        if cmd[-1] == "listremotes":
-            stdout = "".join(f"{name}:\n" for name in config_entries)
-            return DummyResult(stdout=stdout)
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-
-    app_module = importlib.import_module("orchestrator.app")
-    db_module = importlib.import_module("orchestrator.app.database")
-    models_module = importlib.import_module("orchestrator.app.models")
-    importlib.reload(db_module)
-    importlib.reload(models_module)
-    importlib.reload(app_module)
-    monkeypatch.setattr(app_module, "start_scheduler", lambda: None)
-    monkeypatch.setattr(app_module, "schedule_app_backups", lambda: None)
-    app = app_module.create_app()
+    config_entries = rclone_mock.config
+
+    app = reload_app_modules(monkeypatch).create_app()
 
     client = app.test_client()
     client.post("/login", data={"username": "admin", "password": "secret"})
@@ -982,26 +877,13 @@ def test_restore_persisted_remotes_on_startup(monkeypatch, tmp_path):
     assert "localbackup" in config_entries
 
     config_entries.clear()
-    commands.clear()
+    rclone_mock.reset_calls()
 
-    importlib.reload(db_module)
-    importlib.reload(models_module)
-    importlib.reload(app_module)
-    monkeypatch.setattr(app_module, "start_scheduler", lambda: None)
-    monkeypatch.setattr(app_module, "schedule_app_backups", lambda: None)
-    new_app = app_module.create_app()
+    new_app = reload_app_modules(monkeypatch).create_app()
 
     assert "localbackup" in config_entries
-    restore_creates = [
-        cmd
-        for cmd in commands
-        if len(cmd) >= 8
-        and cmd[3] == "config"
-        and cmd[4] == "create"
-        and cmd[6] == "localbackup"
-    ]
-    assert restore_creates
-    assert any(cmd[-1] == "listremotes" for cmd in commands)
+    assert rclone_mock.by_op.get(("create", "localbackup"))
+    assert rclone_mock.by_op.get(("listremotes",))
 
     with new_app.app_context():
         from orchestrator.app import SessionLocal
@@ -1011,7 +893,7 @@ def test_restore_persisted_remotes_on_startup(monkeypatch, tmp_path):
             stored = db.query(RcloneRemote).filter_by(name="localbackup").one()
             assert stored.config
 
-def test_restore_persisted_remotes_backfills_missing_config(monkeypatch, tmp_path):
+def test_restore_persisted_remotes_backfills_missing_config(monkeypatch, rclone_mock, tmp_path):
     db_path = tmp_path / "state.db"
     config_file = tmp_path / "rclone.conf"
     monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_path}")
@@ -1020,49 +902,10 @@ def test_restore_persisted_remotes_backfills_missing_config(monkeypatch, tmp_pat
     monkeypatch.setenv("APP_SECRET_KEY", "key")
     monkeypatch.setenv("RCLONE_CONFIG", str(config_file))
 
-    commands: list[list[str]] = []
-    config_entries = {
-        "legacy": {"type": "alias", "remote": str(tmp_path / "legacy")},
-    }
+    commands = rclone_mock.calls
+    rclone_mock.config["legacy"] = {"type": "alias", "remote": str(tmp_path / "legacy")}
 
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    def fake_run(cmd, capture_output, text, check):
-        commands.append(list(cmd))
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            return DummyResult(stdout=json.dumps(config_entries))
-        if len(cmd) >= 6 and cmd[3] == "config" and cmd[4] == "delete":
-            config_entries.pop(cmd[5], None)
-            return DummyResult()
-        if len(cmd) >= 8 and cmd[3] == "config" and cmd[4] == "create":
-            name = cmd[6]
-            remote_type = cmd[7]
-            options: dict[str, str] = {}
-            for idx in range(8, len(cmd), 2):
-                if idx + 1 >= len(cmd):
-                    break
-                options[cmd[idx]] = cmd[idx + 1]
-            config_entries[name] = {"type": remote_type, **options}
-            return DummyResult()
-        if cmd[-1] == "listremotes":
-            stdout = "".join(f"{name}:\n" for name in config_entries)
-            return DummyResult(stdout=stdout)
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-
-    app_module = importlib.import_module("orchestrator.app")
-    db_module = importlib.import_module("orchestrator.app.database")
-    models_module = importlib.import_module("orchestrator.app.models")
-    importlib.reload(db_module)
-    importlib.reload(models_module)
-    importlib.reload(app_module)
-    monkeypatch.setattr(app_module, "start_scheduler", lambda: None)
-    monkeypatch.setattr(app_module, "schedule_app_backups", lambda: None)
-    app = app_module.create_app()
+    app = reload_app_modules(monkeypatch).create_app()
 
     from orchestrator.app import SessionLocal
     from orchestrator.app.models import RcloneRemote
@@ -1071,7 +914,7 @@ def test_restore_persisted_remotes_backfills_missing_config(monkeypatch, tmp_pat
         db.add(RcloneRemote(name="legacy", type="alias", config=None))
         db.commit()
 
-    commands.clear()
+    rclone_mock.reset_calls()
     app.restore_persisted_remotes()
 
     assert not any(cmd[3:5] == ["config", "dump"] for cmd in commands)
@@ -1091,26 +934,12 @@ def test_restore_persisted_remotes_backfills_missing_config(monkeypatch, tmp_pat
         stored = db.query(RcloneRemote).filter_by(name="legacy").one()
         assert stored.config is None
 
-def test_browse_sftp_directories_success(monkeypatch, app):
-    calls: list[list[str]] = []
-
-    class DummyResult:
-        def __init__(self, stdout: str = ""):
-            self.stdout = stdout
-            self.stderr = ""
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-        if "obscure" in cmd:
-            return DummyResult("obscured-pass\n")
-        if "lsjson" in cmd:
-            return DummyResult('[{"Name": "backups"}, {"Name": "logs"}]')
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+def test_browse_sftp_directories_success(auth_client, rclone_mock):
+    rclone_mock.set_handler("obscure", lambda cmd: "obscured-pass\n")
+    rclone_mock.set_handler(
+        "lsjson", lambda cmd: '[{"Name": "backups"}, {"Name": "logs"}]'
+    )
+    resp = auth_client.post(
         "/rclone/remotes/sftp/browse",
         json={"host": "example.com", "username": "user", "password": "pass"},
     )
@@ -1122,6 +951,7 @@ def test_browse_sftp_directories_success(monkeypatch, app):
         {"name": "backups", "path": "/backups"},
         {"name": "logs", "path": "/logs"},
     ]
+    calls = rclone_mock.calls
     assert len(calls) == 3
     obscure_cmd, config_cmd, lsjson_cmd = calls
     assert obscure_cmd[0] == "rclone"
@@ -1139,23 +969,13 @@ def test_browse_sftp_directories_success(monkeypatch, app):
     assert "--dirs-only" in lsjson_cmd
 
 
-def test_browse_sftp_directories_permission_error(monkeypatch, app):
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = ""):
-            self.stdout = stdout
-            self.stderr = stderr
+def test_browse_sftp_directories_permission_error(auth_client, rclone_mock):
+    def lsjson(cmd):
+        raise subprocess.CalledProcessError(1, cmd, stderr="permission denied")
 
-    def fake_run(cmd, capture_output, text, check):
-        if "obscure" in cmd:
-            return DummyResult(stdout="obscured-pass\n")
-        if "lsjson" in cmd:
-            raise subprocess.CalledProcessError(1, cmd, stderr="permission denied")
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+    rclone_mock.set_handler("obscure", lambda cmd: "obscured-pass\n")
+    rclone_mock.set_handler("lsjson", lsjson)
+    resp = auth_client.post(
         "/rclone/remotes/sftp/browse",
         json={"host": "example.com", "username": "user", "password": "pass"},
     )
@@ -1165,15 +985,8 @@ def test_browse_sftp_directories_permission_error(monkeypatch, app):
     }
 
 
-def test_create_sftp_remote_requires_base_path(monkeypatch, app):
-    class DummyResult:
-        stdout = ""
-        stderr = ""
-
-    monkeypatch.setattr(subprocess, "run", lambda *args, **kwargs: DummyResult())
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+def test_create_sftp_remote_requires_base_path(auth_client, rclone_mock):
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "sftpbackup",
@@ -1187,35 +1000,20 @@ def test_create_sftp_remote_requires_base_path(monkeypatch, app):
     }
 
 
-def test_create_sftp_remote_success(monkeypatch, app):
-    calls: list[list[str]] = []
-
-    class DummyResult:
-        def __init__(self, stdout: str = ""):
-            self.stdout = stdout
-            self.stderr = ""
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-        if "obscure" in cmd:
-            return DummyResult("obscured-pass\n")
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            payload = {
-                "sftpbackup": {
-                    "type": "sftp",
-                    "host": "example.com",
-                    "user": "user",
-                    "pass": "obscured-pass",
-                    "path": "/data/sftpbackup",
-                }
-            }
-            return DummyResult(stdout=json.dumps(payload))
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+def test_create_sftp_remote_success(app, auth_client, rclone_mock):
+    payload = {
+        "sftpbackup": {
+            "type": "sftp",
+            "host": "example.com",
+            "user": "user",
+            "pass": "obscured-pass",
+            "path": "/data/sftpbackup",
+        }
+    }
+    rclone_mock.set_handler("obscure", lambda cmd: "obscured-pass\n")
+    rclone_mock.set_handler("config", "create", lambda cmd: None)
+    rclone_mock.set_handler("config", "dump", lambda cmd: json.dumps(payload))
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "sftpbackup",
@@ -1236,44 +1034,28 @@ def test_create_sftp_remote_success(monkeypatch, app):
     assert data["share_url"] == "/data/sftpbackup"
     assert "id" in data and isinstance(data["id"], int)
 
-    config_path = os.getenv("RCLONE_CONFIG")
-    list_cmd = next(cmd for cmd in calls if cmd[-1] == "listremotes")
-    assert list_cmd == ["rclone", "--config", config_path, "listremotes"]
-    obscure_cmd = next(cmd for cmd in calls if "obscure" in cmd)
+    assert rclone_mock.by_op[("listremotes",)][0] == rclone_cmd("listremotes")
+    obscure_cmd = rclone_mock.by_op[("obscure",)][0]
     assert obscure_cmd[0] == "rclone"
     assert obscure_cmd[-1] == "pass"
-    config_cmd = next(
-        cmd for cmd in calls if cmd[3:7] == ["config", "create", "--non-interactive", "sftpbackup"]
-    )
+    config_cmd = rclone_mock.by_op[("create", "sftpbackup")][0]
+    assert config_cmd[3:7] == ["config", "create", "--non-interactive", "sftpbackup"]
     path_index = config_cmd.index("path")
     assert config_cmd[path_index + 1] == "/data"
     assert config_cmd[config_cmd.index("pass") + 1] == "obscured-pass"
-    update_cmd = next(
-        cmd
-        for cmd in calls
-        if cmd[3:8] == ["config", "update", "--non-interactive", "sftpbackup", "path"]
-    )
+    update_cmd = rclone_mock.by_op[("update", "sftpbackup")][0]
+    assert update_cmd[3:8] == ["config", "update", "--non-interactive", "sftpbackup", "path"]
     assert update_cmd[-1] == "/data/sftpbackup"
-    mkdir_cmd = next(cmd for cmd in calls if cmd[3:] == ["mkdir", "sftpbackup:sftpbackup"])
-    lsd_cmd = next(cmd for cmd in calls if cmd[3:] == ["lsd", "sftpbackup:"])
+    mkdir_cmd = rclone_mock.by_op[("mkdir",)][0]
+    assert mkdir_cmd[3:] == ["mkdir", "sftpbackup:sftpbackup"]
+    lsd_cmd = rclone_mock.by_op[("lsd",)][0]
+    assert lsd_cmd[3:] == ["lsd", "sftpbackup:"]
     assert mkdir_cmd[0] == "rclone"
     assert lsd_cmd[0] == "rclone"
 
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
-
-    with SessionLocal() as db:
-        stored = db.query(RcloneRemote).filter_by(name="sftpbackup").one()
+    with app.SessionLocal() as db:
+        stored = db.query(app.RcloneRemote).filter_by(name="sftpbackup").one()
         assert stored.config
-        stored_config = json.loads(stored.config)
-        assert stored_config.get("type") == "sftp"
-        assert stored_config.get("path") == "/data/sftpbackup"
-
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
-
-    with SessionLocal() as db:
-        stored = db.query(RcloneRemote).filter_by(name="sftpbackup").one()
         assert json.loads(stored.config) == {
             "type": "sftp",
             "host": "example.com",
@@ -1283,26 +1065,13 @@ def test_create_sftp_remote_success(monkeypatch, app):
         }
 
 
-def test_create_sftp_remote_permission_error(monkeypatch, app):
-    calls: list[list[str]] = []
+def test_create_sftp_remote_permission_error(auth_client, rclone_mock):
+    def mkdir(cmd):
+        raise subprocess.CalledProcessError(1, cmd, stderr="permission denied")
 
-    class DummyResult:
-        def __init__(self, stdout: str = ""):
-            self.stdout = stdout
-            self.stderr = ""
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-        if "obscure" in cmd:
-            return DummyResult("obscured-pass\n")
-        if "mkdir" in cmd:
-            raise subprocess.CalledProcessError(1, cmd, stderr="permission denied")
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+    rclone_mock.set_handler("obscure", lambda cmd: "obscured-pass\n")
+    rclone_mock.set_handler("mkdir", mkdir)
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "sftpbackup",
@@ -1319,47 +1088,22 @@ def test_create_sftp_remote_permission_error(monkeypatch, app):
     assert resp.get_json() == {
         "error": "El usuario SFTP no tiene permisos suficientes en esa carpeta. Probá con otra ubicación o ajustá los permisos en el servidor.",
     }
-    config_path = os.getenv("RCLONE_CONFIG")
-    assert any(cmd == ["rclone", "--config", config_path, "listremotes"] for cmd in calls)
-    delete_cmd = next(cmd for cmd in calls if cmd[3:6] == ["config", "delete", "sftpbackup"])
-    assert delete_cmd[:3] == ["rclone", "--config", config_path]
+    calls = rclone_mock.calls
+    assert any(cmd == rclone_cmd("listremotes") for cmd in calls)
+    delete_cmd = rclone_mock.by_op[("delete", "sftpbackup")][0]
+    assert delete_cmd[:3] == rclone_cmd()
 
 
-def test_create_rclone_remote_nested_config_path(monkeypatch, app, tmp_path):
-    calls: list[list[str]] = []
-    config_entries: dict[str, dict[str, str]] = {}
+def test_create_rclone_remote_nested_config_path(monkeypatch, app, auth_client, rclone_mock, tmp_path):
+    calls = rclone_mock.calls
     nested_config = tmp_path / "deep" / "nested" / "rclone.conf"
     default_config = tmp_path / "default" / "nested" / "rclone.conf"
     assert not nested_config.parent.exists()
     assert not default_config.parent.exists()
 
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            return DummyResult(stdout=json.dumps(config_entries))
-        if len(cmd) >= 8 and cmd[3] == "config" and cmd[4] == "create":
-            name = cmd[6]
-            remote_type = cmd[7]
-            options: dict[str, str] = {}
-            for idx in range(8, len(cmd), 2):
-                if idx + 1 >= len(cmd):
-                    break
-                options[cmd[idx]] = cmd[idx + 1]
-            config_entries[name] = {"type": remote_type, **options}
-            return DummyResult()
-        return DummyResult()
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
 
     monkeypatch.setenv("RCLONE_CONFIG", str(nested_config))
-    resp = client.post(
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "foo",
@@ -1374,22 +1118,12 @@ def test_create_rclone_remote_nested_config_path(monkeypatch, app, tmp_path):
     assert "id" in data and isinstance(data["id"], int)
     assert "route" not in data
     assert nested_config.parent.is_dir()
-    create_cmd = next(
-        cmd
-        for cmd in calls
-        if len(cmd) > 8
-        and cmd[3] == "config"
-        and cmd[4] == "create"
-        and cmd[6] == "foo"
-    )
+    create_cmd = rclone_mock.by_op[("create", "foo")][0]
     assert "--config" in create_cmd
     config_index = create_cmd.index("--config")
     assert create_cmd[config_index + 1] == str(nested_config)
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
-
-    with SessionLocal() as db:
-        stored = db.query(RcloneRemote).filter_by(name="foo").one()
+    with app.SessionLocal() as db:
+        stored = db.query(app.RcloneRemote).filter_by(name="foo").one()
         assert json.loads(stored.config) == {
             "type": "drive",
             "token": "tok",
@@ -1398,9 +1132,8 @@ def test_create_rclone_remote_nested_config_path(monkeypatch, app, tmp_path):
 
     calls.clear()
     monkeypatch.delenv("RCLONE_CONFIG", raising=False)
-    app_module = importlib.import_module("orchestrator.app")
-    monkeypatch.setattr(app_module, "DEFAULT_RCLONE_CONFIG", str(default_config))
-    resp = client.post(
+    monkeypatch.setattr(get_app_module(), "DEFAULT_RCLONE_CONFIG", str(default_config))
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "bar",
@@ -1415,19 +1148,12 @@ def test_create_rclone_remote_nested_config_path(monkeypatch, app, tmp_path):
     assert "id" in data and isinstance(data["id"], int)
     assert "route" not in data
     assert default_config.parent.is_dir()
-    create_cmd = next(
-        cmd
-        for cmd in calls
-        if len(cmd) > 8
-        and cmd[3] == "config"
-        and cmd[4] == "create"
-        and cmd[6] == "bar"
-    )
+    create_cmd = rclone_mock.by_op[("create", "bar")][0]
     assert "--config" in create_cmd
     config_index = create_cmd.index("--config")
     assert create_cmd[config_index + 1] == str(default_config)
-    with SessionLocal() as db:
-        stored = db.query(RcloneRemote).filter_by(name="bar").one()
+    with app.SessionLocal() as db:
+        stored = db.query(app.RcloneRemote).filter_by(name="bar").one()
         assert json.loads(stored.config) == {
             "type": "drive",
             "token": "tok",
@@ -1435,24 +1161,12 @@ def test_create_rclone_remote_nested_config_path(monkeypatch, app, tmp_path):
         }
 
 
-def test_create_rclone_remote_failure(monkeypatch, app):
-    calls: list[list[str]] = []
-
-    class DummyResult:
-        def __init__(self, stdout: str = "", stderr: str = "") -> None:
-            self.stdout = stdout
-            self.stderr = stderr
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-        if cmd[-1] == "listremotes":
-            return DummyResult(stdout="")
+def test_create_rclone_remote_failure(auth_client, rclone_mock):
+    def fail(cmd):
         raise subprocess.CalledProcessError(1, cmd, stderr="boom")
 
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+    rclone_mock.set_fallback(fail)
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "foo",
@@ -1462,36 +1176,28 @@ def test_create_rclone_remote_failure(monkeypatch, app):
     )
     assert resp.status_code == 400
     assert resp.get_json() == {"error": "boom"}
-    config_path = os.getenv("RCLONE_CONFIG")
-    assert calls[0] == ["rclone", "--config", config_path, "listremotes"]
-
-
-def test_create_rclone_remote_shared_share_failure(monkeypatch, app):
-    def fake_run(cmd, capture_output, text, check):
-        class DummyResult:
-            def __init__(self, stdout: str = "", stderr: str = "") -> None:
-                self.stdout = stdout
-                self.stderr = stderr
-
-        if cmd[-1] == "listremotes":
-            return DummyResult(stdout="gdrive:\n")
-        if len(cmd) > 3 and cmd[3] == "lsf":
-            assert "--dir-only" not in cmd
-            assert any(flag in cmd for flag in ("--dirs-only", "--files-only"))
-            return DummyResult(stdout="")
-        if "mkdir" in cmd:
-            return DummyResult()
-        if "config" in cmd and "alias" in cmd:
-            return DummyResult()
-        if "link" in cmd:
-            raise subprocess.CalledProcessError(1, cmd, stderr="share failed")
+    assert rclone_mock.calls[0] == rclone_cmd("listremotes")
+
+
+def test_create_rclone_remote_shared_share_failure(monkeypatch, auth_client, rclone_mock):
+    def lsf(cmd):
+        assert "--dir-only" not in cmd
+        assert any(flag in cmd for flag in ("--dirs-only", "--files-only"))
+
+    def link(cmd):
+        raise subprocess.CalledProcessError(1, cmd, stderr="share failed")
+
+    def unexpected(cmd):
         raise AssertionError("unexpected command execution order")
 
+    rclone_mock.set_fallback(unexpected)
+    rclone_mock.set_listremotes("gdrive:\n")
+    rclone_mock.set_handler("lsf", lsf)
+    rclone_mock.set_handler("mkdir", lambda cmd: None)
+    rclone_mock.set_handler("config", "create", lambda cmd: None)
+    rclone_mock.set_handler("link", link)
     monkeypatch.setenv("RCLONE_REMOTE", "gdrive")
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "foo",
@@ -1503,32 +1209,25 @@ def test_create_rclone_remote_shared_share_failure(monkeypatch, app):
     assert resp.get_json() == {"error": "share failed"}
 
 
-def test_create_rclone_remote_shared_missing_share_url(monkeypatch, app):
-    def fake_run(cmd, capture_output, text, check):
-        class DummyResult:
-            def __init__(self, stdout: str = "", stderr: str = "") -> None:
-                self.stdout = stdout
-                self.stderr = stderr
-
-        if cmd[-1] == "listremotes":
-            return DummyResult(stdout="gdrive:\n")
-        if len(cmd) > 3 and cmd[3] == "lsf":
-            assert "--dir-only" not in cmd
-            assert any(flag in cmd for flag in ("--dirs-only", "--files-only"))
-            return DummyResult(stdout="")
-        if "mkdir" in cmd:
-            return DummyResult()
-        if "config" in cmd and "alias" in cmd:
-            return DummyResult()
-        if "link" in cmd:
-            return DummyResult(stdout="\n")
+def test_create_rclone_remote_shared_missing_share_url(monkeypatch, auth_client, rclone_mock):
+    def lsf(cmd):
+        assert "--dir-only" not in cmd
+        assert any(flag in cmd for flag in ("--dirs-only", "--files-only"))
+
+    def link(cmd):
+        return "\n"
+
+    def unexpected(cmd):
         raise AssertionError("unexpected command execution order")
 
+    rclone_mock.set_fallback(unexpected)
+    rclone_mock.set_listremotes("gdrive:\n")
+    rclone_mock.set_handler("lsf", lsf)
+    rclone_mock.set_handler("mkdir", lambda cmd: None)
+    rclone_mock.set_handler("config", "create", lambda cmd: None)
+    rclone_mock.set_handler("link", link)
     monkeypatch.setenv("RCLONE_REMOTE", "gdrive")
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+    resp = auth_client.post(
         "/rclone/remotes",
         json={"name": "foo", "type": "drive", "settings": {"mode": "shared"}},
     )
@@ -1538,15 +1237,8 @@ def test_create_rclone_remote_shared_missing_share_url(monkeypatch, app):
     }
 
 
-def test_create_rclone_remote_invalid_drive_mode(monkeypatch, app):
-    class DummyResult:
-        stdout = ""
-        stderr = ""
-
-    monkeypatch.setattr(subprocess, "run", lambda *args, **kwargs: DummyResult())
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+def test_create_rclone_remote_invalid_drive_mode(auth_client, rclone_mock):
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "foo",
@@ -1558,47 +1250,16 @@ def test_create_rclone_remote_invalid_drive_mode(monkeypatch, app):
     assert resp.get_json() == {"error": "invalid drive mode"}
 
 
-def test_create_rclone_remote_shared_bootstrap_default_remote(monkeypatch, app):
-    calls: list[list[str]] = []
-    config_entries: dict[str, dict[str, str]] = {}
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-
-        class DummyResult:
-            def __init__(self, stdout: str = "", stderr: str = "") -> None:
-                self.stdout = stdout
-                self.stderr = stderr
-
-        if cmd[-1] == "listremotes":
-            stdout = "".join(f"{name}:\n" for name in config_entries)
-            return DummyResult(stdout=stdout)
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            return DummyResult(stdout=json.dumps(config_entries))
-        if len(cmd) >= 8 and cmd[3] == "config" and cmd[4] == "create":
-            name = cmd[6]
-            remote_type = cmd[7]
-            options: dict[str, str] = {}
-            for idx in range(8, len(cmd), 2):
-                if idx + 1 >= len(cmd):
-                    break
-                options[cmd[idx]] = cmd[idx + 1]
-            config_entries[name] = {"type": remote_type, **options}
-            return DummyResult()
-        if "link" in cmd:
-            return DummyResult(
-                stdout="https://drive.google.com/drive/folders/new\n"
-            )
-        return DummyResult()
-
+def test_create_rclone_remote_shared_bootstrap_default_remote(monkeypatch, app, auth_client, rclone_mock):
+    calls = rclone_mock.calls
+    rclone_mock.set_handler(
+        "link", lambda cmd: "https://drive.google.com/drive/folders/new\n"
+    )
     monkeypatch.setenv("RCLONE_REMOTE", "gdrive")
     monkeypatch.setenv("RCLONE_DRIVE_CLIENT_ID", "cid")
     monkeypatch.setenv("RCLONE_DRIVE_CLIENT_SECRET", "sec")
     monkeypatch.setenv("RCLONE_DRIVE_TOKEN", "token-json")
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "foo",
@@ -1614,31 +1275,10 @@ def test_create_rclone_remote_shared_bootstrap_default_remote(monkeypatch, app):
     assert data["share_url"] == "https://drive.google.com/drive/folders/new"
     assert "id" in data and isinstance(data["id"], int)
 
-    config_path = os.getenv("RCLONE_CONFIG")
-    list_calls = [cmd for cmd in calls if cmd == ["rclone", "--config", config_path, "listremotes"]]
+    list_calls = [cmd for cmd in calls if cmd == rclone_cmd("listremotes")]
     assert len(list_calls) >= 2
-    default_create = next(
-        cmd
-        for cmd in calls
-        if cmd[:8]
-        == [
-            "rclone",
-            "--config",
-            config_path,
-            "config",
-            "create",
-            "--non-interactive",
-            "gdrive",
-            "drive",
-        ]
-    )
-    assert default_create[:5] == [
-        "rclone",
-        "--config",
-        config_path,
-        "config",
-        "create",
-    ]
+    default_create = rclone_mock.by_op[("create", "gdrive")][0]
+    assert default_create[:5] == rclone_cmd("config", "create")
     assert default_create[5] == "--non-interactive"
     assert default_create[6] == "gdrive"
     assert default_create[7] == "drive"
@@ -1650,54 +1290,35 @@ def test_create_rclone_remote_shared_bootstrap_default_remote(monkeypatch, app):
     assert "client_secret" in default_create
     assert default_create[default_create.index("client_secret") + 1] == "sec"
     assert any(
-        len(cmd) > 4
-        and cmd[:4] == ["rclone", "--config", config_path, "mkdir"]
-        and "foo" in cmd[-1]
-        for cmd in calls
-    )
-    alias_cmd = next(
-        cmd for cmd in calls if cmd[3:9] == [
-            "config",
-            "create",
-            "--non-interactive",
-            "foo",
-            "alias",
-            "remote",
-        ]
+        cmd[:4] == rclone_cmd("mkdir") and "foo" in cmd[-1]
+        for cmd in rclone_mock.by_op[("mkdir",)]
     )
+    alias_cmd = rclone_mock.by_op[("create", "foo")][0]
+    assert alias_cmd[3:9] == [
+        "config",
+        "create",
+        "--non-interactive",
+        "foo",
+        "alias",
+        "remote",
+    ]
     assert alias_cmd[9] == "gdrive:foo"
-    link_cmd = next(cmd for cmd in calls if len(cmd) > 3 and cmd[3] == "link")
-    assert link_cmd[:3] == ["rclone", "--config", config_path]
+    link_cmd = rclone_mock.by_op[("link",)][0]
+    assert link_cmd[:3] == rclone_cmd()
     assert "gdrive:foo" in link_cmd
-    from orchestrator.app import SessionLocal
-    from orchestrator.app.models import RcloneRemote
-
-    with SessionLocal() as db:
-        stored = db.query(RcloneRemote).filter_by(name="foo").one()
+    with app.SessionLocal() as db:
+        stored = db.query(app.RcloneRemote).filter_by(name="foo").one()
         assert json.loads(stored.config) == {"type": "alias", "remote": "gdrive:foo"}
 
 
 
-def test_create_rclone_remote_shared_missing_default_remote(monkeypatch, app):
-    calls: list[list[str]] = []
-
-    def fake_run(cmd, capture_output, text, check):
-        calls.append(cmd)
-
-        class DummyResult:
-            def __init__(self, stdout: str = "", stderr: str = "") -> None:
-                self.stdout = stdout
-                self.stderr = stderr
-
-        if cmd[-1] == "listremotes":
-            return DummyResult(stdout="")
+def test_create_rclone_remote_shared_missing_default_remote(monkeypatch, auth_client, rclone_mock):
+    def unexpected(cmd):
         raise AssertionError("unexpected command execution order")
 
+    rclone_mock.set_fallback(unexpected)
     monkeypatch.setenv("RCLONE_REMOTE", "gdrive")
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    client = app.test_client()
-    client.post("/login", data={"username": "admin", "password": "secret"})
-    resp = client.post(
+    resp = auth_client.post(
         "/rclone/remotes",
         json={
             "name": "foo",
@@ -1709,5 +1330,4 @@ def test_create_rclone_remote_shared_missing_default_remote(monkeypatch, app):
     assert resp.get_json() == {
         "error": "La cuenta global de Google Drive no está configurada. Revisá las variables RCLONE_DRIVE_CLIENT_ID, RCLONE_DRIVE_CLIENT_SECRET y RCLONE_DRIVE_TOKEN.",
     }
-    config_path = os.getenv("RCLONE_CONFIG")
-    assert sum(1 for cmd in calls if cmd == ["rclone", "--config", config_path, "listremotes"]) == 2
+    assert sum(1 for cmd in rclone_mock.calls if cmd == rclone_cmd("listremotes")) == 2
@@ -4,10 +4,64 @@ import sys
 import tempfile
 import importlib
 import subprocess
-from types import SimpleNamespace
+from collections import namedtuple
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+DummyResult = namedtuple("DummyResult", "stdout stderr", defaults=("", ""))
+
+
+def _succeed(cmd):
+    return DummyResult()
+
+
+def dispatch(handlers, cmd):
+    """Run the handler for the rclone subcommand in *cmd*.
+
+    Handlers are keyed on the two words after ``rclone --config <path>``
+    (``("config", "dump")``), or on the first one alone (``("obscure",)``).
+    Commands without a handler succeed with empty output.
+    """
+    handler = handlers.get(tuple(cmd[3:5])) or handlers.get(tuple(cmd[3:4]), _succeed)
+    return handler(cmd)
+
+
+def config_store_handlers(config_entries):
+    """Handlers that keep ``rclone config`` dump/create/update in *config_entries*."""
+
+    def dump(cmd):
+        return DummyResult(stdout=json.dumps(config_entries))
+
+    def create(cmd):
+        name = cmd[6]
+        remote_type = cmd[7]
+        options: dict[str, str] = {}
+        for idx in range(8, len(cmd), 2):
+            if idx + 1 >= len(cmd):
+                break
+            options[cmd[idx]] = cmd[idx + 1]
+        config_entries[name] = {"type": remote_type, **options}
+        return DummyResult()
+
+    def update(cmd):
+        index = 5
+        if cmd[index] == "--non-interactive":
+            index += 1
+        name = cmd[index]
+        index += 1
+        entry = config_entries.get(name, {}).copy()
+        while index + 1 < len(cmd):
+            entry[cmd[index]] = cmd[index + 1]
+            index += 2
+        config_entries[name] = entry
+        return DummyResult()
+
+    return {
+        ("config", "dump"): dump,
+        ("config", "create"): create,
+        ("config", "update"): update,
+    }
+
 
 def make_app(monkeypatch, **extra_env):
     default_local_dir = extra_env.get("BACKUPER_LOCAL_BACKUPS_DIR")
@@ -98,7 +152,7 @@ def test_drive_validate_success(monkeypatch):
     def fake_run(cmd, **kwargs):
         recorded["cmd"] = cmd
         recorded["kwargs"] = kwargs
-        return SimpleNamespace(stdout="", stderr="")
+        return DummyResult()
 
     monkeypatch.setattr(app_module.subprocess, "run", fake_run)
     client = app.test_client()
@@ -159,35 +213,11 @@ def test_create_local_remote(monkeypatch, tmp_path):
     commands: list[list[str]] = []
     config_entries: dict[str, dict[str, str]] = {}
 
+    handlers = config_store_handlers(config_entries)
+
     def fake_run(cmd, **kwargs):
         commands.append(list(cmd))
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            return SimpleNamespace(stdout=json.dumps(config_entries), stderr="")
-        if len(cmd) >= 8 and cmd[3] == "config" and cmd[4] == "create":
-            name = cmd[6]
-            remote_type = cmd[7]
-            options: dict[str, str] = {}
-            for idx in range(8, len(cmd), 2):
-                if idx + 1 >= len(cmd):
-                    break
-                options[cmd[idx]] = cmd[idx + 1]
-            config_entries[name] = {"type": remote_type, **options}
-            return SimpleNamespace(stdout="", stderr="")
-        if len(cmd) >= 6 and cmd[3] == "config" and cmd[4] == "update":
-            index = 5
-            if cmd[index] == "--non-interactive":
-                index += 1
-            name = cmd[index]
-            index += 1
-            entry = config_entries.get(name, {}).copy()
-            while index + 1 < len(cmd):
-                key = cmd[index]
-                value = cmd[index + 1]
-                entry[key] = value
-                index += 2
-            config_entries[name] = entry
-            return SimpleNamespace(stdout="", stderr="")
-        return SimpleNamespace(stdout="", stderr="")
+        return dispatch(handlers, cmd)
 
     monkeypatch.setattr(app_module.subprocess, "run", fake_run)
     client = app.test_client()
@@ -239,21 +269,11 @@ def test_create_local_remote_with_quoted_directory(monkeypatch, tmp_path):
     commands: list[list[str]] = []
     config_entries: dict[str, dict[str, str]] = {}
 
+    handlers = config_store_handlers(config_entries)
+
     def fake_run(cmd, **kwargs):
         commands.append(list(cmd))
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            return SimpleNamespace(stdout=json.dumps(config_entries), stderr="")
-        if len(cmd) >= 8 and cmd[3] == "config" and cmd[4] == "create":
-            name = cmd[6]
-            remote_type = cmd[7]
-            options: dict[str, str] = {}
-            for idx in range(8, len(cmd), 2):
-                if idx + 1 >= len(cmd):
-                    break
-                options[cmd[idx]] = cmd[idx + 1]
-            config_entries[name] = {"type": remote_type, **options}
-            return SimpleNamespace(stdout="", stderr="")
-        return SimpleNamespace(stdout="", stderr="")
+        return dispatch(handlers, cmd)
 
     monkeypatch.setattr(app_module.subprocess, "run", fake_run)
     client = app.test_client()
@@ -307,7 +327,7 @@ def test_create_local_remote_invalid_path(monkeypatch, tmp_path):
 
     def fake_run(cmd, **kwargs):
         commands.append(cmd)
-        return SimpleNamespace(stdout="", stderr="")
+        return DummyResult()
 
     monkeypatch.setattr(app_module.subprocess, "run", fake_run)
     client = app.test_client()
@@ -329,23 +349,12 @@ def test_create_sftp_remote_success(monkeypatch):
     calls: list[dict[str, object]] = []
     config_entries: dict[str, dict[str, str]] = {}
 
+    handlers = config_store_handlers(config_entries)
+    handlers[("obscure",)] = lambda cmd: DummyResult(stdout="obscured-secret\n")
+
     def fake_run(cmd, **kwargs):
         calls.append({"cmd": cmd, "kwargs": kwargs})
-        if "obscure" in cmd:
-            return SimpleNamespace(stdout="obscured-secret\n", stderr="")
-        if len(cmd) >= 5 and cmd[3] == "config" and cmd[4] == "dump":
-            return SimpleNamespace(stdout=json.dumps(config_entries), stderr="")
-        if len(cmd) >= 8 and cmd[3] == "config" and cmd[4] == "create":
-            name = cmd[6]
-            remote_type = cmd[7]
-            options: dict[str, str] = {}
-            for idx in range(8, len(cmd), 2):
-                if idx + 1 >= len(cmd):
-                    break
-                options[cmd[idx]] = cmd[idx + 1]
-            config_entries[name] = {"type": remote_type, **options}
-            return SimpleNamespace(stdout="", stderr="")
-        return SimpleNamespace(stdout="", stderr="")
+        return dispatch(handlers, cmd)
 
     monkeypatch.setattr(app_module.subprocess, "run", fake_run)
     client = app.test_client()
@@ -430,7 +439,7 @@ def test_create_sftp_remote_missing_credentials(monkeypatch):
 
     def fake_run(cmd, **kwargs):
         commands.append(cmd)
-        return SimpleNamespace(stdout="", stderr="")
+        return DummyResult()
 
     monkeypatch.setattr(app_module.subprocess, "run", fake_run)
     client = app.test_client()
@@ -456,7 +465,7 @@ def test_create_sftp_remote_invalid_port(monkeypatch):
 
     def fake_run(cmd, **kwargs):
         commands.append(cmd)
-        return SimpleNamespace(stdout="", stderr="")
+        return DummyResult()
 
     monkeypatch.setattr(app_module.subprocess, "run", fake_run)
     client = app.test_client()
@@ -482,15 +491,17 @@ def test_create_sftp_remote_connection_failure(monkeypatch):
     app, app_module = make_app(monkeypatch)
     calls: list[list[str]] = []
 
+    def lsd(cmd):
+        raise subprocess.CalledProcessError(1, cmd, stderr="auth failed")
+
+    handlers = {
+        ("obscure",): lambda cmd: DummyResult(stdout="obscured-secret\n"),
+        ("lsd", "sftp1:"): lsd,
+    }
+
     def fake_run(cmd, **kwargs):
         calls.append(cmd)
-        if "obscure" in cmd:
-            return SimpleNamespace(stdout="obscured-secret\n", stderr="")
-        if "config" in cmd and "create" in cmd:
-            return SimpleNamespace(stdout="", stderr="")
-        if cmd[-2:] == ["lsd", "sftp1:"]:
-            raise subprocess.CalledProcessError(1, cmd, stderr="auth failed")
-        return SimpleNamespace(stdout="", stderr="")
+        return dispatch(handlers, cmd)
 
     monkeypatch.setattr(app_module.subprocess, "run", fake_run)
     client = app.test_client()
@@ -0,0 +1,122 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from orchestrator.services import rclone
+
+
+FAKE_RCLONE = textwrap.dedent(
+    """
+    import sys
+    import time
+
+    print("NOTICE: go to the following link: http://127.0.0.1:53682/auth?state=abc", file=sys.stderr, flush=True)
+    print("Enter verification code>", flush=True)
+    code = sys.stdin.readline().strip()
+    time.sleep(0.05)
+    print("Paste the following into your remote machine --->")
+    print('{"access_token":"%s",' % code)
+    print(' "expiry":"2030-01-01T00:00:00Z"}')
+    print("<---End paste", flush=True)
+    """
+)
+
+
+# Same flow, but the URL is printed on stdout as some rclone wrappers do.
+FAKE_RCLONE_URL_ON_STDOUT = FAKE_RCLONE.replace(
+    "state=abc\", file=sys.stderr, flush=True)", "state=abc\", flush=True)"
+)
+
+
+@pytest.fixture
+def fake_rclone(request, monkeypatch, tmp_path):
+    script = tmp_path / "fake_rclone.py"
+    script.write_text(getattr(request, "param", FAKE_RCLONE))
+    real_popen = subprocess.Popen
+
+    def fake_popen(cmd, **kwargs):
+        return real_popen([sys.executable, str(script)], **kwargs)
+
+    monkeypatch.setattr(rclone.subprocess, "Popen", fake_popen)
+    yield
+    for _, sessions in rclone._AUTH_SHARDS:
+        for session_id in list(sessions):
+            rclone._cleanup_session(session_id, terminate=True)
+
+
+@pytest.mark.parametrize(
+    "fake_rclone", [FAKE_RCLONE, FAKE_RCLONE_URL_ON_STDOUT], ids=["stderr", "stdout"], indirect=True
+)
+def test_authorize_and_complete_with_fake_rclone(fake_rclone):
+    session_id, url = rclone.authorize_drive("gdrive")
+    assert url == "http://127.0.0.1:53682/auth?state=abc"
+
+    token = rclone.complete_drive_authorization(session_id, "secret")
+    assert token == (
+        '{"access_token":"secret",\n "expiry":"2030-01-01T00:00:00Z"}'
+    )
+    assert rclone.get_authorization_session(session_id) is None
+
+
+def test_wait_for_authorization_url_times_out(monkeypatch):
+    monkeypatch.setattr(rclone, "_URL_TIMEOUT", 0.2)
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(5)"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        with pytest.raises(RuntimeError, match="timed out"):
+            rclone._wait_for_authorization_url(proc, bytearray())
+    finally:
+        proc.kill()
+        proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def test_wait_for_token_ignores_braces_inside_strings():
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "print('noise'); print('{\"a\": \"}{\\\\\"\",'); print(' \"b\": {\"c\": 1}}')",
+        ],
+        stdout=subprocess.PIPE,
+        stdin=subprocess.PIPE,
+    )
+    session = rclone.AuthorizationSession(
+        remote="gdrive", process=proc, stdout=proc.stdout, stdin=proc.stdin
+    )
+    try:
+        token = rclone._wait_for_token(session)
+    finally:
+        proc.wait()
+        proc.stdout.close()
+        proc.stdin.close()
+    assert json.loads(token) == {"a": '}{"', "b": {"c": 1}}
+
+
+def test_authorize_replaces_pending_session_for_same_remote(fake_rclone):
+    first_id, _ = rclone.authorize_drive("gdrive")
+    other_id, _ = rclone.authorize_drive("other")
+    second_id, _ = rclone.authorize_drive("gdrive")
+
+    assert rclone.get_authorization_session(first_id) is None
+    assert rclone.get_authorization_session(other_id) is not None
+    assert rclone.get_authorization_session(second_id).remote == "gdrive"
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_is_json_with_and_without_orjson(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(rclone, "orjson", None)
+    assert rclone._is_json(b'{"access_token": "x"}')
+    assert not rclone._is_json(b'{"access_token": }')
@@ -1,22 +1,34 @@
+import json
 import subprocess
 from types import SimpleNamespace
 
 from orchestrator.services.client import BackupClient
 
 
+def _lsjson(*entries: tuple[str, str]) -> str:
+    return json.dumps(
+        [
+            {"Path": name, "Name": name, "Size": 100, "ModTime": mod_time, "IsDir": False}
+            for name, mod_time in entries
+        ]
+    )
+
+
 def test_apply_retention_deletes_old(monkeypatch):
-    client = BackupClient("http://url", "token")
     monkeypatch.setenv("RCLONE_REMOTE", "drive")
+    client = BackupClient("http://url", "token")
     deleted: list[str] = []
 
     def fake_run(cmd, capture_output=False, text=False, check=False):
-        if cmd[:2] == ["rclone", "lsl"]:
-            assert cmd[2] == "drive:"
+        if cmd[:2] == ["rclone", "lsjson"]:
+            assert cmd[-1] == "drive:"
+            assert cmd[cmd.index("--include") + 1] == "app_*"
             return SimpleNamespace(
-                stdout=(
-                    "100 2024-01-01 00:00:00 app_20240101.bak\n"
-                    "100 2024-01-02 00:00:00 app_20240102.bak\n"
-                    "100 2024-01-03 00:00:00 app_20240103.bak\n"
+                stdout=_lsjson(
+                    ("app_20240101.bak", "2024-01-01T00:00:00Z"),
+                    ("app_20240102.bak", "2024-01-02T00:00:00Z"),
+                    ("app_20240103.bak", "2024-01-03T00:00:00.123456789Z"),
+                    ("other_20231231.bak", "2023-12-31T00:00:00Z"),
                 ),
                 returncode=0,
             )
@@ -32,17 +44,17 @@ def test_apply_retention_deletes_old(monkeypatch):
 
 
 def test_apply_retention_no_delete(monkeypatch):
-    client = BackupClient("http://url", "token")
     monkeypatch.setenv("RCLONE_REMOTE", "drive")
+    client = BackupClient("http://url", "token")
     deleted: list[str] = []
 
     def fake_run(cmd, capture_output=False, text=False, check=False):
-        if cmd[:2] == ["rclone", "lsl"]:
-            assert cmd[2] == "drive:"
+        if cmd[:2] == ["rclone", "lsjson"]:
+            assert cmd[-1] == "drive:"
             return SimpleNamespace(
-                stdout=(
-                    "100 2024-01-01 00:00:00 app_20240101.bak\n"
-                    "100 2024-01-02 00:00:00 app_20240102.bak\n"
+                stdout=_lsjson(
+                    ("app_20240101.bak", "2024-01-01T00:00:00Z"),
+                    ("app_20240102.bak", "2024-01-02T00:00:00Z"),
                 ),
                 returncode=0,
             )
@@ -55,3 +67,38 @@ def test_apply_retention_no_delete(monkeypatch):
     monkeypatch.setattr(subprocess, "run", fake_run)
     client.apply_retention("app", 5)
     assert deleted == []
+
+
+def test_apply_retention_deletes_all_expired(monkeypatch):
+    monkeypatch.setenv("RCLONE_REMOTE", "drive")
+    client = BackupClient("http://url", "token")
+    deleted: list[str] = []
+    listing = _lsjson(
+        *((f"app_202401{day:02d}.bak", f"2024-01-{day:02d}T00:00:00Z") for day in range(1, 13))
+    )
+
+    def fake_run(cmd, capture_output=False, text=False, check=False):
+        if cmd[:2] == ["rclone", "lsjson"]:
+            return SimpleNamespace(stdout=listing, returncode=0)
+        elif cmd[:2] == ["rclone", "delete"]:
+            deleted.append(cmd[2])
+            return SimpleNamespace(returncode=0, stdout="")
+        raise AssertionError("unexpected command")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    client.apply_retention("app", 2)
+    assert sorted(deleted) == [f"drive:app_202401{day:02d}.bak" for day in range(1, 11)]
+
+
+def test_apply_retention_escapes_app_name_in_filter(monkeypatch):
+    monkeypatch.setenv("RCLONE_REMOTE", "drive")
+    client = BackupClient("http://url", "token")
+    commands: list[list[str]] = []
+
+    def fake_run(cmd, capture_output=False, text=False, check=False):
+        commands.append(cmd)
+        return SimpleNamespace(stdout="[]", returncode=0)
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    client.apply_retention("app[1]*", 2)
+    assert commands[0][commands[0].index("--include") + 1] == r"app\[1\]\*_*"
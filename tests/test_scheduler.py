@@ -42,6 +42,12 @@ def test_run_backup_exports(monkeypatch, test_session):
         def __init__(self, url: str, token: str) -> None:
             called["init"] = (url, token)
 
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info) -> None:
+            called["closed"] = True
+
         def check_capabilities(self) -> bool:
             called["checked"] = True
             return True
@@ -58,6 +64,7 @@ def test_run_backup_exports(monkeypatch, test_session):
     assert called["init"] == (app.url, app.token)
     assert called["checked"]
     assert called["exported"] == (app.name, None, None)
+    assert called["closed"]
 
 
 def test_run_backup_missing_app(monkeypatch, test_session):
@@ -83,3 +90,41 @@ def test_run_backup_missing_app(monkeypatch, test_session):
 
     assert called["init"] is False
 
+
+
+def test_schedule_app_backups_registers_scheduled_apps(monkeypatch, test_session):
+    session = test_session()
+    session.add_all(
+        [
+            App(name="cron", url="http://cron", token="t", schedule="0 3 * * *"),
+            App(name="manual", url="http://manual", token="t"),
+        ]
+    )
+    session.commit()
+    cron_id = session.query(App.id).filter_by(name="cron").scalar()
+    session.close()
+
+    monkeypatch.setattr(scheduler, "SessionLocal", test_session)
+    added: list[dict[str, object]] = []
+
+    def fake_add_job(func, trigger, **kwargs):
+        added.append({"func": func, "trigger": trigger, **kwargs})
+
+    monkeypatch.setattr(scheduler.scheduler, "add_job", fake_add_job)
+
+    scheduler.schedule_app_backups()
+
+    assert len(added) == 1
+    job = added[0]
+    assert job["func"] is scheduler.run_backup
+    assert job["args"] == [cron_id]
+    assert job["id"] == f"backup_{cron_id}"
+    assert job["replace_existing"] is True
+    assert str(job["trigger"]) == str(scheduler.CronTrigger.from_crontab("0 3 * * *"))
+
+
+def test_cron_trigger_is_reused_for_identical_schedules():
+    scheduler._cron_trigger.cache_clear()
+    first = scheduler._cron_trigger("*/5 * * * *")
+    assert scheduler._cron_trigger("*/5 * * * *") is first
+    assert scheduler._cron_trigger("0 * * * *") is not first
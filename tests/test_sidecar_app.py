@@ -9,7 +9,7 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from sidecar.app.main import create_app, load_config
+from sidecar.app.main import CapabilitiesConfig, create_app, load_config
 
 
 @pytest.fixture
@@ -40,6 +40,22 @@ def client(app):
         yield client
 
 
+@pytest.fixture
+def exported_handles(monkeypatch):
+    """Record the file handles export passes to ``wrap_file``."""
+    from sidecar.app import main as main_module
+
+    handles = []
+    real_wrap_file = main_module.wrap_file
+
+    def tracking_wrap_file(environ, file, *args, **kwargs):
+        handles.append(file)
+        return real_wrap_file(environ, file, *args, **kwargs)
+
+    monkeypatch.setattr(main_module, "wrap_file", tracking_wrap_file)
+    return handles
+
+
 def _build_config(tmp_path: Path, *, produce_artifact: bool = True) -> dict:
     workdir = tmp_path / "workdir"
     artifacts = tmp_path / "artifacts"
@@ -97,25 +113,46 @@ def test_capabilities_returns_config(client):
     assert data == {"version": "v1", "types": ["filesystem"], "est_seconds": 45, "est_size": 2048}
 
 
-def test_export_generates_artifact_and_metadata(client):
+def test_capabilities_supports_conditional_get(client):
+    headers = {"Authorization": "Bearer super-secret"}
+    first = client.get("/backup/capabilities", headers=headers)
+    etag = first.headers["ETag"]
+
+    second = client.get("/backup/capabilities", headers={**headers, "If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == etag
+
+    stale = client.get("/backup/capabilities", headers={**headers, "If-None-Match": '"other"'})
+    assert stale.status_code == 200
+    assert stale.get_json() == first.get_json()
+
+
+def test_capabilities_payload_omits_missing_estimates():
+    capabilities = CapabilitiesConfig(version="v1", types=["filesystem"])
+    assert capabilities.payload == {"version": "v1", "types": ["filesystem"]}
+
+
+def test_export_generates_artifact_and_metadata(client, exported_handles):
     drive_folder_id = "folder-123"
-    response = client.post(
+    with client.post(
         "/backup/export",
         headers={"Authorization": "Bearer super-secret"},
         query_string={"drive_folder_id": drive_folder_id},
-    )
-    assert response.status_code == 200
-    body = response.data
-    assert body == b"payload:folder-123"
-    expected_checksum = hashlib.sha256(body).hexdigest()
-    assert response.headers["X-Checksum-Sha256"] == expected_checksum
-    assert (
-        response.headers["Content-Disposition"]
-        == 'attachment; filename="my-backup.bin"'
-    )
-    assert response.headers["Content-Length"] == str(len(body))
-    assert response.headers["X-Backup-Format"] == "binary"
-    assert response.headers["X-Drive-Folder-Id"] == drive_folder_id
+    ) as response:
+        assert response.status_code == 200
+        body = response.data
+        assert body == b"payload:folder-123"
+        expected_checksum = hashlib.sha256(body).hexdigest()
+        assert response.headers["X-Checksum-Sha256"] == expected_checksum
+        assert (
+            response.headers["Content-Disposition"]
+            == 'attachment; filename="my-backup.bin"'
+        )
+        assert response.headers["Content-Length"] == str(len(body))
+        assert response.headers["X-Backup-Format"] == "binary"
+        assert response.headers["X-Drive-Folder-Id"] == drive_folder_id
+    assert [handle.closed for handle in exported_handles] == [True]
 
 
 def test_export_missing_artifact_returns_error(tmp_path, monkeypatch):
@@ -133,3 +170,120 @@ def test_export_missing_artifact_returns_error(tmp_path, monkeypatch):
     assert response.status_code == 500
     body = response.get_json()
     assert "did not generate" in body["error"]
+
+
+def test_substitute_env_vars_handles_defaults_and_repeats(monkeypatch):
+    from sidecar.app.exceptions import ConfigError
+    from sidecar.app.main import _substitute_env_vars
+
+    monkeypatch.setenv("SIDECAR_TEST_HOST", "db")
+    monkeypatch.delenv("SIDECAR_TEST_PORT", raising=False)
+    monkeypatch.delenv("SIDECAR_TEST_MISSING", raising=False)
+    text = "${SIDECAR_TEST_HOST}:${SIDECAR_TEST_PORT:-5432}/${SIDECAR_TEST_HOST:-x}"
+    assert _substitute_env_vars(text) == "db:5432/db"
+    monkeypatch.setenv("SIDECAR_TEST_HOST", "replica")
+    assert _substitute_env_vars(text) == "replica:5432/replica"
+    with pytest.raises(ConfigError, match="SIDECAR_TEST_MISSING"):
+        _substitute_env_vars("${SIDECAR_TEST_MISSING}")
+    static = "port: 8000  # $HOME and {braces} are left alone\n"
+    assert _substitute_env_vars(static) is static
+
+
+def test_load_config_is_cached_until_file_or_env_changes(config_file, monkeypatch):
+    from sidecar.app import main as main_module
+
+    parses = []
+    real_parse = main_module._parse_yaml
+    monkeypatch.setattr(main_module, "_parse_yaml", lambda text: parses.append(text) or real_parse(text))
+
+    first = load_config(config_file)
+    assert load_config(config_file) == first
+    assert len(parses) == 1
+
+    monkeypatch.setenv("BACKUP_API_TOKEN", "rotated")
+    rotated = load_config(config_file)
+    assert len(parses) == 2
+    assert rotated.secrets.api_token == "rotated"
+
+    data = yaml.safe_load(config_file.read_text())
+    data["app"]["port"] = 9100
+    config_file.write_text(yaml.safe_dump(data))
+    assert load_config(config_file).app.port == 9100
+
+
+def test_export_removes_artifact_from_disk(client, sidecar_config, exported_handles):
+    with client.post(
+        "/backup/export",
+        headers={"Authorization": "Bearer super-secret"},
+    ) as response:
+        assert response.status_code == 200
+        assert response.data == b"payload:"
+        assert list(sidecar_config.paths.artifacts.iterdir()) == []
+    assert [handle.closed for handle in exported_handles] == [True]
+
+
+def test_load_config_returns_independent_copies(config_file):
+    first = load_config(config_file)
+    first.strategy.config["command"] = "mutated"
+    first.capabilities.types.append("extra")
+
+    second = load_config(config_file)
+    assert second.strategy.config["command"] != "mutated"
+    assert "extra" not in second.capabilities.types
+
+
+def test_load_config_cache_clear_forces_reparse(config_file, monkeypatch):
+    from sidecar.app import main as main_module
+
+    parses = []
+    real_parse = main_module._parse_yaml
+    monkeypatch.setattr(main_module, "_parse_yaml", lambda text: parses.append(text) or real_parse(text))
+
+    first = load_config(config_file)
+    load_config.cache_clear()
+    second = load_config(config_file)
+    assert len(parses) == 2
+    assert second == first
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("Bearer abc", "abc"),
+        ("bearer   abc  ", "abc"),
+        ("BEARER a b", "a b"),
+        ("Bearer", None),
+        ("Bearer    ", None),
+        ("Basic abc", None),
+        ("Bearerabc", None),
+        (None, None),
+    ],
+)
+def test_extract_bearer_token(header, expected):
+    from sidecar.app.exceptions import UnauthorizedError
+    from sidecar.app.main import _extract_bearer_token
+
+    if expected is None:
+        with pytest.raises(UnauthorizedError):
+            _extract_bearer_token(header)
+    else:
+        assert _extract_bearer_token(header) == expected
+
+
+def test_capabilities_rejects_wrong_token(client):
+    response = client.get(
+        "/backup/capabilities",
+        headers={"Authorization": "Bearer not-the-secret"},
+    )
+    assert response.status_code == 401
+    assert response.get_json()["error"] == "Invalid authorization token"
+
+
+def test_export_requires_token(client):
+    response = client.post("/backup/export")
+    assert response.status_code == 401
+
+
+def test_unknown_route_is_not_found_without_token(client):
+    assert client.get("/nope").status_code == 404
+
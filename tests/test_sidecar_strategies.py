@@ -0,0 +1,411 @@
+import errno
+import hashlib
+import os
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sidecar.app.exceptions import ConfigError, StrategyExecutionError
+from sidecar.app.main import PathsConfig, StrategyArtifactConfig
+from sidecar.app.strategies import base
+from sidecar.app.strategies import command as command_module
+from sidecar.app.strategies.command import prepare_command
+from sidecar.app.strategies.custom import CustomStrategy
+from sidecar.app.strategies.file_archive import FileArchiveStrategy
+
+
+def _make_strategy(tmp_path: Path, **options) -> CustomStrategy:
+    paths = PathsConfig(
+        workdir=tmp_path / "workdir",
+        artifacts=tmp_path / "artifacts",
+        temp_dump=tmp_path / "dump.bin",
+    )
+    artifact = StrategyArtifactConfig(
+        filename="backup.bin",
+        format="binary",
+        content_type="application/octet-stream",
+    )
+    return CustomStrategy(
+        artifact_config=artifact,
+        paths=paths,
+        options={"command": "true", **options},
+    )
+
+
+def test_store_artifact_copies_and_hashes_across_filesystems(tmp_path, monkeypatch):
+    strategy = _make_strategy(tmp_path)
+    strategy.paths.artifacts.mkdir()
+    payload = b"x" * (3 * 1024 * 1024 + 17)
+    source = strategy.paths.temp_dump
+    source.write_bytes(payload)
+    source.chmod(0o444)
+    monkeypatch.setattr(strategy, "_same_filesystem", lambda path: False)
+
+    metadata = strategy._store_artifact(source)
+
+    assert not source.exists()
+    with metadata.handle as handle:
+        assert handle.read() == payload
+    assert metadata.path.read_bytes() == payload
+    assert (metadata.path.stat().st_mode & 0o777) == 0o444
+    assert metadata.checksum == hashlib.sha256(payload).hexdigest()
+    assert metadata.size == len(payload)
+
+
+def test_capture_reports_stderr_on_failure(tmp_path):
+    strategy = _make_strategy(
+        tmp_path,
+        command="printf partial; echo broken >&2; exit 3",
+        capture_stdout=True,
+    )
+    with pytest.raises(StrategyExecutionError, match="exit code 3") as excinfo:
+        strategy.prepare()
+    assert "broken" in str(excinfo.value)
+
+
+def test_capture_kills_command_when_dump_write_fails(tmp_path, monkeypatch):
+    strategy = _make_strategy(tmp_path, command="yes", capture_stdout=True)
+    processes = []
+    real_popen = command_module.subprocess.Popen
+
+    def tracking_popen(*args, **kwargs):
+        process = real_popen(*args, **kwargs)
+        processes.append(process)
+        return process
+
+    def failing_copy(source, digest, sink=None):
+        source.read(1024)
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(command_module.subprocess, "Popen", tracking_popen)
+    monkeypatch.setattr(command_module, "copy_with_digest", failing_copy)
+    with pytest.raises(OSError, match="No space left"):
+        strategy.prepare()
+    assert [process.returncode is not None for process in processes] == [True]
+
+
+def test_capture_rehashes_dump_rewritten_by_post_command(tmp_path):
+    strategy = _make_strategy(
+        tmp_path,
+        command="printf original",
+        capture_stdout=True,
+        post=["printf rewritten > \"$SIDE_CAR_TEMP_DUMP\""],
+    )
+    metadata = strategy.prepare()
+    with strategy.open_artifact() as handle:
+        assert handle.read() == b"rewritten"
+    assert metadata.checksum == hashlib.sha256(b"rewritten").hexdigest()
+    assert metadata.size == len(b"rewritten")
+
+
+@pytest.mark.parametrize(
+    "command, argv",
+    [
+        ("echo done", ("echo", "done")),
+        ("pg_dump --dbname 'my db'", ("pg_dump", "--dbname", "my db")),
+        ('mkdir -p "$SIDE_CAR_ARTIFACTS_DIR"', None),
+        ("tar cf - data | gzip", None),
+        ("cp *.sql out", None),
+        ("cd /tmp", None),
+        ("command -v pg_dump", None),
+        ("type pg_dump", None),
+        ("hash pg_dump", None),
+        ("PGPASSWORD=x pg_dump db", None),
+        ("echo 'unterminated", None),
+    ],
+)
+def test_prepare_command_only_tokenizes_shell_free_commands(command, argv):
+    prepared = prepare_command(command)
+    assert prepared.text == command
+    assert prepared.argv == argv
+
+
+def test_prepare_command_resolves_bare_executables(tmp_path):
+    tool = tmp_path / "dump-tool"
+    tool.write_text("#!/bin/sh\n")
+    tool.chmod(0o755)
+
+    prepared = prepare_command("dump-tool --all", search_path=str(tmp_path))
+    assert prepared.argv == ("dump-tool", "--all")
+    assert prepared.executable == str(tool)
+    assert prepare_command("./dump-tool", search_path=str(tmp_path)).executable is None
+
+
+def test_simple_commands_run_without_shell(tmp_path):
+    strategy = _make_strategy(
+        tmp_path,
+        command="touch dump.bin",
+        workdir=str(tmp_path),
+    )
+    strategy.paths.workdir.mkdir()
+    assert strategy._backup_commands[0].argv == ("touch", "dump.bin")
+    strategy._run_simple_commands(strategy._backup_commands, {"PATH": "/usr/bin:/bin"})
+    assert (tmp_path / "dump.bin").exists()
+
+
+def test_missing_executable_raises_strategy_error(tmp_path):
+    strategy = _make_strategy(tmp_path, command="definitely-not-a-real-binary --flag")
+    strategy.paths.workdir.mkdir()
+    with pytest.raises(StrategyExecutionError, match="Command not found"):
+        strategy._run_simple_commands(strategy._backup_commands, dict(os.environ))
+
+
+@pytest.mark.parametrize("capture_stdout", [False, True], ids=["run", "capture"])
+def test_non_executable_script_raises_strategy_error(tmp_path, capture_stdout):
+    script = tmp_path / "dump.sh"
+    script.write_text("#!/bin/sh\necho dump\n")
+    script.chmod(0o644)
+    strategy = _make_strategy(
+        tmp_path, command=str(script), capture_stdout=capture_stdout
+    )
+    with pytest.raises(StrategyExecutionError, match="could not be executed"):
+        strategy.prepare()
+    assert not strategy.paths.temp_dump.exists()
+
+
+def test_resolved_executable_that_stops_being_runnable_raises(tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    tool = bin_dir / "dump-tool"
+    tool.write_text("#!/bin/sh\n")
+    tool.chmod(0o755)
+    strategy = _make_strategy(
+        tmp_path, command="dump-tool", env={"PATH": f"{bin_dir}:/usr/bin:/bin"}
+    )
+    assert strategy._backup_commands[0].executable == str(tool)
+    tool.chmod(0o644)
+    with pytest.raises(StrategyExecutionError, match="could not be executed"):
+        strategy.prepare()
+
+
+def test_build_env_is_read_only_and_drops_cosmetic_vars(tmp_path, monkeypatch):
+    monkeypatch.setenv("LS_COLORS", "di=01;34")
+    strategy = _make_strategy(tmp_path, env={"EXTRA": "1"})
+    env = strategy._build_env("folder")
+    assert "LS_COLORS" not in env
+    assert env["EXTRA"] == "1"
+    assert env["SIDE_CAR_DRIVE_FOLDER_ID"] == "folder"
+    with pytest.raises(TypeError):
+        env["EXTRA"] = "2"
+
+
+def test_build_env_reuses_base_env_without_folder_id(tmp_path):
+    strategy = _make_strategy(tmp_path)
+    assert strategy._build_env(None) is strategy._build_env(None)
+    assert "SIDE_CAR_DRIVE_FOLDER_ID" not in strategy._build_env(None)
+    assert "SIDE_CAR_DRIVE_FOLDER_ID" not in strategy._base_env
+    assert strategy._build_env("a")["SIDE_CAR_DRIVE_FOLDER_ID"] == "a"
+
+
+class _FakeBlake3:
+    AUTO = -1
+
+    def __init__(self, max_threads=1):
+        self._digest = hashlib.blake2b()
+
+    def update(self, data):
+        self._digest.update(data)
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+
+def test_blake3_is_computed_in_the_same_pass(tmp_path, monkeypatch):
+    monkeypatch.setattr(base, "blake3", type("blake3", (), {"blake3": _FakeBlake3}))
+    strategy = _make_strategy(tmp_path, command="printf payload", capture_stdout=True)
+
+    metadata = strategy.prepare()
+
+    assert metadata.checksum == hashlib.sha256(b"payload").hexdigest()
+    assert metadata.checksum_blake3 == hashlib.blake2b(b"payload").hexdigest()
+    with metadata.handle as handle:
+        assert strategy._compute_checksum(handle).blake3 == metadata.checksum_blake3
+
+
+def test_stream_yields_whole_artifact_in_chunks(tmp_path):
+    strategy = _make_strategy(tmp_path)
+    payload = bytes(range(256)) * (base.CHUNK_SIZE // 128 + 3)
+    source = strategy.paths.temp_dump
+    source.write_bytes(payload)
+    strategy.paths.artifacts.mkdir()
+    strategy._store_artifact(source)
+
+    chunks = list(strategy.stream())
+
+    assert b"".join(chunks) == payload
+    assert max(len(chunk) for chunk in chunks) == base.CHUNK_SIZE
+
+
+def _make_archive_strategy(tmp_path: Path, **options) -> FileArchiveStrategy:
+    source = tmp_path / "source"
+    (source / "data" / "nested").mkdir(parents=True)
+    (source / "data" / "a.txt").write_text("a")
+    (source / "data" / "nested" / "b.txt").write_text("b")
+    (source / "notes.md").write_text("notes")
+    paths = PathsConfig(
+        workdir=tmp_path / "workdir",
+        artifacts=tmp_path / "artifacts",
+        temp_dump=tmp_path / "archive.tmp",
+    )
+    artifact = StrategyArtifactConfig(
+        filename="files.bin",
+        format="archive",
+        content_type="application/octet-stream",
+    )
+    return FileArchiveStrategy(
+        artifact_config=artifact,
+        paths=paths,
+        options={"base_dir": str(source), **options},
+    )
+
+
+def test_collect_paths_deduplicates_overlapping_patterns(tmp_path):
+    strategy = _make_archive_strategy(tmp_path, paths=["data", "data/", "*.md", "notes.md"])
+    source = tmp_path / "source"
+    assert strategy._collect_paths() == [str(source / "data"), str(source / "notes.md")]
+
+
+@pytest.mark.parametrize("archive_format", ["tar", "zip"])
+def test_file_archive_contains_expected_members(tmp_path, archive_format):
+    strategy = _make_archive_strategy(
+        tmp_path, paths=["data", "notes.md"], format=archive_format, compression="gz"
+    )
+    metadata = strategy.prepare()
+    with strategy.open_artifact() as handle:
+        payload = handle.read()
+    assert metadata.checksum == hashlib.sha256(payload).hexdigest()
+    assert metadata.size == len(payload)
+
+    if archive_format == "tar":
+        with tarfile.open(metadata.path) as archive:
+            names = {member.name for member in archive.getmembers() if member.isfile()}
+            content = archive.extractfile("data/nested/b.txt").read()
+    else:
+        with zipfile.ZipFile(metadata.path) as archive:
+            names = {name for name in archive.namelist() if not name.endswith("/")}
+            content = archive.read("data/nested/b.txt")
+    assert names == {"data/a.txt", "data/nested/b.txt", "notes.md"}
+    assert content == b"b"
+
+
+@pytest.mark.parametrize("compression", [None, "gz", "bz2", "xz"])
+def test_tar_checksum_is_computed_while_writing(tmp_path, compression):
+    options = {"paths": ["data"], "format": "tar"}
+    if compression:
+        options["compression"] = compression
+    strategy = _make_archive_strategy(tmp_path, **options)
+    metadata = strategy.prepare()
+    with strategy.open_artifact() as handle:
+        payload = handle.read()
+    assert metadata.checksum == hashlib.sha256(payload).hexdigest()
+    with tarfile.open(metadata.path) as archive:
+        assert archive.extractfile("data/a.txt").read() == b"a"
+
+
+def test_compression_level_is_validated(tmp_path):
+    with pytest.raises(ConfigError, match="compression_level"):
+        _make_archive_strategy(tmp_path, paths=["data"], compression_level=12)
+
+
+def test_higher_compression_level_produces_smaller_zip(tmp_path):
+    (tmp_path / "fast").mkdir()
+    (tmp_path / "small").mkdir()
+    sizes = []
+    for name, level in (("fast", 1), ("small", 9)):
+        strategy = _make_archive_strategy(
+            tmp_path / name,
+            paths=["data"],
+            format="zip",
+            compression="deflate",
+            compression_level=level,
+        )
+        (tmp_path / name / "source" / "data" / "big.txt").write_text(
+            "".join(f"line {i} {i * 7919 % 1000}\n" for i in range(20000))
+        )
+        metadata = strategy.prepare()
+        metadata.handle.close()
+        sizes.append(metadata.size)
+    assert sizes[1] < sizes[0]
+
+
+def test_parallel_pre_commands_all_run(tmp_path):
+    strategy = _make_strategy(
+        tmp_path,
+        pre=["touch first", "touch second", "touch third"],
+        command="touch \"$SIDE_CAR_TEMP_DUMP\"",
+        parallel_pre=True,
+    )
+    metadata = strategy.prepare()
+    metadata.handle.close()
+    workdir = tmp_path / "workdir"
+    assert {p.name for p in workdir.iterdir()} >= {"first", "second", "third"}
+
+
+def test_parallel_post_commands_report_failures(tmp_path):
+    strategy = _make_strategy(
+        tmp_path,
+        command="touch \"$SIDE_CAR_TEMP_DUMP\"",
+        post=["true", "exit 3"],
+        parallel_post=True,
+    )
+    with pytest.raises(StrategyExecutionError, match="exit code 3"):
+        strategy.prepare()
+
+
+@pytest.mark.parametrize("follow_symlinks", [False, True])
+def test_zip_archive_honours_follow_symlinks(tmp_path, follow_symlinks):
+    strategy = _make_archive_strategy(
+        tmp_path, paths=["data"], format="zip", follow_symlinks=follow_symlinks
+    )
+    data = tmp_path / "source" / "data"
+    (data / "link.txt").symlink_to(data / "a.txt")
+    (data / "linked_dir").symlink_to(data / "nested", target_is_directory=True)
+    metadata = strategy.prepare()
+    metadata.handle.close()
+    with zipfile.ZipFile(metadata.path) as archive:
+        names = set(archive.namelist())
+    linked = {"data/link.txt", "data/linked_dir/", "data/linked_dir/b.txt"}
+    assert {"data/", "data/a.txt", "data/nested/", "data/nested/b.txt"} <= names
+    assert (linked <= names) if follow_symlinks else not (linked & names)
+
+
+def test_zip_archive_skips_symlink_loops(tmp_path):
+    strategy = _make_archive_strategy(
+        tmp_path, paths=["data"], format="zip", follow_symlinks=True
+    )
+    data = tmp_path / "source" / "data"
+    (data / "nested" / "loop").symlink_to("..", target_is_directory=True)
+    metadata = strategy.prepare()
+    metadata.handle.close()
+    with zipfile.ZipFile(metadata.path) as archive:
+        names = archive.namelist()
+    assert len(names) == len(set(names))
+    assert {"data/", "data/a.txt", "data/nested/", "data/nested/b.txt"} == set(names)
+
+
+def test_make_arcname_strips_base_dir(tmp_path):
+    strategy = _make_archive_strategy(tmp_path, paths=["data"])
+    source = str(tmp_path / "source")
+    assert strategy._make_arcname(os.path.join(source, "data", "a.txt")) == "data/a.txt"
+    assert strategy._make_arcname(source) == "."
+    assert strategy._make_arcname(source + "-other") == "source-other"
+    assert strategy._make_arcname("/elsewhere/file.txt") == "file.txt"
+
+
+def test_resolve_pattern_skips_glob_for_literal_paths(tmp_path, monkeypatch):
+    strategy = _make_archive_strategy(tmp_path, paths=["data"])
+    source = tmp_path / "source"
+
+    def fail_glob(*args, **kwargs):
+        raise AssertionError("glob should not run for literal paths")
+
+    monkeypatch.setattr("sidecar.app.strategies.file_archive.glob.glob", fail_glob)
+    assert strategy._resolve_pattern("notes.md") == [str(source / "notes.md")]
+    assert strategy._resolve_pattern("missing.txt") == []